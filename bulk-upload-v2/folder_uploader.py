@@ -39,6 +39,12 @@ from urllib.parse import quote_plus
 import threading
 import logging
 
+# 생성 파라미터 파서
+from generation_params import parse_generation_parameters
+
+# 스토리지 백엔드 (GCS / 로컬 모의 백엔드)
+from storage_backend import GCSStorageBackend, get_storage_backend
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def install_requirements():
@@ -170,41 +176,8 @@ Steps: {json_info["steps"]}, CFG scale: {json_info["scale"]}, Seed: {json_info["
 
 
     def parse_generation_parameters(self, x: str):
-        res = {}
-        lines = x.strip().split("\n")  # 입력된 문자열을 줄 단위로 분리
-
-        for i, line in enumerate(lines):  # 각 줄과 그 인덱스에 대해 반복
-            line = line.strip()  # 현재 줄의 앞뒤 공백 제거
-            if i == 0:  # 첫 번째 줄인 경우
-                res["Prompt"] = line
-            elif i == 1 and line.startswith("Negative prompt:"):  # 두 번째 줄이며 "Negative prompt:"로 시작하는 경우
-                res["Negative prompt"] = line[16:].strip()
-            elif i == 2:  # 세 번째 줄인 경우, 옵션들을 처리
-                # 여기에서 각 키-값에 대한 매칭 작업을 수행합니다.
-                keys = [
-                    "Steps", "Sampler", "CFG scale", "Seed", "Size", 
-                    "Model hash", "Model", "VAE hash", "VAE", 
-                    "Denoising strength", "Clip skip", "Hires upscale",
-                    "Hires upscaler", 
-                ]
-                for key in keys:
-                    # 정규 표현식을 사용하여 각 키에 해당하는 값을 찾습니다.
-                    match = re.search(fr'{key}: ([^,]+),', line)
-                    if match:
-                        # 찾은 값은 그룹 1에 있습니다.
-                        value = match.group(1).strip()
-                        res[key] = value
-                
-                controlnet_patterns = re.findall(r'ControlNet \d+: "(.*?)"', line, re.DOTALL)
-                for idx, cn_content in enumerate(controlnet_patterns):
-                    # ControlNet 내부의 키-값 쌍을 추출합니다.
-                    cn_dict = {}
-                    cn_pairs = re.findall(r'(\w+): ([^,]+)', cn_content)
-                    for key, value in cn_pairs:
-                        cn_dict[key.strip()] = value.strip()
-                    res[f"ControlNet {idx}"] = cn_dict
-
-        return res
+        # 프롬프트/네거티브 프롬프트/파라미터 분리는 공용 단일 패스 파서에 위임합니다.
+        return parse_generation_parameters(x)
 
     def geninfo_params(self, image):
         try:
@@ -417,20 +390,28 @@ def end_session(session):
     session.close()
     ssh_connection.stop_ssh_tunnel()
 
-@retry_on_exception
-def upload_to_bucket(blob_name, data, bucket_name):
+def _create_storage_client():
     current_script_path = os.path.abspath(__file__)
     base_directory = os.path.dirname(current_script_path)
-    
     credentials_path = os.path.join(base_directory, 'wcidfu-77f802b00777.json')
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
 
+    if not os.path.exists(credentials_path):
+        raise FileNotFoundError(f"Credentials file not found: {credentials_path}")
+
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
     credentials = service_account.Credentials.from_service_account_file(credentials_path)
+    return storage.Client(credentials=credentials)
+
+# 별도 백엔드가 설정되지 않았을 때 사용하는 GCS 백엔드
+_default_storage_backend = GCSStorageBackend(_create_storage_client)
+
+def get_backend():
+    """설정된 스토리지 백엔드를 반환합니다. (없으면 GCS)"""
+    return get_storage_backend() or _default_storage_backend
 
-    storage_client = storage.Client(credentials = credentials)
-    bucket = storage_client.get_bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-    blob.upload_from_string(data)
+@retry_on_exception
+def upload_to_bucket(blob_name, data, bucket_name):
+    blob_name = get_backend().upload(bucket_name, blob_name, data)
     clean_blob_name = blob_name.replace("_media/", "")    
     return clean_blob_name
 
@@ -724,56 +705,37 @@ def update_public_json_file(session, nano_id, uploaded_folder_structure):
     else:
         raise KeyError("Neither user nor team found with the given nano_id.")
     
-    google_url = f"https://storage.googleapis.com/wcidfu-bucket/_media/{file_path}"
+    backend = get_backend()
+    bucket_name = "wcidfu-bucket"
+    blob_name = f"_media/{file_path}"
 
     # 기존 JSON 파일 가져오기
-    response = requests.get(google_url)
-    response.raise_for_status()  # 요청 실패 시 예외 발생
+    folder_tree_file = backend.download(bucket_name, blob_name)
 
     # JSON 파일 내용 디코딩 및 로드
-    folder_tree_file = response.content
     tree_file = json.loads(folder_tree_file.decode('utf-8'))
 
     # 현재 트리 구조에 새로운 폴더 구조 업데이트
     current_tree = tree_file.get('json', {})
     current_tree.update(uploaded_folder_structure)
 
-    # Google Cloud Storage 클라이언트 생성
-    current_script_path = os.path.abspath(__file__)
-    base_directory = os.path.dirname(current_script_path)
-    credentials_path = os.path.join(base_directory, 'wcidfu-77f802b00777.json')
-
-    if os.path.exists(credentials_path):
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-        credentials = service_account.Credentials.from_service_account_file(credentials_path)
-        storage_client = storage.Client(credentials=credentials)
-    else:
-        raise FileNotFoundError(f"Credentials file not found: {credentials_path}")
-    
-    bucket_name = "wcidfu-bucket"
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(f"_media/{file_path}")
-
     # 기존 파일 백업
-    backup_blob = bucket.blob(f"_media/backup/{file_path}")
-    bucket.copy_blob(blob, bucket, new_name=backup_blob.name) 
+    backup_blob_name = f"_media/backup/{file_path}"
+    backend.copy(bucket_name, blob_name, backup_blob_name)
 
     # 기존 파일 삭제
-    blob.delete()
+    backend.delete(bucket_name, blob_name)
 
-    # 새로운 JSON 파일 경로 설정 및 업로드
-    new_blob = bucket.blob(f"_media/{new_file_name}")
-    
-    # 최종적으로 업데이트된 JSON 데이터를 생성하여 업로드
+    # 최종적으로 업데이트된 JSON 데이터를 생성하여 새로운 경로에 업로드
     updated_json_string = json.dumps(tree_file, ensure_ascii=False, indent=2)
-    new_blob.upload_from_string(updated_json_string, content_type='application/json')
+    backend.upload(bucket_name, f"_media/{new_file_name}", updated_json_string, content_type='application/json')
 
     # 데이터베이스 업데이트 및 세션 커밋
     entity.json_file = new_file_name
     session.commit()
 
     # 모든 작업이 성공하면 백업 파일 삭제
-    backup_blob.delete()
+    backend.delete(bucket_name, backup_blob_name)
 
 def generate_folder_structure(root_path):
     result = create_folder_tree(root_path)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+
+class StorageBackend:
+    """
+    업로드 코드가 사용하는 스토리지 백엔드 인터페이스.
+    기본은 GCS이며, 벤치마크/테스트에서는 로컬 구현으로 교체하여 운영 버킷 없이 실행할 수 있습니다.
+    """
+
+    def upload(self, bucket_name: str, blob_name: str, data, content_type: Optional[str] = None) -> str:
+        """
+        데이터를 저장합니다.
+
+        Returns:
+            str: 실제로 저장된 객체 이름
+        """
+        raise NotImplementedError
+
+    def download(self, bucket_name: str, blob_name: str) -> bytes:
+        """저장된 객체의 내용을 반환합니다. 없으면 FileNotFoundError를 발생시킵니다."""
+        raise NotImplementedError
+
+    def copy(self, bucket_name: str, blob_name: str, new_name: str) -> None:
+        """같은 버킷 안에서 객체를 복사합니다."""
+        raise NotImplementedError
+
+    def delete(self, bucket_name: str, blob_name: str) -> None:
+        """객체를 삭제합니다."""
+        raise NotImplementedError
+
+    def exists(self, bucket_name: str, blob_name: str) -> bool:
+        """객체가 존재하는지 확인합니다."""
+        raise NotImplementedError
+
+
+class GCSStorageBackend(StorageBackend):
+    """
+    Google Cloud Storage 백엔드.
+
+    Args:
+        client_factory: storage.Client를 만드는 함수 (최초 사용 시 1회 호출)
+    """
+
+    def __init__(self, client_factory: Callable[[], object]):
+        self._client_factory = client_factory
+        self._client = None
+        self._buckets: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, bucket_name: str):
+        with self._lock:
+            if self._client is None:
+                self._client = self._client_factory()
+            bucket = self._buckets.get(bucket_name)
+            if bucket is None:
+                bucket = self._client.bucket(bucket_name)
+                self._buckets[bucket_name] = bucket
+            return bucket
+
+    def upload(self, bucket_name, blob_name, data, content_type=None):
+        blob = self._bucket(bucket_name).blob(blob_name)
+        if content_type:
+            blob.upload_from_string(data, content_type=content_type)
+        else:
+            blob.upload_from_string(data)
+        return blob_name
+
+    def download(self, bucket_name, blob_name):
+        return self._bucket(bucket_name).blob(blob_name).download_as_bytes()
+
+    def copy(self, bucket_name, blob_name, new_name):
+        bucket = self._bucket(bucket_name)
+        bucket.copy_blob(bucket.blob(blob_name), bucket, new_name=new_name)
+
+    def delete(self, bucket_name, blob_name):
+        self._bucket(bucket_name).blob(blob_name).delete()
+
+    def exists(self, bucket_name, blob_name):
+        return self._bucket(bucket_name).blob(blob_name).exists()
+
+
+class _SimulatedLink:
+    """
+    네트워크 지연과 대역폭을 흉내 냅니다.
+
+    Args:
+        latency: 요청당 고정 지연(초)
+        bandwidth: 초당 전송 바이트 수 (None이면 제한 없음)
+    """
+
+    def __init__(self, latency: float = 0.0, bandwidth: Optional[float] = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    def transfer(self, size: int):
+        delay = self.latency
+        if self.bandwidth:
+            delay += size / self.bandwidth
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _to_bytes(data) -> bytes:
+    return data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """
+    메모리에 객체를 저장하는 백엔드 (회귀 테스트용).
+
+    Args:
+        latency: 요청당 모의 지연(초)
+        bandwidth: 모의 대역폭(바이트/초)
+    """
+
+    def __init__(self, latency: float = 0.0, bandwidth: Optional[float] = None):
+        self.link = _SimulatedLink(latency, bandwidth)
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.content_types: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, bucket_name, blob_name, data, content_type=None):
+        data = _to_bytes(data)
+        self.link.transfer(len(data))
+        with self._lock:
+            self.objects[(bucket_name, blob_name)] = data
+            if content_type:
+                self.content_types[(bucket_name, blob_name)] = content_type
+        return blob_name
+
+    def download(self, bucket_name, blob_name):
+        with self._lock:
+            data = self.objects.get((bucket_name, blob_name))
+        if data is None:
+            raise FileNotFoundError(f"{bucket_name}/{blob_name}")
+        self.link.transfer(len(data))
+        return data
+
+    def copy(self, bucket_name, blob_name, new_name):
+        self.link.transfer(0)
+        with self._lock:
+            if (bucket_name, blob_name) not in self.objects:
+                raise FileNotFoundError(f"{bucket_name}/{blob_name}")
+            self.objects[(bucket_name, new_name)] = self.objects[(bucket_name, blob_name)]
+
+    def delete(self, bucket_name, blob_name):
+        self.link.transfer(0)
+        with self._lock:
+            if self.objects.pop((bucket_name, blob_name), None) is None:
+                raise FileNotFoundError(f"{bucket_name}/{blob_name}")
+            self.content_types.pop((bucket_name, blob_name), None)
+
+    def exists(self, bucket_name, blob_name):
+        with self._lock:
+            return (bucket_name, blob_name) in self.objects
+
+    def total_bytes(self) -> int:
+        """저장된 전체 바이트 수 (벤치마크 처리량 계산용)"""
+        with self._lock:
+            return sum(len(data) for data in self.objects.values())
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    로컬 디렉토리에 "<root>/<버킷>/<객체 이름>" 형태로 저장하는 백엔드.
+
+    Args:
+        root: 저장할 루트 디렉토리
+        latency: 요청당 모의 지연(초)
+        bandwidth: 모의 대역폭(바이트/초)
+    """
+
+    def __init__(self, root: str, latency: float = 0.0, bandwidth: Optional[float] = None):
+        self.root = os.path.abspath(root)
+        self.link = _SimulatedLink(latency, bandwidth)
+
+    def _path(self, bucket_name: str, blob_name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, bucket_name, blob_name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"잘못된 객체 이름입니다: {blob_name}")
+        return path
+
+    def upload(self, bucket_name, blob_name, data, content_type=None):
+        data = _to_bytes(data)
+        self.link.transfer(len(data))
+        path = self._path(bucket_name, blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return blob_name
+
+    def download(self, bucket_name, blob_name):
+        with open(self._path(bucket_name, blob_name), 'rb') as f:
+            data = f.read()
+        self.link.transfer(len(data))
+        return data
+
+    def copy(self, bucket_name, blob_name, new_name):
+        with open(self._path(bucket_name, blob_name), 'rb') as f:
+            data = f.read()
+        self.upload(bucket_name, new_name, data)
+
+    def delete(self, bucket_name, blob_name):
+        self.link.transfer(0)
+        os.remove(self._path(bucket_name, blob_name))
+
+    def exists(self, bucket_name, blob_name):
+        return os.path.exists(self._path(bucket_name, blob_name))
+
+
+# 프로세스 전역 백엔드 (None이면 각 모듈의 기본 GCS 경로 사용)
+_storage_backend: Optional[StorageBackend] = None
+
+
+def set_storage_backend(backend: Optional[StorageBackend]) -> None:
+    """
+    업로드에 사용할 백엔드를 교체합니다. None을 넘기면 기본 GCS로 돌아갑니다.
+    """
+    global _storage_backend
+    _storage_backend = backend
+
+
+def get_storage_backend() -> Optional[StorageBackend]:
+    """
+    설정된 백엔드를 반환합니다. 설정되지 않았으면 None을 반환합니다.
+    """
+    return _storage_backend
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from collections import deque, namedtuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from manager import CharacterManager, OutfitManager, EventManager, InstrumentManager, PlaveManager
+
+logger = logging.getLogger(__name__)
+
+# 매니저 카테고리
+CATEGORY_CHARACTER = 'character'
+CATEGORY_OUTFIT = 'outfit'
+CATEGORY_EVENT = 'event'
+CATEGORY_INSTRUMENT = 'instrument'
+CATEGORY_PLAVE = 'plave'
+
+# (카테고리, 매니저 클래스) - 매칭 결과도 이 순서를 따름
+MANAGER_CATEGORIES = [
+    (CATEGORY_CHARACTER, CharacterManager),
+    (CATEGORY_OUTFIT, OutfitManager),
+    (CATEGORY_EVENT, EventManager),
+    (CATEGORY_INSTRUMENT, InstrumentManager),
+    (CATEGORY_PLAVE, PlaveManager),
+]
+
+# 매칭 결과: (프롬프트에서 찾은 별칭, 표준 이름, 카테고리)
+AliasMatch = namedtuple('AliasMatch', ['alias', 'standard_name', 'category'])
+
+
+def normalize_alias(alias: str) -> str:
+    """별칭 비교용 정규화: 앞뒤 공백과 끝의 콤마를 제거하고 소문자로 바꿉니다. ('Andrew,' == 'andrew')"""
+    return alias.strip().rstrip(',').strip().lower()
+
+
+class AliasMatcher:
+    """
+    여러 매니저의 별칭을 하나의 Aho–Corasick 오토마톤으로 묶어
+    프롬프트를 한 번만 훑어서(선형 시간) 매칭되는 별칭을 모두 찾습니다.
+    매칭은 기존 `alias.lower() in prompt.lower()`와 같이 대소문자 구분 없는 부분 문자열 기준입니다.
+
+    Args:
+        entries: (별칭, 표준 이름, 카테고리) 목록. 순서가 매칭 결과의 우선순위가 됩니다.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]]):
+        self.entries: List[AliasMatch] = [AliasMatch(*entry) for entry in entries]
+
+        # 소문자 별칭 -> 패턴 ID, 패턴 ID -> 해당 별칭을 가진 항목 인덱스 목록
+        self._patterns: Dict[str, int] = {}
+        self._pattern_entries: List[List[int]] = []
+        for index, entry in enumerate(self.entries):
+            key = entry.alias.lower()
+            if not key:
+                continue
+            pattern_id = self._patterns.get(key)
+            if pattern_id is None:
+                pattern_id = len(self._pattern_entries)
+                self._patterns[key] = pattern_id
+                self._pattern_entries.append([])
+            self._pattern_entries[pattern_id].append(index)
+
+        self._build()
+
+    def _build(self) -> None:
+        # 트라이 (상태별 전이 dict, 실패 링크, 출력 패턴 ID)
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for key, pattern_id in self._patterns.items():
+            state = 0
+            for char in key:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(pattern_id)
+
+        # BFS로 실패 링크를 만들고 실패 상태의 출력을 합침 (루트의 자식은 실패 링크가 루트)
+        fail = [0] * len(goto)
+        pending = deque(goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in goto[state].items():
+                pending.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def matched_patterns(self, text: str) -> set:
+        """텍스트에 포함된 패턴 ID 집합을 반환합니다."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def scan(self, text: str, categories: Optional[Iterable[str]] = None) -> List[AliasMatch]:
+        """
+        텍스트에서 매칭되는 항목을 찾습니다.
+        같은 (카테고리, 표준 이름)은 한 번만 반환하며, 별칭은 정의 순서상 가장 앞선 것을 사용합니다.
+
+        Args:
+            text: 검사할 프롬프트
+            categories: 주어지면 해당 카테고리만 반환
+
+        Returns:
+            List[AliasMatch]: 정의 순서대로 정렬된 매칭 결과
+        """
+        if not text:
+            return []
+        categories = set(categories) if categories is not None else None
+
+        indices = sorted(
+            index
+            for pattern_id in self.matched_patterns(text)
+            for index in self._pattern_entries[pattern_id]
+        )
+
+        matches = []
+        seen = set()
+        for index in indices:
+            entry = self.entries[index]
+            if categories is not None and entry.category not in categories:
+                continue
+            key = (entry.category, entry.standard_name)
+            if key in seen:
+                continue
+            seen.add(key)
+            matches.append(entry)
+        return matches
+
+
+class AliasCatalog:
+    """
+    모든 매니저의 별칭을 카테고리 정보와 함께 한 곳에 모은 구조.
+    정규화된 별칭 -> 매칭 항목 색인, 별칭 -> 표준 이름 태그 매핑, 별칭 매처를 한 번만 만들어 공유합니다.
+    카탈로그의 매니저는 여러 곳에서 함께 쓰므로 읽기 전용으로 취급합니다.
+    별칭을 추가해야 하면 매니저의 add_alias()를 사용하세요. 카탈로그의 색인/매핑/매처가 함께 다시 만들어집니다.
+    (lookup()/get_standard_name()은 대소문자와 끝 콤마를 무시하고, 매니저의 get_standard_name()은 정확히 일치하는 별칭만 찾습니다.)
+
+    Args:
+        managers: (카테고리, 매니저 인스턴스) 목록 (기본값: MANAGER_CATEGORIES)
+    """
+
+    def __init__(self, managers: Iterable[Tuple[str, object]] = None):
+        if managers is None:
+            managers = [(category, manager_class()) for category, manager_class in MANAGER_CATEGORIES]
+        self.managers: Dict[str, object] = dict(managers)
+        self._lock = threading.RLock()
+        self.rebuild()
+        for manager in self.managers.values():
+            manager.add_listener(self.rebuild)
+
+    def rebuild(self) -> None:
+        """매니저의 현재 별칭으로 항목/색인/태그 매핑을 다시 만들고 매처는 다음 사용 시 다시 컴파일합니다."""
+        entries: List[AliasMatch] = []
+        index: Dict[str, List[AliasMatch]] = {}
+        tag_mapping: Dict[str, str] = {}
+        for category, manager in self.managers.items():
+            for standard_name, item in manager.items.items():
+                for alias in item.aliases:
+                    entry = AliasMatch(alias, standard_name, category)
+                    entries.append(entry)
+                    index.setdefault(normalize_alias(alias), []).append(entry)
+                    # 기존 create_tag_mapping()과 같이 뒤의 매니저가 같은 별칭을 덮어씀
+                    tag_mapping[alias] = standard_name
+
+        with self._lock:
+            self.entries = entries
+            self.index = index
+            self.tag_mapping = tag_mapping
+            self._matcher = None
+
+    def lookup(self, alias: str, category: Optional[str] = None) -> List[AliasMatch]:
+        """별칭(대소문자/끝 콤마 무시)에 해당하는 항목을 반환합니다."""
+        entries = self.index.get(normalize_alias(alias), [])
+        if category is not None:
+            entries = [entry for entry in entries if entry.category == category]
+        return entries
+
+    def get_standard_name(self, alias: str, category: Optional[str] = None) -> Optional[str]:
+        """별칭의 표준 이름을 반환합니다. 없으면 None."""
+        entries = self.lookup(alias, category)
+        return entries[0].standard_name if entries else None
+
+    @property
+    def matcher(self) -> AliasMatcher:
+        """이 카탈로그의 항목으로 만든 AliasMatcher (최초 사용 시 1회 생성)"""
+        with self._lock:
+            if self._matcher is None:
+                self._matcher = AliasMatcher(self.entries)
+            return self._matcher
+
+
+def build_alias_matcher(managers: Iterable[Tuple[str, object]] = None) -> AliasMatcher:
+    """
+    (카테고리, 매니저 인스턴스) 목록으로 AliasMatcher를 만듭니다. 없으면 MANAGER_CATEGORIES를 사용합니다.
+    """
+    return AliasCatalog(managers).matcher
+
+
+_catalog: Optional[AliasCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_alias_catalog() -> AliasCatalog:
+    """
+    모든 매니저로 만든 프로세스 전역 AliasCatalog를 반환합니다.
+    최초 호출 시 1회만 만들고 이후에는 모든 폴더/스레드가 공유합니다.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = AliasCatalog()
+        return _catalog
+
+
+def get_alias_matcher() -> AliasMatcher:
+    """프로세스 전역 AliasCatalog의 AliasMatcher를 반환합니다."""
+    return get_alias_catalog().matcher
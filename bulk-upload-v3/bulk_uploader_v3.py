@@ -4,15 +4,21 @@ import sys
 import io
 import logging
 import re
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Optional
 import time
 import functools
+import json
+import uuid
+import struct
+import zlib
+import queue
+import threading
 from ssl import SSLError
 import psycopg2
 
 
 # Third Party Libraries
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from PIL import Image, PngImagePlugin
 import piexif
 import piexif.helper
@@ -21,6 +27,7 @@ from google.cloud import storage
 from google.oauth2 import service_account
 
 # Database
+from sqlalchemy import insert, inspect as sa_inspect
 from sqlalchemy.orm import Session
 
 
@@ -32,12 +39,20 @@ from models import (
     ColorCodeTags,
     SdModel,
     Project,
-    ComfyUiWorkflow
+    ComfyUiWorkflow,
+    ResourceTagV2
 )
-from manager import CharacterManager, OutfitManager, EventManager, InstrumentManager, PlaveManager
-from resource_embedding_helper import ResourceEmbeddingHelper
+from resource_embedding_helper import ResourceEmbeddingHelper, EmbeddingService, EmbeddingJob, DEFAULT_EMBEDDING_QPS
+from embedding_queue import EmbeddingQueue, STATUS_PENDING
+from generation_params import parse_generation_parameters
+from png_chunk_reader import read_geninfo, read_metadata, geninfo_from_metadata, PNG_SIGNATURE
+from content_hash_index import ContentHashIndex, hash_file, hash_bytes
+from tag_cache import get_tag_cache
+from alias_matcher import get_alias_catalog, get_alias_matcher, CATEGORY_PLAVE
 
-from session_utills import get_session, end_session, check_connection, upload_to_bucket, upload_image_to_gcp_bucket
+from session_utills import get_session, end_session, check_connection, upload_image_to_gcp_bucket, configure_storage_client, upload_blobs, BlobUploadError, delete_blobs, get_connection_broker, ResumableSessionStore
+
+PENDING_UUIDS_FILE_NAME = 'pending_resource_uuids.json'
 
 def retry_on_connection_error(max_retries=3):
     def decorator(func):
@@ -105,6 +120,7 @@ class PngUtill:
         """
         스테이블 디퓨전 생성 파라미터를 파싱합니다.
         네거티브 프롬프트를 기준으로 프롬프트와 파라미터를 분리합니다.
+        (실제 파싱은 generation_params 모듈의 단일 패스 파서가 담당)
         
         Args:
             x (str): 파싱할 생성 파라미터 문자열
@@ -112,149 +128,7 @@ class PngUtill:
         Returns:
             dict: 파싱된 파라미터를 담은 딕셔너리
         """
-        import re
-        
-        res = {}
-        
-        # 네거티브 프롬프트 위치 찾기
-        neg_prompt_pattern = r'Negative prompt:'
-        neg_prompt_match = re.search(neg_prompt_pattern, x)
-        
-        if neg_prompt_match:
-            # 네거티브 프롬프트 시작 위치
-            neg_start = neg_prompt_match.start()
-            
-            # 프롬프트 추출 (네거티브 프롬프트 이전 텍스트)
-            prompt = x[:neg_start].strip()
-            res["Prompt"] = prompt
-            
-            # 네거티브 프롬프트 이후 텍스트 가져오기
-            remaining_text = x[neg_start:]
-            
-            # 네거티브 프롬프트와 파라미터 분리
-            # 첫 번째 쉼표+공백 기준으로 나누기 (예: "Steps: 32")
-            params_pattern = r'Steps:'
-            params_match = re.search(params_pattern, remaining_text)
-            
-            if params_match:
-                params_start = params_match.start()
-                
-                # 네거티브 프롬프트 추출
-                neg_prompt = remaining_text[:params_start].replace('Negative prompt:', '', 1).strip()
-                res["Negative prompt"] = neg_prompt
-                
-                # 파라미터 추출
-                params_text = remaining_text[params_start:]
-                
-                # 주요 파라미터 추출
-                # 추출할 주요 파라미터
-                keys = [
-                    "Steps", "Sampler", "CFG scale", "Seed", "Size", 
-                    "Model hash", "Model", "VAE hash", "VAE", 
-                    "Denoising strength", "Clip skip", "Hires upscale",
-                    "Hires upscaler", "Schedule type"
-                ]
-                
-                # 각 파라미터 추출
-                for key in keys:
-                    # 정규식을 사용하여 파라미터 찾기
-                    # 패턴 1: "키: 값," 형태 (쉼표로 끝나는 경우)
-                    pattern1 = fr'{re.escape(key)}: ([^,]+),'
-                    match1 = re.search(pattern1, params_text)
-                    
-                    if match1:
-                        value = match1.group(1).strip()
-                        res[key] = value
-                        continue
-                        
-                    # 패턴 2: "키: 값" 형태 (줄 끝이나 문자열 끝에 있는 경우)
-                    pattern2 = fr'{re.escape(key)}: ([^\n,]+)(?:\n|$)'
-                    match2 = re.search(pattern2, params_text)
-                    
-                    if match2:
-                        value = match2.group(1).strip()
-                        res[key] = value
-                
-                # ControlNet 관련 패턴 추출
-                controlnet_patterns = re.findall(r'ControlNet \d+: "(.*?)"', params_text, re.DOTALL)
-                for idx, cn_content in enumerate(controlnet_patterns):
-                    # ControlNet 내부의 키-값 쌍을 추출
-                    cn_dict = {}
-                    cn_pairs = re.findall(r'(\w+): ([^,]+)', cn_content)
-                    for key, value in cn_pairs:
-                        cn_dict[key.strip()] = value.strip()
-                    res[f"ControlNet {idx}"] = cn_dict
-                
-                # Lora 해시 추출
-                lora_hash_match = re.search(r'Lora hashes: "(.*?)"', params_text)
-                if lora_hash_match:
-                    res["Lora hashes"] = lora_hash_match.group(1).strip()
-                    
-            else:
-                # Steps가 없는 경우 전체를 네거티브 프롬프트로 처리
-                res["Negative prompt"] = remaining_text.replace('Negative prompt:', '', 1).strip()
-        else:
-            # 네거티브 프롬프트가 없는 경우
-            # Steps나 다른 파라미터 찾기
-            params_match = re.search(r'Steps:', x)
-            
-            if params_match:
-                params_start = params_match.start()
-                
-                # 프롬프트 추출
-                prompt = x[:params_start].strip()
-                res["Prompt"] = prompt
-                
-                # 파라미터 추출
-                params_text = x[params_start:]
-                
-                # 주요 파라미터 추출
-                keys = [
-                    "Steps", "Sampler", "CFG scale", "Seed", "Size", 
-                    "Model hash", "Model", "VAE hash", "VAE", 
-                    "Denoising strength", "Clip skip", "Hires upscale",
-                    "Hires upscaler", "Schedule type"
-                ]
-                
-                # 각 파라미터 추출
-                for key in keys:
-                    # 정규식을 사용하여 파라미터 찾기
-                    # 패턴 1: "키: 값," 형태 (쉼표로 끝나는 경우)
-                    pattern1 = fr'{re.escape(key)}: ([^,]+),'
-                    match1 = re.search(pattern1, params_text)
-                    
-                    if match1:
-                        value = match1.group(1).strip()
-                        res[key] = value
-                        continue
-                        
-                    # 패턴 2: "키: 값" 형태 (줄 끝이나 문자열 끝에 있는 경우)
-                    pattern2 = fr'{re.escape(key)}: ([^\n,]+)(?:\n|$)'
-                    match2 = re.search(pattern2, params_text)
-                    
-                    if match2:
-                        value = match2.group(1).strip()
-                        res[key] = value
-                
-                # ControlNet 관련 패턴 추출
-                controlnet_patterns = re.findall(r'ControlNet \d+: "(.*?)"', params_text, re.DOTALL)
-                for idx, cn_content in enumerate(controlnet_patterns):
-                    # ControlNet 내부의 키-값 쌍을 추출
-                    cn_dict = {}
-                    cn_pairs = re.findall(r'(\w+): ([^,]+)', cn_content)
-                    for key, value in cn_pairs:
-                        cn_dict[key.strip()] = value.strip()
-                    res[f"ControlNet {idx}"] = cn_dict
-                
-                # Lora 해시 추출
-                lora_hash_match = re.search(r'Lora hashes: "(.*?)"', params_text)
-                if lora_hash_match:
-                    res["Lora hashes"] = lora_hash_match.group(1).strip()
-            else:
-                # 파라미터가 없는 경우 전체를 프롬프트로 처리
-                res["Prompt"] = x.strip()
-        
-        return res
+        return parse_generation_parameters(x)
 
     def geninfo_params(self, image):
         try:
@@ -269,6 +143,26 @@ class PngUtill:
         except Exception as e:
             print("Error:", str(e))
 
+    def geninfo_params_from_file(self, image_path: str, use_mmap: bool = False):
+        """
+        이미지를 Pillow로 열지 않고 헤더 청크만 읽어 geninfo와 파라미터를 반환합니다.
+        (픽셀 데이터가 필요 없으므로 IDAT 이후는 읽지 않음)
+        """
+        geninfo = read_geninfo(image_path, use_mmap=use_mmap)
+        if geninfo is None:
+            return None, None
+        return geninfo, self.parse_generation_parameters(geninfo)
+
+    def geninfo_params_from_bytes(self, data: bytes):
+        """
+        이미 메모리에 읽은 파일 바이트에서 헤더 청크만 파싱하여 geninfo와 파라미터를 반환합니다.
+        (geninfo_params_from_file()과 같은 결과, 파일을 다시 열지 않음)
+        """
+        geninfo = geninfo_from_metadata(read_metadata(io.BytesIO(data)))
+        if geninfo is None:
+            return None, None
+        return geninfo, self.parse_generation_parameters(geninfo)
+
     def scale_image_by_height(self, original_image, height):
         aspect_ratio = original_image.width / original_image.height
         new_width = int(height * aspect_ratio)
@@ -282,17 +176,144 @@ class PngUtill:
         original_image = Image.open(image_path)
         resized_images = {height: self.scale_image_by_height(original_image, height) for height in heights}
         return original_image, resized_images[128], resized_images[192], resized_images[512]
+
+    def downscale_by_height(self, image: Image.Image, height: int) -> Image.Image:
+        """
+        높이 기준으로 이미지를 축소합니다.
+        목표 크기의 2배 이상 크면 reduce()로 정수배 축소를 먼저 한 뒤 resize()로 마무리합니다.
+        """
+        width = max(1, int(height * image.width / image.height))
+        factor = min(image.width // width, image.height // height) // 2
+        if factor > 1 and image.mode not in ('P', '1'):
+            image = image.reduce(factor)
+        return image.resize((width, height))
+
+    def encode_png(self, image: Image.Image) -> bytes:
+        """이미지를 업로드용 PNG 바이트로 인코딩합니다."""
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def insert_png_chunk(self, png_data: bytes, chunk_type: bytes, chunk_data: bytes) -> bytes:
+        """
+        PNG 바이트의 IEND 청크 바로 앞에 사용자 정의 청크를 삽입합니다. (재인코딩 없음)
+        청크 길이를 따라가며 IEND를 찾으므로 다른 청크 데이터 안의 b'IEND' 바이트는 무시합니다.
+
+        Raises:
+            ValueError: PNG 데이터가 아니거나 IEND 청크가 없는 경우
+        """
+        if not png_data.startswith(PNG_SIGNATURE):
+            raise ValueError("PNG 데이터가 아닙니다.")
+
+        crc = zlib.crc32(chunk_type + chunk_data)
+        custom_chunk = struct.pack('>I', len(chunk_data)) + chunk_type + chunk_data + struct.pack('>I', crc)
+
+        # 청크 구조: 길이(4) + 타입(4) + 데이터(길이) + CRC(4)
+        offset = len(PNG_SIGNATURE)
+        while offset + 8 <= len(png_data):
+            length, = struct.unpack_from('>I', png_data, offset)
+            if png_data[offset + 4:offset + 8] == b'IEND':
+                return png_data[:offset] + custom_chunk + png_data[offset:]
+            offset += 12 + length
+        raise ValueError("PNG 데이터에서 IEND 청크를 찾을 수 없습니다.")
+
+    def build_thumbnail_pyramid(self, source, heights=(512, 192, 128)) -> Dict[int, bytes]:
+        """
+        원본을 한 번만 디코딩하여 여러 크기의 썸네일을 만들고 PNG 바이트로 반환합니다.
+        가장 큰 썸네일은 원본에서, 나머지는 바로 위 단계의 썸네일에서 축소합니다.
+
+        Args:
+            source: 이미지 경로, 파일 바이트 또는 이미 열린 PIL 이미지
+                (경로/바이트로 주면 JPEG는 draft로 축소 디코딩하므로 JPEG는 이 방식으로 호출)
+            heights: 생성할 썸네일 높이 목록
+
+        Returns:
+            Dict[int, bytes]: 높이 -> 인코딩된 PNG 바이트
+        """
+        heights = sorted(heights, reverse=True)
+
+        if isinstance(source, Image.Image):
+            image = source
+        else:
+            image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+            # JPEG는 디코딩 단계에서 바로 축소 (PNG는 무시됨)
+            target_width = max(1, int(heights[0] * image.width / image.height))
+            image.draft(image.mode, (target_width, heights[0]))
+
+        thumbnails = {}
+        previous = image
+        for height in heights:
+            previous = self.downscale_by_height(previous, height)
+            thumbnails[height] = self.encode_png(previous)
+
+        return thumbnails
+
+def prepare_image(image_path: str, pass_through_original: bool = True) -> Dict[str, Any]:
+    """
+    이미지 디코딩/리사이즈/인코딩 등 CPU 작업만 수행합니다.
+    ProcessPoolExecutor에서 실행되므로 피클 가능한 값(바이트, 문자열, 숫자)만 반환합니다.
+
+    Args:
+        image_path: 처리할 이미지 경로
+        pass_through_original: True면 PNG 원본 파일 바이트를 재인코딩 없이 그대로 업로드에 사용
+            (PNG가 아닌 파일은 항상 PNG로 인코딩)
+
+    Returns:
+        dict: 업로드에 필요한 바이트 버퍼와 메타데이터
+    """
+    png_util = PngUtill()
+    with open(image_path, 'rb') as f:
+        file_data = f.read()
+
+    original = None
+    if pass_through_original and file_data.startswith(PNG_SIGNATURE):
+        original = file_data
+
+    # 생성 정보는 이미 읽은 바이트에서 헤더 청크만 파싱 (파일을 다시 열지 않음)
+    geninfo, params = png_util.geninfo_params_from_bytes(file_data)
+
+    with Image.open(io.BytesIO(file_data)) as original_image:
+        if original is None:
+            original = png_util.encode_png(original_image)
+        if original_image.format == 'JPEG':
+            # 원본 인코딩용 전체 디코딩과 별도로, 썸네일은 draft로 축소 디코딩한 이미지에서 만듦
+            thumbnails = png_util.build_thumbnail_pyramid(file_data)
+        else:
+            # draft가 적용되지 않는 형식은 한 번 디코딩한 이미지를 그대로 사용
+            thumbnails = png_util.build_thumbnail_pyramid(original_image)
+
+        return {
+            "image_path": image_path,
+            # 원본 파일 바이트 해시 (중단된 업로드를 다음 실행에서 같은 리소스 UUID로 이어받는 데 사용)
+            "source_hash": hash_bytes(file_data),
+            "original": original,
+            "thumbnails": thumbnails,
+            "width": original_image.width,
+            "height": original_image.height,
+            "geninfo": geninfo,
+            "params": params,
+        }
+
 # ------------------------------
 #  PromptParser
 # ------------------------------
 class PromptParser:
     def __init__(self):
-        self.tag_mapping = create_tag_mapping()
         # Lora 태그를 찾기 위한 정규식 패턴
         self.lora_regex = r'<lora:([^:]+):([0-9.]+)>'
         self.lora_without_weight_regex = r'<lora:([^:>]+)>'
         self.added_tag_ids = set()
-        self.plave_manager = PlaveManager()
+        self.tag_cache = get_tag_cache()
+
+    @property
+    def alias_matcher(self):
+        """프로세스 전역 별칭 매처 (카탈로그의 별칭이 바뀌면 다시 컴파일된 매처를 반환)"""
+        return get_alias_matcher()
+
+    @property
+    def tag_mapping(self):
+        """별칭 -> 표준 이름 매핑 (모든 PromptParser가 같은 카탈로그를 읽기 전용으로 공유)"""
+        return get_alias_catalog().tag_mapping
 
     def _check_plave_members(self, prompt_text: str) -> List[str]:
         """
@@ -304,41 +325,22 @@ class PromptParser:
         Returns:
             list: 감지된 플레이브 멤버 이름 목록
         """
-        lower_prompt = prompt_text.lower()
         detected_members = []
         
-        # 각 플레이브 멤버의 별칭 확인
-        for member_name, item in self.plave_manager.items.items():
-            for alias in item.aliases:
-                # 콤마 제거하여 비교
-                # clean_alias = alias.rstrip(',')
-                if alias.lower() in lower_prompt:
-                    detected_members.append(member_name)
-                    print(f"플레이브 멤버 발견: {member_name} (별칭: {alias})")
-                    break
+        # 각 플레이브 멤버의 별칭 확인 (별칭 매처로 한 번에 검사)
+        for match in self.alias_matcher.scan(prompt_text, categories=[CATEGORY_PLAVE]):
+            detected_members.append(match.standard_name)
+            print(f"플레이브 멤버 발견: {match.standard_name} (별칭: {match.alias})")
         
         return detected_members
 
     def _get_or_create_tag(self, session: Session, tag_name: str) -> ColorCodeTags:
         """
-        주어진 태그 이름으로 태그를 조회하거나 없으면 새로 생성합니다.
+        주어진 태그 이름으로 태그를 조회하거나 없으면 새로 생성합니다. (태그 캐시 사용)
+        기존과 같이 타입과 상관없이 이름으로 찾습니다.
         """
-        try:
-            tag = session.query(ColorCodeTags).filter_by(tag=tag_name).first()
-            if tag is None:
-                tag = ColorCodeTags(
-                    tag=tag_name,
-                    color_code='#FFFFFF'
-                )
-                session.add(tag)
-                session.commit()
-                logging.info(f"새로운 태그 생성됨: {tag_name}")
-            return tag
-            
-        except Exception as e:
-            session.rollback()
-            logging.error(f"태그 생성/조회 중 오류 발생: {str(e)}")
-            raise
+        tag_id = self.tag_cache.get_or_create_id(tag_name, tag_type=None)
+        return session.get(ColorCodeTags, tag_id)
 
     def _extract_lora_tags(self, prompt_text: str) -> List[Tuple[str, float]]:
         """
@@ -360,6 +362,39 @@ class PromptParser:
         # 모든 Lora 태그 결합
         return weighted_loras + unweighted_loras
     
+    def collect_prompt_tag_ids(self, prompt_text: str) -> List[int]:
+        """
+        프롬프트에서 매칭되는 태그(태그 매핑, Lora, PLAVE)의 ID를 중복 없이 찾습니다.
+        없는 태그는 태그 캐시가 한 번에 생성하지만 리소스에는 연결하지 않습니다.
+        """
+        tag_names = []
+        
+        # 매니저 별칭 매칭 (프롬프트를 한 번만 훑음)
+        for match in self.alias_matcher.scan(prompt_text):
+            print(f"매칭된 검색어: {match.alias} -> 태그: {match.standard_name}")
+            tag_names.append(match.standard_name)
+        
+        # Lora 태그 처리
+        lora_tag_names = self._collect_lora_tag_names(prompt_text)
+        print(f"Lora 태그 처리 결과: {len(lora_tag_names)}개")
+        tag_names.extend(lora_tag_names)
+        
+        # 플레이브 멤버 체크 및 PLAVE 태그 추가
+        plave_members = self._check_plave_members(prompt_text)
+        if plave_members:
+            print(f"PLAVE 태그 추가 (발견된 멤버: {', '.join(plave_members)})")
+            tag_names.append("PLAVE")
+
+        # 기존과 같이 타입과 상관없이 이름으로 찾음 (새 태그는 'normal')
+        tag_ids = self.tag_cache.get_or_create_ids(tag_names, tag_type=None)
+        return list(dict.fromkeys(tag_ids[name] for name in tag_names))
+
+    def collect_prompt_tags(self, session: Session, prompt_text: str) -> List[ColorCodeTags]:
+        """
+        collect_prompt_tag_ids()로 찾은 태그를 세션의 태그 객체로 한 번에 읽어 옵니다.
+        """
+        return self.tag_cache.load_tags(session, self.collect_prompt_tag_ids(prompt_text))
+
     @retry_on_connection_error()
     def _process_single_resource(self, session: Session, resource: Resource, prompt_text: str) -> int:
         """
@@ -368,58 +403,25 @@ class PromptParser:
         print(f"\n리소스 ID {resource.id} 처리 시작")
         print(f"프롬프트: {prompt_text[:100]}...")
         
-        converted_count = 0
-        added_tag_ids = set()  # 이미 추가된 태그 ID를 추적
-        
-        # 기존 태그 매핑 처리
-        for search_term, tag_name in self.tag_mapping.items():
-            if search_term.lower() in prompt_text.lower():
-                print(f"매칭된 검색어: {search_term} -> 태그: {tag_name}")
-                converted_tag = self._get_or_create_tag(session, tag_name)
-                if converted_tag and converted_tag.id not in added_tag_ids:
-                    print(f"태그 추가: {tag_name} (ID: {converted_tag.id})")
-                    resource.tags.append(converted_tag)
-                    added_tag_ids.add(converted_tag.id)
-                    converted_count += 1
-                else:
-                    print(f"태그 중복 건너뛰기: {tag_name}")
-        
-        # Lora 태그 처리
         try:
-            lora_count = self._process_lora_tags(session, resource, prompt_text, added_tag_ids)
-            print(f"Lora 태그 처리 결과: {lora_count}개")
-            converted_count += lora_count
-            
-            # 플레이브 멤버 체크 및 PLAVE 태그 추가
-            plave_members = self._check_plave_members(prompt_text)
-            if plave_members:
-                # PLAVE 태그 찾기 또는 생성
-                plave_tag = self._get_or_create_tag(session, "PLAVE")
-                
-                # 이미 추가된 태그가 아니면 추가
-                if plave_tag and plave_tag.id not in added_tag_ids:
-                    print(f"PLAVE 태그 추가 (발견된 멤버: {', '.join(plave_members)})")
-                    resource.tags.append(plave_tag)
-                    added_tag_ids.add(plave_tag.id)
-                    converted_count += 1
-                else:
-                    print("PLAVE 태그가 이미 추가되어 있습니다.")
+            tags = self.collect_prompt_tags(session, prompt_text)
+            resource.tags.extend(tags)
             
-            print(f"리소스 {resource.id}에 총 {converted_count}개 태그 추가됨")
+            print(f"리소스 {resource.id}에 총 {len(tags)}개 태그 추가됨")
             session.flush()
-            return converted_count
+            return len(tags)
         except Exception as e:
             print(f"태그 처리 중 오류 발생: {str(e)}")
             raise
 
-    def _process_lora_tags(self, session: Session, resource: Resource, prompt_text: str, added_tag_ids: set) -> int:
+    def _collect_lora_tag_names(self, prompt_text: str) -> List[str]:
         """
-        프롬프트 텍스트에서 Lora 태그를 처리하고 리소스에 태그를 추가합니다.
+        프롬프트 텍스트에서 Lora 태그를 찾아 (태그 매핑을 적용한) 태그 이름 목록으로 반환합니다.
         """
         if not prompt_text:
-            return 0
+            return []
             
-        converted_count = 0
+        tag_names = []
         lora_tags = self._extract_lora_tags(prompt_text)
         print(f"\nLora 태그 추출 결과: {lora_tags}")
         
@@ -430,17 +432,9 @@ class PromptParser:
             else:
                 tag_name = model_name
                 print(f"Lora 직접 사용: {model_name}")
-            
-            base_tag = self._get_or_create_tag(session, tag_name)
-            if base_tag and base_tag.id not in added_tag_ids:
-                print(f"Lora 태그 추가: {tag_name} (ID: {base_tag.id})")
-                resource.tags.append(base_tag)
-                added_tag_ids.add(base_tag.id)
-                converted_count += 1
-            else:
-                print(f"Lora 태그 중복 건너뛰기: {tag_name}")
+            tag_names.append(tag_name)
         
-        return converted_count
+        return tag_names
 
     def process_resources(self, session: Session, resources: List[Resource], prompt_field: str = 'prompt') -> int:
         """
@@ -459,112 +453,159 @@ class PromptParser:
 #  New Resource
 # ------------------------------
 class CreateResource:
-    def __init__(self):
-        pass
+    def __init__(self, inject_nsst: bool = False, pending_uuids_path: str = None):
+        """
+        Args:
+            inject_nsst: True면 업로드 전 원본 PNG에 nsSt 청크(리소스 uuid/id/생성일)를 삽입
+            pending_uuids_path: 업로드 중인 원본 파일 해시 -> 리소스 UUID 기록 파일
+                (기본값: 스크립트 폴더의 pending_resource_uuids.json)
+        """
+        self.png_util = PngUtill()
+        self.inject_nsst = inject_nsst
+        if pending_uuids_path is None:
+            pending_uuids_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), PENDING_UUIDS_FILE_NAME)
+        # 실행이 중단된 뒤 다시 실행해도 같은 블롭 이름으로 올려서 재개 가능한 업로드를 이어받도록 UUID를 저장
+        self.pending_uuids = ResumableSessionStore(pending_uuids_path)
 
-    def create_resource(self, user_id: int, original_image: Image.Image, 
-                    image_128: Image.Image, image_192: Image.Image, image_512: Image.Image, 
-                    session: Session, project_id: int = None, workflow_id: int = None) -> Resource:
-        """Create a new resource with uploaded images"""
-        try:
-            # Create new resource
-            new_resource = Resource(user_id=user_id, challenge_points=0)
-            
-            # 이미지 크기는 나중에 메타데이터에서 설정하거나 실제 크기 사용
-            # 여기서는 기본값만 설정 (제거됨)
-            
-            # 프로젝트 ID가 지정된 경우 리소스에 연결
-            if project_id is not None:
-                new_resource.project_id = project_id
+    def _reserve_uuid(self, source_key: Optional[str], session: Session) -> uuid.UUID:
+        """
+        원본 파일에 쓸 리소스 UUID를 정합니다.
+        이전 실행에서 같은 파일을 올리다 중단되었으면 그때의 UUID를 다시 쓰고, 아니면 새로 만들어 기록합니다.
+        """
+        if source_key is None:
+            return uuid.uuid4()
+        entry = self.pending_uuids.get(source_key)
+        if entry is not None:
+            resource_uuid = uuid.UUID(entry['uuid'])
+            # 커밋 직후 기록을 지우기 전에 중단된 경우에는 이미 리소스가 있으므로 새 UUID 사용
+            if session.query(Resource.id).filter(Resource.uuid == resource_uuid).first() is None:
+                logging.info(f"이전 실행의 업로드를 이어서 진행합니다: {resource_uuid}")
+                return resource_uuid
+        resource_uuid = uuid.uuid4()
+        self.pending_uuids.put(source_key, {'uuid': str(resource_uuid)})
+        return resource_uuid
+
+    def release_uuid(self, source_key: Optional[str]) -> None:
+        """리소스가 커밋된 뒤 원본 파일의 UUID 기록을 지웁니다."""
+        if source_key is not None:
+            self.pending_uuids.remove(source_key)
+
+    def _build_nsst_chunk(self, resource: Resource) -> bytes:
+        """v2 create_resource와 같은 형식의 nsSt 청크 데이터를 만듭니다."""
+        return json.dumps({
+            "my_uuid": str(resource.uuid),
+            "id": str(resource.id),
+            "created_at": str(resource.created_at),
+            "controlnet_uuid": ""
+        }).encode('utf-8')
+
+    def create_resource(self, user_id: int, original: bytes, 
+                    thumbnails: Dict[int, bytes], 
+                    session: Session, project_id: int = None, workflow_id: int = None,
+                    add_to_session: bool = True, source_key: str = None) -> Resource:
+        """
+        이미지를 업로드하고 새 리소스를 세션에 추가합니다. (커밋은 호출자가 한 번에 수행)
+        uuid를 미리 만들어 업로드를 먼저 하므로, 업로드가 실패하면 DB 작업은 전혀 일어나지 않습니다.
+        add_to_session=False면 세션에 추가하지 않은 리소스 객체만 반환합니다. (배치 INSERT용)
+        source_key(원본 파일 해시)가 주어지면 중단된 이전 실행과 같은 uuid를 쓰며, 커밋 후 release_uuid()를 호출해야 합니다.
+        """
+        # Create new resource
+        new_resource = Resource(user_id=user_id, challenge_points=0, uuid=self._reserve_uuid(source_key, session))
+        
+        # 프로젝트 ID가 지정된 경우 리소스에 연결
+        if project_id is not None:
+            new_resource.project_id = project_id
 
-            if workflow_id is not None:
-                new_resource.use_workflow_id = workflow_id
-                
-            session.add(new_resource)
-            session.flush()  # Get the ID without committing
-            
-            # Upload images
-            try:
-                self._upload_images(new_resource, original_image, image_128, image_192, image_512)
-                session.commit()
-                return new_resource
-            except Exception as e:
-                session.rollback()
-                logging.error(f"Failed to upload images: {str(e)}")
-                raise
+        if workflow_id is not None:
+            new_resource.use_workflow_id = workflow_id
 
+        if self.inject_nsst:
+            # nsSt 청크에 id/created_at이 필요하므로 업로드 전에 INSERT (커밋은 하지 않음)
+            session.add(new_resource)
+            session.flush()
+        
+        # Upload images
+        try:
+            self._upload_images(new_resource, original, thumbnails, source_key)
         except Exception as e:
-            session.rollback()
-            logging.error(f"Failed to create resource: {str(e)}")
+            logging.error(f"Failed to upload images: {str(e)}")
             raise
+
+        if add_to_session:
+            session.add(new_resource)
+        return new_resource
     
-    def _upload_images(self, resource: Resource, original_image: Image.Image,
-                    image_128: Image.Image, image_192: Image.Image, image_512: Image.Image) -> None:
+    def _upload_images(self, resource: Resource, original: bytes,
+                    thumbnails: Dict[int, bytes], source_key: str = None) -> None:
         """Upload original and thumbnail images to storage
         
         Args:
             resource: Resource object to update
-            original_image: Original PIL image
-            image_128: Thumbnail image (128px)
-            image_192: Thumbnail image (192px)
-            image_512: Thumbnail image (512px)
-        """
-        # Convert images to bytes
-        original_buffer = io.BytesIO()
-        original_image.save(original_buffer, format="PNG")
-        original_buffer.seek(0)
-
-        image_128_buffer = io.BytesIO()
-        image_128.save(image_128_buffer, format="PNG")
-        image_128_buffer.seek(0)
-        
-        image_192_buffer = io.BytesIO()
-        image_192.save(image_192_buffer, format="PNG")
-        image_192_buffer.seek(0)
-
-        image_512_buffer = io.BytesIO()
-        image_512.save(image_512_buffer, format="PNG")
-        image_512_buffer.seek(0)
+            original: Encoded original PNG bytes
+            thumbnails: Encoded PNG thumbnails keyed by height (128, 192, 512)
+            source_key: 원본 파일 해시. 주어지면 일부 블롭만 실패했을 때 성공한 블롭을 기록해 두고,
+                다음 시도(같은 uuid)에서는 내용이 같은 블롭을 다시 보내지 않음.
+                없으면 다시 같은 uuid로 올릴 수 없으므로 성공한 블롭을 삭제함
+        """
+        if self.inject_nsst:
+            original = self.png_util.insert_png_chunk(original, b'nsSt', self._build_nsst_chunk(resource))
+
+        # 블롭 이름 -> (리소스 속성, 데이터)
+        blobs = {
+            f"_media/resource/{resource.uuid}.png": ("image", original),
+            f"_media/resource_thumbnail/{resource.uuid}_128.png": ("thumbnail_image", thumbnails[128]),
+            f"_media/thumbnail_192/{resource.uuid}_192.png": ("thumbnail_image_192", thumbnails[192]),
+            f"_media/thumbnail_512/{resource.uuid}_512.png": ("thumbnail_image_512", thumbnails[512]),
+        }
+        data_hashes = {blob_name: hash_bytes(data) for blob_name, (_, data) in blobs.items()}
+
+        # 이전 시도에서 같은 uuid로 이미 올라간 블롭 (내용이 같을 때만 다시 보내지 않음)
+        entry = self.pending_uuids.get(source_key) if source_key is not None else None
+        previous = {}
+        if entry is not None and entry.get('uuid') == str(resource.uuid):
+            previous = entry.get('uploaded', {})
+        uploaded = {
+            blob_name: previous[blob_name]['name']
+            for blob_name in blobs
+            if blob_name in previous and previous[blob_name]['hash'] == data_hashes[blob_name]
+        }
+        if uploaded:
+            logging.info(f"이전에 올라간 블롭 {len(uploaded)}개는 다시 보내지 않습니다: {resource.uuid}")
 
         try:
-            # Upload original image
-            original_blob_name = f"_media/resource/{resource.uuid}.png"
-            resource.image = upload_to_bucket(
-                original_blob_name,
-                original_buffer.getvalue(),
-                "wcidfu-bucket"
-            )
-
-            # Upload 128px thumbnail
-            thumb_128_blob_name = f"_media/resource_thumbnail/{resource.uuid}_128.png"
-            resource.thumbnail_image = upload_to_bucket(
-                thumb_128_blob_name,
-                image_128_buffer.getvalue(),
+            # 남은 블롭을 동시에 업로드 (블롭별로 실패한 것만 재시도)
+            uploaded.update(upload_blobs(
+                {blob_name: data for blob_name, (_, data) in blobs.items() if blob_name not in uploaded},
                 "wcidfu-bucket"
+            ))
+        except BlobUploadError as e:
+            logging.error(
+                f"Failed to upload images for resource {resource.uuid}: "
+                f"uploaded={list(e.uploaded)}, failed={list(e.failed)}"
             )
-            
-            # Upload 192px thumbnail
-            thumb_192_blob_name = f"_media/thumbnail_192/{resource.uuid}_192.png"
-            resource.thumbnail_image_192 = upload_to_bucket(
-                thumb_192_blob_name,
-                image_192_buffer.getvalue(),
-                "wcidfu-bucket"
-            )
-
-            # Upload 512px thumbnail
-            thumb_512_blob_name = f"_media/thumbnail_512/{resource.uuid}_512.png"
-            resource.thumbnail_image_512 = upload_to_bucket(
-                thumb_512_blob_name,
-                image_512_buffer.getvalue(),
-                "wcidfu-bucket"
-            )
-
+            if source_key is not None:
+                # 다음 시도에서 실패한 블롭만 보내도록 성공한 블롭을 uuid와 함께 기록
+                uploaded.update(e.uploaded)
+                self.pending_uuids.put(source_key, {
+                    'uuid': str(resource.uuid),
+                    'uploaded': {
+                        blob_name: {'name': name, 'hash': data_hashes[blob_name]}
+                        for blob_name, name in uploaded.items()
+                    },
+                })
+            else:
+                # 커밋되지 않을 uuid 아래에 남는 블롭 삭제
+                delete_blobs(list(e.uploaded), "wcidfu-bucket")
+            raise
         except Exception as e:
             logging.error(f"Failed to upload images for resource {resource.uuid}: {str(e)}")
             raise
 
+        for blob_name, (attr, _) in blobs.items():
+            setattr(resource, attr, uploaded[blob_name])
+
     def _resource_parser(self, geninfo: str, params: dict, resource: Resource, 
-                        session: Session, generation_data: str = None, original_image: Image.Image = None) -> None:
+                        session: Session, generation_data: str = None, image_size: Tuple[int, int] = None) -> None:
         """Parse parameters and update resource attributes"""
         try:
             # 기본 파라미터 매핑
@@ -614,15 +655,13 @@ class CreateResource:
                 except Exception as e:
                     print(f"Size 파라미터 파싱 오류: {e}")
                     # 파싱 실패 시 실제 이미지 크기 사용
-                    if original_image:
-                        resource.width = original_image.width
-                        resource.height = original_image.height
+                    if image_size:
+                        resource.width, resource.height = image_size
                         print(f"실제 이미지 크기 사용: {resource.width}x{resource.height}")
             else:
                 # 메타데이터가 없으면 실제 이미지 크기 사용
-                if original_image:
-                    resource.width = original_image.width
-                    resource.height = original_image.height
+                if image_size:
+                    resource.width, resource.height = image_size
                     print(f"메타데이터 없음 - 실제 이미지 크기 사용: {resource.width}x{resource.height}")
 
             # Model hash 처리
@@ -649,10 +688,7 @@ class CreateResource:
                     if param_key in params:
                         setattr(resource, resource_attr, params[param_key])
 
-            session.commit()
-
         except Exception as e:
-            session.rollback()
             logging.error(f"Resource parsing failed: {str(e)}")
             raise
 
@@ -660,14 +696,43 @@ class CreateResource:
 #  Image Processing
 # ------------------------------
 class ImageProcessingSystem:
-    def __init__(self, user_id: int, default_tag_ids: List[int] = None, project_id: int = None, workflow_id: int = None):
+    def __init__(self, user_id: int, default_tag_ids: List[int] = None, project_id: int = None, workflow_id: int = None,
+                 pass_through_original: bool = True, inject_nsst: bool = False,
+                 dedupe: bool = True, dedupe_use_db: bool = False,
+                 embedding_qps: float = DEFAULT_EMBEDDING_QPS, deferred_embedding: bool = False,
+                 embedding_queue: Optional[EmbeddingQueue] = None):
         self.png_util = PngUtill()
         self.prompt_parser = PromptParser()
-        self.resource_creator = CreateResource()
+        self.resource_creator = CreateResource(inject_nsst=inject_nsst)
+        self.pass_through_original = pass_through_original
         self.default_tag_ids = default_tag_ids or []
         self.user_id = user_id
         self.project_id = project_id
         self.workflow_id = workflow_id  # 워크플로우 ID 추가
+        # 콘텐츠 해시 인덱스 (이미 업로드된 파일은 리사이즈/업로드 전에 건너뜀)
+        # (같은 파일이라도 다른 사용자/프로젝트로 올리면 새 리소스를 만듦)
+        self.content_index = ContentHashIndex(
+            use_db=dedupe_use_db, user_id=user_id, project_id=project_id
+        ) if dedupe else None
+        # 태그 이름/ID 캐시 (작업 스레드가 공유)
+        self.tag_cache = get_tag_cache()
+        # process_folder 동안 사용하는 임베딩 서비스 (없으면 이미지마다 헬퍼로 바로 생성)
+        self.embedding_service: Optional[EmbeddingService] = None
+        self.embedding_qps = embedding_qps
+        # 지연 임베딩 모드: 업로드는 로컬 큐에 넣기만 하고, 임베딩은 나중에 drain_embedding_queue()로 처리
+        # (embedding_queue를 넘기면 여러 폴더가 같은 큐를 공유하며, 닫는 것은 넘긴 쪽에서 담당)
+        self._owns_embedding_queue = embedding_queue is None and deferred_embedding
+        self.embedding_queue = EmbeddingQueue() if self._owns_embedding_queue else embedding_queue
+
+    def close(self) -> None:
+        """로컬 콘텐츠 해시 인덱스와 직접 연 지연 임베딩 큐 파일을 닫습니다. (처리가 끝난 뒤 1회 호출)"""
+        if self.content_index is not None:
+            self.content_index.close()
+            self.content_index = None
+        if self._owns_embedding_queue:
+            self.embedding_queue.close()
+            self.embedding_queue = None
+            self._owns_embedding_queue = False
 
     def validate_workflow(self, session: Session) -> bool:
         """
@@ -706,81 +771,144 @@ class ImageProcessingSystem:
                 
         return True
 
+    def validate_targets(self, session: Session) -> None:
+        """
+        프로젝트/워크플로우 ID를 검사합니다. 폴더 처리 시작 전에 한 번만 호출합니다.
+
+        Raises:
+            ValueError: 프로젝트 또는 워크플로우가 존재하지 않는 경우
+        """
+        # 프로젝트 유효성 검사 추가
+        if not self.validate_project(session):
+            raise ValueError(f"프로젝트 ID {self.project_id}가 유효하지 않습니다.")
+        
+        # 워크플로우 유효성 검사 추가
+        if not self.validate_workflow(session):
+            raise ValueError(f"워크플로우 ID {self.workflow_id}가 유효하지 않습니다.")
+
     def add_create_tags(self, resource: Resource, session: Session) -> None:
         try:
-            # 사용자의 collect 타입 태그 조회
-            create_tags = session.query(ColorCodeTags).filter(
-                ColorCodeTags.user_id == self.user_id,
-                ColorCodeTags.type == 'create'
-            ).all()
+            # 사용자의 create 타입 태그 조회 (태그 캐시)
+            create_tag_ids = self.tag_cache.ids_for_user(self.user_id, 'create')
             
-            if not create_tags:
+            if not create_tag_ids:
                 print(f"사용자 {self.user_id}의 create 타입 태그가 없습니다.")
                 return
 
             print(f"\n사용자 {self.user_id}의 create 태그 처리 시작")
             added_tag_ids = {tag.id for tag in resource.tags}  # 기존 태그 ID 집합
             
-            for tag in create_tags:
-                if tag.id not in added_tag_ids:
-                    print(f"Collect 태그 추가: {tag.tag} (ID: {tag.id})")
-                    resource.tags.append(tag)
-                    added_tag_ids.add(tag.id)
+            new_tag_ids = []
+            for tag_id in create_tag_ids:
+                if tag_id not in added_tag_ids:
+                    print(f"Collect 태그 추가: {self.tag_cache.get_name(tag_id)} (ID: {tag_id})")
+                    new_tag_ids.append(tag_id)
+                    added_tag_ids.add(tag_id)
                 else:
-                    print(f"create 태그 중복 건너뛰기: {tag.tag}")
+                    print(f"create 태그 중복 건너뛰기: {self.tag_cache.get_name(tag_id)}")
+            resource.tags.extend(self.tag_cache.load_tags(session, new_tag_ids))
                     
             session.flush()
             print(f"create 태그 처리 완료")
             
         except Exception as e:
             print(f"create 태그 처리 중 오류 발생: {str(e)}")
-            session.rollback()
             raise
 
     def add_default_tags(self, resource: Resource, session: Session) -> None:
         """Add default tags to a resource using tag IDs"""
         try:
             existing_tag_ids = {tag.id for tag in resource.tags}
-            
-            for tag_id in self.default_tag_ids:
-                if tag_id not in existing_tag_ids:
-                    tag = session.query(ColorCodeTags).filter_by(id=tag_id).first()
-                    if tag:
-                        resource.tags.append(tag)
-            session.commit()
+            new_tag_ids = [
+                tag_id for tag_id in self.tag_cache.filter_existing(self.default_tag_ids)
+                if tag_id not in existing_tag_ids
+            ]
+            resource.tags.extend(self.tag_cache.load_tags(session, new_tag_ids))
                 
         except Exception as e:
             logging.error(f"Error adding default tags: {str(e)}")
-            session.rollback()
         
     def process_single_image(self, image_path: str, session: Session):
-        # 프로젝트 유효성 검사 추가
-        if not self.validate_project(session):
-            raise ValueError(f"프로젝트 ID {self.project_id}가 유효하지 않습니다.")
-        
-        # 워크플로우 유효성 검사 추가
-        if not self.validate_workflow(session):
-            raise ValueError(f"워크플로우 ID {self.workflow_id}가 유효하지 않습니다.")
+        """
+        이미지 준비(CPU)와 업로드/DB 처리(I/O)를 현재 스레드에서 순서대로 수행합니다.
+        이미 업로드된 파일(콘텐츠 해시 기준)이면 아무 작업 없이 None을 반환합니다.
+        """
+        content_hash = None
+        if self.content_index is not None:
+            content_hash = hash_file(image_path)
+            existing_id = self.content_index.lookup(content_hash, session)
+            if existing_id is not None:
+                logging.info(f"이미 업로드된 이미지입니다. 건너뜁니다: {image_path} (리소스 ID {existing_id})")
+                return None
+
+        self.validate_targets(session)
+        prepared = prepare_image(image_path, self.pass_through_original)
+        prepared["content_hash"] = content_hash
+        return self.process_prepared_image(prepared, session)
+
+    def _skip_ingested(self, folder_path: str, image_files: List[str],
+                       session: Session, hash_workers: int = 8) -> Tuple[Dict[str, str], List[str]]:
+        """
+        콘텐츠 해시로 이미 업로드된 파일과 폴더 안의 중복 파일을 리사이즈/업로드 전에 걸러냅니다.
+
+        Returns:
+            Tuple[Dict[str, str], List[str]]: (파일 이름 -> 해시, 처리할 파일 목록)
+        """
+        if self.content_index is None:
+            return {}, image_files
+
+        def safe_hash(img):
+            try:
+                return hash_file(os.path.join(folder_path, img))
+            except OSError as e:
+                logging.warning(f"해시 계산 실패 ({img}): {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=hash_workers) as pool:
+            hashes = dict(zip(image_files, pool.map(safe_hash, image_files)))
+
+        existing = self.content_index.find_existing(hashes, session)
+        seen = set()
+        remaining = []
+        duplicates = 0
+        for img in image_files:
+            content_hash = hashes[img]
+            if img in existing:
+                continue
+            if content_hash is not None:
+                if content_hash in seen:
+                    duplicates += 1
+                    continue
+                seen.add(content_hash)
+            remaining.append(img)
+
+        if existing or duplicates:
+            print(f"이미 업로드된 이미지 {len(existing)}개, 폴더 내 중복 이미지 {duplicates}개를 건너뜁니다.")
+        return hashes, remaining
+
+    def process_prepared_image(self, prepared: Dict[str, Any], session: Session):
+        """
+        prepare_image()로 준비된 바이트 버퍼를 업로드하고 리소스를 생성합니다.
+        업로드가 끝난 뒤 리소스, 태그, resource_tag_v2 연결을 한 트랜잭션에 담아 한 번만 커밋하고, 임베딩은 커밋 후에 처리합니다.
+        """
+        image_path = prepared["image_path"]
 
         try:
-            original_image = Image.open(image_path)
-            image_128 = self.png_util.scale_image_by_height(original_image, 128)
-            image_192 = self.png_util.scale_image_by_height(original_image, 192)
-            image_512 = self.png_util.scale_image_by_height(original_image, 512)
-            
-            geninfo, params = self.png_util.geninfo_params(original_image)
+            geninfo, params = prepared["geninfo"], prepared["params"]
+            image_size = (prepared["width"], prepared["height"])
             
-            # project_id 매개변수 추가
+            # 업로드 후 세션에 추가만 함 (커밋은 마지막에 한 번)
             resource = self.resource_creator.create_resource(
-                self.user_id, original_image, image_128, image_192, image_512, session,
+                self.user_id, prepared["original"], prepared["thumbnails"], session,
                 project_id=self.project_id,
-                workflow_id=self.workflow_id  # 워크플로우 ID 전달
+                workflow_id=self.workflow_id,  # 워크플로우 ID 전달
+                source_key=prepared.get("source_hash")
             )
             
             if params:
-                # original_image를 파라미터로 전달하여 메타데이터가 없을 때 사용
+                # 실제 이미지 크기를 파라미터로 전달하여 메타데이터가 없을 때 사용
                 self.resource_creator._resource_parser(
-                    geninfo, params, resource, session, geninfo, original_image
+                    geninfo, params, resource, session, geninfo, image_size
                 )
                 if params.get("Prompt"):
                     self.prompt_parser._process_single_resource(
@@ -790,34 +918,312 @@ class ImageProcessingSystem:
                     )
             else:
                 # 메타데이터가 전혀 없는 경우 실제 이미지 크기 설정
-                resource.width = original_image.width
-                resource.height = original_image.height
-                session.commit()
+                resource.width, resource.height = image_size
                 print(f"메타데이터 없음 - 실제 이미지 크기 설정: {resource.width}x{resource.height}")
 
             self.add_create_tags(resource, session)
             self.add_default_tags(resource, session)
 
+            session.flush()  # 리소스 ID 확보
             resource.tag_ids = [tag.id for tag in resource.tags]
+
+            content_hash = prepared.get("content_hash")
+            if content_hash and self.content_index is not None:
+                self.content_index.add_to_session(session, content_hash, resource.id)
+
             session.commit()
+            self.resource_creator.release_uuid(prepared.get("source_hash"))
 
-            # --- Vertex AI 임베딩 생성 단계 ---
-            try:
-                logging.info(f"리소스 ID {resource.id}에 대한 Vertex AI 임베딩 생성을 시작합니다.")
-                embedding_helper = ResourceEmbeddingHelper(resource_id=resource.id, session=session)
-                embedding_helper.run()
-            except Exception as e:
-                # 임베딩 실패가 전체 업로드 프로세스를 중단시키지 않도록 예외 처리
-                logging.error(f"리소스 ID {resource.id}의 임베딩 생성 중 오류 발생: {e}", exc_info=True)
-            # ---------------------------------
+            if content_hash and self.content_index is not None:
+                self.content_index.record(content_hash, resource.id, str(resource.uuid), image_path)
+
+            # 임베딩은 커밋 후 처리 (Vertex AI 요청 동안 리소스 행 잠금과 DB 연결을 잡고 있지 않도록)
+            self._embed_resources(session, [
+                EmbeddingJob(resource.id, str(resource.uuid), resource.image, image_path)
+            ])
 
             return resource
 
         except Exception as e:
+            session.rollback()
             logging.error(f"Error processing image {image_path}: {str(e)}")
             raise
 
-    def process_folder(self, folder_path: str) -> None:
+    def resolve_extra_tag_ids(self) -> List[int]:
+        """
+        모든 이미지에 공통으로 붙는 태그(사용자의 create 태그 + 기본 태그) ID를 태그 캐시에서 찾습니다.
+        """
+        create_tag_ids = self.tag_cache.ids_for_user(self.user_id, 'create')
+        default_tag_ids = self.tag_cache.filter_existing(self.default_tag_ids)
+        return list(dict.fromkeys(create_tag_ids + default_tag_ids))
+
+    @staticmethod
+    def _resource_row(resource: Resource) -> Dict[str, Any]:
+        """
+        세션에 추가하지 않은 리소스 객체를 INSERT용 딕셔너리로 바꿉니다.
+        설정되지 않은 컬럼은 모델의 파이썬 기본값으로 채워 모든 행의 키를 맞춥니다.
+        """
+        row = {}
+        for prop in sa_inspect(Resource).column_attrs:
+            column = prop.columns[0]
+            if column.primary_key:
+                continue
+            if prop.key in resource.__dict__:
+                row[column.key] = resource.__dict__[prop.key]
+            elif column.default is not None and column.default.is_callable:
+                row[column.key] = column.default.arg(None)
+            elif column.default is not None and column.default.is_scalar:
+                row[column.key] = column.default.arg
+            elif column.server_default is None:
+                row[column.key] = None
+        return row
+
+    def build_resource_row(self, prepared: Dict[str, Any], session: Session,
+                           extra_tag_ids: List[int]) -> Tuple[Dict[str, Any], List[int]]:
+        """
+        이미지를 업로드하고 INSERT할 리소스 행과 연결할 태그 ID 목록을 만듭니다.
+        리소스 자체는 DB에 쓰지 않습니다. (없는 태그는 태그 캐시가 별도 트랜잭션에서 생성)
+
+        Returns:
+            Tuple[Dict[str, Any], List[int]]: (리소스 행, 태그 ID 목록)
+        """
+        geninfo, params = prepared["geninfo"], prepared["params"]
+        image_size = (prepared["width"], prepared["height"])
+
+        resource = self.resource_creator.create_resource(
+            self.user_id, prepared["original"], prepared["thumbnails"], session,
+            project_id=self.project_id,
+            workflow_id=self.workflow_id,
+            add_to_session=False,
+            source_key=prepared.get("source_hash")
+        )
+
+        prompt_tag_ids = []
+        if params:
+            self.resource_creator._resource_parser(
+                geninfo, params, resource, session, geninfo, image_size
+            )
+            if params.get("Prompt"):
+                prompt_tag_ids = self.prompt_parser.collect_prompt_tag_ids(params["Prompt"])
+        else:
+            resource.width, resource.height = image_size
+
+        tag_ids = list(dict.fromkeys(prompt_tag_ids + extra_tag_ids))
+        resource.tag_ids = tag_ids
+        return self._resource_row(resource), tag_ids
+
+    def write_resource_batch(self, session: Session, batch: List[Tuple[Dict[str, Any], List[int], Optional[str]]]) -> List[int]:
+        """
+        리소스 행 여러 개를 multi-row INSERT ... RETURNING id 한 번으로 쓰고,
+        resource_tag_v2 연결과 콘텐츠 해시도 각각 한 번의 INSERT로 쓴 뒤 한 번 커밋합니다.
+
+        Args:
+            batch: (리소스 행, 태그 ID 목록, 콘텐츠 해시) 목록
+
+        Returns:
+            List[int]: batch 순서와 같은 순서의 리소스 ID
+        """
+        resource_table = Resource.__table__
+        try:
+            result = session.execute(
+                insert(resource_table).returning(resource_table.c.id, sort_by_parameter_order=True),
+                [row for row, _, _ in batch]
+            )
+            resource_ids = [resource_id for (resource_id,) in result]
+
+            link_rows = [
+                {"resource_id": resource_id, "tag_id": tag_id}
+                for resource_id, (_, tag_ids, _) in zip(resource_ids, batch)
+                for tag_id in tag_ids
+            ]
+            if link_rows:
+                session.execute(insert(ResourceTagV2.__table__), link_rows)
+
+            if self.content_index is not None:
+                self.content_index.add_many_to_session(session, [
+                    (content_hash, resource_id)
+                    for resource_id, (_, _, content_hash) in zip(resource_ids, batch)
+                    if content_hash
+                ])
+
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+        if self.content_index is not None:
+            for resource_id, (row, _, content_hash) in zip(resource_ids, batch):
+                if content_hash:
+                    self.content_index.record(content_hash, resource_id, str(row["uuid"]))
+        return resource_ids
+
+    def _embed_resources(self, session: Session, jobs: List[EmbeddingJob]) -> None:
+        """커밋된 리소스의 임베딩을 생성하거나 지연 큐에 넣습니다. (실패해도 업로드는 유지)"""
+        if self.embedding_queue is not None:
+            self.embedding_queue.enqueue_many(jobs)
+            return
+        if self.embedding_service is not None:
+            self.embedding_service.submit_many(job for job in jobs if job.image)
+            return
+        for job in jobs:
+            try:
+                ResourceEmbeddingHelper(resource_id=job.resource_id, session=session).run()
+            except Exception as e:
+                logging.error(f"리소스 ID {job.resource_id}의 임베딩 생성 중 오류 발생: {e}", exc_info=True)
+
+    def _encode_stage(self, folder_path: str, image_files: List[str], encoder: ProcessPoolExecutor,
+                      prepared_queue: queue.Queue, max_pending: int,
+                      content_hashes: Dict[str, str] = None) -> None:
+        """
+        CPU 단계: 프로세스 풀에서 이미지를 준비하고 결과를 제한된 크기의 큐에 넣습니다.
+        큐가 가득 차면 put()에서 대기하므로 업로드 단계보다 너무 앞서 나가지 않습니다.
+        """
+        pending = {}
+        remaining = iter(image_files)
+
+        def submit_next() -> bool:
+            img = next(remaining, None)
+            if img is None:
+                return False
+            image_path = os.path.join(folder_path, img)
+            pending[encoder.submit(prepare_image, image_path, self.pass_through_original)] = img
+            return True
+
+        for _ in range(max_pending):
+            if not submit_next():
+                break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                img = pending.pop(future)
+                try:
+                    prepared = future.result()
+                    prepared["content_hash"] = (content_hashes or {}).get(img)
+                    prepared_queue.put((img, prepared, None))
+                except Exception as e:
+                    prepared_queue.put((img, None, e))
+                submit_next()
+
+    def _io_stage(self, prepared_queue: queue.Queue, on_done) -> None:
+        """
+        I/O 단계: 큐에서 준비된 이미지를 꺼내 업로드 및 DB 작업을 수행합니다.
+        워커마다 연결 풀에서 자기 세션을 받아 쓰고, 이미지 1장이 끝날 때마다(process_prepared_image에서
+        한 번 커밋, 실패 시 롤백) 세션의 ORM 객체를 모두 비웁니다. 다른 스레드에는 리소스 ID만 넘깁니다.
+        None을 받으면 종료합니다.
+        """
+        session = get_connection_broker().new_session()
+        try:
+            while True:
+                item = prepared_queue.get()
+                if item is None:
+                    break
+
+                img, prepared, error = item
+                if error is None:
+                    try:
+                        resource = self.process_prepared_image(prepared, session)
+                        on_done(img, resource.id, None)
+                        continue
+                    except Exception as e:
+                        error = e
+                        session = self._recover_session(session)
+                    finally:
+                        session.expunge_all()
+                on_done(img, None, error)
+        finally:
+            session.close()
+
+    @staticmethod
+    def _recover_session(session: Session) -> Session:
+        """
+        실패한 이미지 처리 후 세션을 롤백합니다.
+        연결이 끊겨 롤백도 실패하면 세션을 버리고 새 세션을 반환합니다.
+        (I/O 워커가 예외로 종료되면 인코딩 단계가 가득 찬 큐의 put()에서 영원히 대기하므로 워커는 계속 큐를 소비해야 함)
+        """
+        try:
+            session.rollback()
+            return session
+        except Exception as e:
+            logging.warning(f"롤백 실패, 새 DB 세션으로 교체합니다: {e}")
+        try:
+            session.close()
+        except Exception:
+            pass
+        return get_connection_broker().new_session()
+
+    def _io_stage_batched(self, prepared_queue: queue.Queue, on_done, batch_size: int,
+                          extra_tag_ids: List[int]) -> None:
+        """
+        배치 모드 I/O 단계: 이미지마다 업로드와 행 생성만 하고, batch_size개가 모이면
+        write_resource_batch()로 한 번에 INSERT/커밋합니다. None을 받으면 남은 행을 쓰고 종료합니다.
+        """
+        session = get_connection_broker().new_session()
+        # (파일 이름, (행, 태그 ID 목록, 콘텐츠 해시), 원본 파일 경로, 원본 파일 해시)
+        pending: List[Tuple[str, Tuple[Dict[str, Any], List[int], Optional[str]], str, Optional[str]]] = []
+
+        def flush_pending():
+            nonlocal session
+            if not pending:
+                return
+            try:
+                resource_ids = self.write_resource_batch(session, [entry for _, entry, _, _ in pending])
+            except Exception as e:
+                logging.error(f"배치 INSERT 실패 ({len(pending)}개): {str(e)}")
+                session = self._recover_session(session)
+                for img, _, _, _ in pending:
+                    on_done(img, None, e)
+            else:
+                for (img, _, _, source_hash), resource_id in zip(pending, resource_ids):
+                    self.resource_creator.release_uuid(source_hash)
+                    on_done(img, resource_id, None)
+                self._embed_resources(session, [
+                    EmbeddingJob(resource_id, str(row["uuid"]), row.get("image"), image_path)
+                    for (_, (row, _, _), image_path, _), resource_id in zip(pending, resource_ids)
+                ])
+            finally:
+                pending.clear()
+                session.expunge_all()
+
+        try:
+            while True:
+                item = prepared_queue.get()
+                if item is None:
+                    break
+
+                img, prepared, error = item
+                if error is None:
+                    try:
+                        row, tag_ids = self.build_resource_row(prepared, session, extra_tag_ids)
+                        pending.append((img, (row, tag_ids, prepared.get("content_hash")), prepared["image_path"],
+                                        prepared.get("source_hash")))
+                        if len(pending) >= batch_size:
+                            flush_pending()
+                        continue
+                    except Exception as e:
+                        error = e
+                on_done(img, None, error)
+            flush_pending()
+        finally:
+            session.close()
+
+    def process_folder(self, folder_path: str, encode_workers: int = None, io_workers: int = 12,
+                       queue_size: int = None, batch_size: int = None) -> None:
+        """
+        폴더 내 이미지를 2단계 파이프라인으로 처리합니다.
+        - 인코딩 단계: ProcessPoolExecutor (디코딩/리사이즈/PNG 인코딩)
+        - I/O 단계: ThreadPoolExecutor (GCS 업로드, DB 기록, 임베딩)
+
+        Args:
+            folder_path: 처리할 폴더 경로
+            encode_workers: 인코딩 프로세스 수 (기본값: CPU 코어 수)
+            io_workers: 업로드/DB 스레드 수 (스레드마다 별도 DB 세션 사용)
+            queue_size: 두 단계 사이 큐의 최대 크기 (기본값: io_workers * 2)
+            batch_size: 지정하면 배치 모드 - 워커마다 batch_size개씩 모아 multi-row INSERT로 기록
+        """
+        if batch_size and self.resource_creator.inject_nsst:
+            raise ValueError("배치 모드에서는 nsSt 삽입을 사용할 수 없습니다. (업로드 전에 리소스 ID가 필요)")
+
         if not os.path.exists(folder_path):
             raise ValueError(f"Folder path does not exist: {folder_path}")
         
@@ -826,37 +1232,80 @@ class ImageProcessingSystem:
         if not image_files:
             logging.warning(f"No image files found in {folder_path}")
             return
+
+        encode_workers = encode_workers or os.cpu_count() or 1
+        queue_size = queue_size or io_workers * 2
+        # 업로드 스레드마다 리소스당 블롭 4개를 올리므로 그만큼 HTTP 연결을 확보
+        configure_storage_client(pool_size=io_workers * 4)
+        # I/O 워커마다 DB 연결 1개 + 메인 스레드 1개 + 태그 캐시의 태그 생성용 1개 + 임베딩 저장용 1개
+        get_connection_broker().ensure_capacity(io_workers + 3)
             
         session, server = get_session()
+        try:
+            self.validate_targets(session)
+            content_hashes, image_files = self._skip_ingested(folder_path, image_files, session)
+            extra_tag_ids = self.resolve_extra_tag_ids() if batch_size else None
+        except Exception:
+            end_session(session, server)
+            raise
+
+        if not image_files:
+            print(f"'{os.path.basename(folder_path)}'의 모든 이미지가 이미 업로드되어 있습니다.")
+            end_session(session, server)
+            return
+
         first_id = None
         last_id = None
-        processed_count = 0
-        total_images = len(image_files)
         results = []
         failed_images = []  # 실패한 이미지 목록
+        lock = threading.Lock()
+        prepared_queue = queue.Queue(maxsize=queue_size)
+        progress = tqdm(total=len(image_files), desc=f"Processing {os.path.basename(folder_path)}")
+        # 임베딩은 업로드 루프 밖에서 모아서 요청/저장 (모델은 프로세스당 1회 로드)
+        # 지연 임베딩 모드에서는 큐에만 넣으므로 서비스를 만들지 않음
+        if self.embedding_queue is None:
+            self.embedding_service = EmbeddingService(qps=self.embedding_qps)
+
+        def on_done(img, resource_id, error):
+            nonlocal first_id, last_id
+            with lock:
+                if error is not None:
+                    failed_images.append(img)
+                    print(f"Error processing {img}: {error}")
+                elif resource_id:
+                    results.append(resource_id)
+                    first_id = first_id or resource_id
+                    last_id = resource_id
+                progress.update(1)
         
         try:
-            with ThreadPoolExecutor(max_workers=12) as executor:
-                futures = {
-                    executor.submit(
-                        self.process_single_image, os.path.join(folder_path, img), session): img 
-                        for img in image_files
-                    }
-                
-                for future in tqdm(
-                        as_completed(futures), total=len(futures), 
-                        desc=f"Processing {os.path.basename(folder_path)}"
-                    ):
-                    try:
-                        if result := future.result():
-                            results.append(result)
-                            first_id = first_id or result.id
-                            last_id = result.id
-                        processed_count += 1
-                    except Exception as e:
-                        failed_images.append(futures[future])
-                        print(f"Error processing {futures[future]}: {e}")
+            with ProcessPoolExecutor(max_workers=encode_workers) as encoder, \
+                    ThreadPoolExecutor(max_workers=io_workers) as uploader:
+                if batch_size:
+                    io_futures = [
+                        uploader.submit(self._io_stage_batched, prepared_queue, on_done, batch_size, extra_tag_ids)
+                        for _ in range(io_workers)
+                    ]
+                else:
+                    io_futures = [
+                        uploader.submit(self._io_stage, prepared_queue, on_done)
+                        for _ in range(io_workers)
+                    ]
+
+                try:
+                    self._encode_stage(folder_path, image_files, encoder, prepared_queue,
+                                       max_pending=encode_workers + queue_size,
+                                       content_hashes=content_hashes)
+                finally:
+                    # I/O 스레드 종료 신호
+                    for _ in range(io_workers):
+                        prepared_queue.put(None)
+
+                for future in io_futures:
+                    future.result()
             
+            progress.close()
+
             # 결과 출력
             print(f"\n처리 완료: 성공 {len(results)}개, 실패 {len(failed_images)}개")
             if first_id and last_id:
@@ -867,6 +1316,15 @@ class ImageProcessingSystem:
         except Exception as e:
             logging.error(f"Folder processing error: {str(e)}")
         finally:
+            progress.close()
+            if self.embedding_service is not None:
+                # 남은 임베딩 요청/저장이 끝날 때까지 대기
+                embedding_stats = self.embedding_service.close()
+                self.embedding_service = None
+                print(f"임베딩 처리: 성공 {embedding_stats['success']}개, 실패 {embedding_stats['error']}개")
+            else:
+                pending_count = self.embedding_queue.counts()[STATUS_PENDING]
+                print(f"임베딩 대기열: {pending_count}개 (메인 메뉴의 '지연 임베딩 큐 처리'로 처리)")
             end_session(session, server)
 
 def get_user_input():
@@ -957,6 +1415,31 @@ def get_user_input():
         print("\n프로그램을 종료합니다.")
         sys.exit(0)
 
+def get_pipeline_options() -> Tuple[Optional[int], Optional[int], int]:
+    """
+    업로드 파이프라인 설정을 입력받습니다. (엔터를 누르면 기본값)
+
+    Returns:
+        Tuple[Optional[int], Optional[int], int]: (배치 크기 - None이면 이미지마다 커밋, 인코딩 프로세스 수, I/O 스레드 수)
+    """
+    def ask_int(prompt: str, default):
+        while True:
+            value = input(prompt).strip()
+            if not value:
+                return default
+            try:
+                number = int(value)
+                if number > 0:
+                    return number
+            except ValueError:
+                pass
+            print("1 이상의 숫자를 입력해주세요.")
+
+    batch_size = ask_int("\n배치 INSERT 크기를 입력해주세요 (대량 업로드용, 예: 200 / 엔터=이미지마다 커밋): ", None)
+    encode_workers = ask_int(f"인코딩 프로세스 수를 입력해주세요 (엔터={os.cpu_count() or 1}): ", None)
+    io_workers = ask_int("업로드/DB 스레드 수를 입력해주세요 (엔터=12): ", 12)
+    return batch_size, encode_workers, io_workers
+
 def validate_inputs(session, user_id: int, tag_ids: list, project_id: int = None, workflow_id: int = None) -> Tuple[bool, str]:
     """
     입력받은 user_id, tag_ids, project_id가 데이터베이스에 존재하는지 검증합니다.
@@ -1005,53 +1488,38 @@ def validate_inputs(session, user_id: int, tag_ids: list, project_id: int = None
 
 def create_tag_mapping() -> Dict[str, str]:
     """
-    CharacterManager, OutfitManager, EventManager의 
+    CharacterManager, OutfitManager, EventManager, InstrumentManager, PlaveManager의 
     별칭(aliases)들을 하나의 태그 매핑 딕셔너리로 변환합니다.
+    (프로세스 전역 별칭 카탈로그에서 복사하므로 매니저를 다시 만들지 않음)
     """
-    # 기존 매니저들 초기화
-    character_manager = CharacterManager()
-    outfit_manager = OutfitManager()
-    event_manager = EventManager()
-    instrument_manager = InstrumentManager()
-    plave_manager = PlaveManager()
-
-    tag_mapping = {}
-    
-    # 각 매니저의 items를 순회하면서 태그 매핑 생성
-    managers = [
-        ('character', character_manager),
-        ('outfit', outfit_manager),
-        ('event', event_manager),
-        ('inst', instrument_manager),
-        ('plave', plave_manager)
-    ]
-    
-    for manager_name, manager in managers:
-        for standard_name, item in manager.items.items():
-            # 각 별칭을 표준 이름에 매핑
-            for alias in item.aliases:
-                tag_mapping[alias] = standard_name
-    
-    return tag_mapping
+    return dict(get_alias_catalog().tag_mapping)
 
 def save_tag_mapping(tag_mapping: Dict[str, str]):
     """
     생성된 태그 매핑을 현재 디렉토리의 tag_mappings.py 파일로 저장합니다.
+    내용이 기존 파일과 같으면 다시 쓰지 않습니다.
     """
     import os
     
     current_dir = os.path.dirname(os.path.abspath(__file__))
     file_path = os.path.join(current_dir, 'tag_mappings.py')
     
+    lines = ["# Generated Tag Mapping\n\n", "TAG_MAPPING = {\n"]
+    # 알파벳 순으로 정렬하여 저장
+    for alias, standard_name in sorted(tag_mapping.items()):
+        lines.append(f"    {repr(alias)}: {repr(standard_name)},\n")
+    lines.append("}\n")
+    content = "".join(lines)
+    
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return
+    except FileNotFoundError:
+        pass
+    
     with open(file_path, 'w', encoding='utf-8') as f:
-        f.write("# Generated Tag Mapping\n\n")
-        f.write("TAG_MAPPING = {\n")
-        
-        # 알파벳 순으로 정렬하여 저장
-        for alias, standard_name in sorted(tag_mapping.items()):
-            f.write(f"    {repr(alias)}: {repr(standard_name)},\n")
-            
-        f.write("}\n")
+        f.write(content)
 
 def get_or_create_character_tag(session, folder_name, user_id, created_tags_dict=None):
     """
@@ -1067,46 +1535,31 @@ def get_or_create_character_tag(session, folder_name, user_id, created_tags_dict
         list: 찾거나 생성한 태그 ID 목록
     """
     try:
-        # 소문자로 변환하여 검색
-        from sqlalchemy import func
-        
         # 폴더 이름을 '_'로 분리하여 각 부분을 개별 태그로 처리
         tag_names = folder_name.split('_')
         if len(tag_names) > 5:  # 최대 5개까지만 처리
             print(f"경고: 폴더 이름에 '_'로 구분된 부분이 5개를 초과합니다. 처음 5개만 처리합니다.")
             tag_names = tag_names[:5]
-            
+        tag_names = [tag_name for tag_name in tag_names if tag_name]  # 빈 문자열 건너뛰기
+
+        # 대소문자 구분 없이 normal 태그를 찾고, 없는 태그는 원래 대소문자로 한 번에 생성
+        tag_cache = get_tag_cache()
+        created = {}
+        found = tag_cache.get_or_create_ids(tag_names, 'normal', user_id=user_id, created=created)
+
         tag_ids = []
-        
         for tag_name in tag_names:
-            if not tag_name:  # 빈 문자열 건너뛰기
-                continue
-                
-            search_name = tag_name.lower()
-            tag = session.query(ColorCodeTags).filter(
-                func.lower(ColorCodeTags.tag) == search_name,
-                ColorCodeTags.type == 'normal'
-            ).first()
-            
-            if tag:
-                print(f"기존 태그를 찾았습니다: {tag.tag} (ID: {tag.id})")
-                tag_ids.append(tag.id)
+            tag_id = found[tag_name]
+            if tag_id in created:
+                print(f"새로운 태그를 생성했습니다: {created[tag_id]} (ID: {tag_id})")
             else:
-                # 태그가 없으면 새로 생성
-                new_tag = ColorCodeTags(
-                    tag=tag_name,  # 원래 대소문자 유지
-                    color_code='#FFFFFF',
-                    type='normal',
-                    user_id=user_id
-                )
-                session.add(new_tag)
-                session.flush()  # ID를 얻기 위해 flush
-                print(f"새로운 태그를 생성했습니다: {new_tag.tag} (ID: {new_tag.id})")
-                tag_ids.append(new_tag.id)
-                
-                # 생성된 태그 정보를 딕셔너리에 추가
-                if created_tags_dict is not None:
-                    created_tags_dict[new_tag.id] = new_tag.tag
+                print(f"기존 태그를 찾았습니다: {tag_cache.get_name(tag_id)} (ID: {tag_id})")
+            if tag_id not in tag_ids:
+                tag_ids.append(tag_id)
+
+        # 생성된 태그 정보를 딕셔너리에 추가
+        if created_tags_dict is not None:
+            created_tags_dict.update(created)
         
         return tag_ids
             
@@ -1150,7 +1603,8 @@ def get_subfolders(base_path):
     return subfolders
 
 def process_single_folder(utils, session, user_id, folder_path, default_tag_ids, is_character_folder, 
-                         created_tags_dict=None, project_id=None, workflow_id=None):
+                         created_tags_dict=None, project_id=None, workflow_id=None, deferred_embedding=False,
+                         embedding_queue=None, batch_size=None, encode_workers=None, io_workers=12):
     """
     단일 폴더를 처리하는 함수
     
@@ -1163,6 +1617,11 @@ def process_single_folder(utils, session, user_id, folder_path, default_tag_ids,
         is_character_folder: 캐릭터 폴더 여부
         created_tags_dict: 새로 생성된 태그를 저장할 딕셔너리 (선택 사항)
         project_id: 프로젝트 ID (선택 사항)
+        deferred_embedding: True면 임베딩을 바로 만들지 않고 지연 임베딩 큐에 넣음
+        embedding_queue: 여러 폴더가 공유할 지연 임베딩 큐 (주어지면 deferred_embedding과 상관없이 사용)
+        batch_size: 지정하면 배치 모드 (batch_size개씩 multi-row INSERT로 기록)
+        encode_workers: 인코딩 프로세스 수 (기본값: CPU 코어 수)
+        io_workers: 업로드/DB 스레드 수
     """
     from sqlalchemy import func
     
@@ -1198,7 +1657,9 @@ def process_single_folder(utils, session, user_id, folder_path, default_tag_ids,
         user_id=user_id,
         default_tag_ids=folder_tag_ids,
         project_id=project_id,
-        workflow_id=workflow_id  # 워크플로우 ID 추가
+        workflow_id=workflow_id,  # 워크플로우 ID 추가
+        deferred_embedding=deferred_embedding,
+        embedding_queue=embedding_queue
     )
     
     # Show processing information
@@ -1210,9 +1671,17 @@ def process_single_folder(utils, session, user_id, folder_path, default_tag_ids,
         print(f"연결할 프로젝트 ID: {project_id}")
     if workflow_id:
         print(f"연결할 워크플로우 ID: {workflow_id}")
+    if processor.embedding_queue is not None:
+        print("임베딩: 지연 처리 (큐에 저장)")
+    if batch_size:
+        print(f"배치 INSERT 크기: {batch_size}")
     
     # Process the folder
-    processor.process_folder(folder_path)
+    try:
+        processor.process_folder(folder_path, encode_workers=encode_workers, io_workers=io_workers,
+                                 batch_size=batch_size)
+    finally:
+        processor.close()
     print(f"폴더 '{os.path.basename(folder_path)}' 처리가 완료되었습니다.")
 
 def main():
@@ -1223,19 +1692,20 @@ def main():
     )
     
     try:
-        tag_mapping = create_tag_mapping()
+        # 별칭 카탈로그 생성 (프로세스 전역, 1회)
+        catalog = get_alias_catalog()
+        print(f"총 {len(catalog.tag_mapping)}개의 태그 매핑을 불러왔습니다.")
         
-        # 매핑 결과 출력
-        print(f"총 {len(tag_mapping)}개의 태그 매핑이 생성되었습니다.")
-        
-        # 파일로 저장
-        save_tag_mapping(tag_mapping)
+        # 태그 매핑이 바뀐 경우에만 tag_mappings.py 다시 저장
+        save_tag_mapping(catalog.tag_mapping)
 
         # Get user input with enhanced options (프로젝트 ID 추가)
         user_id, base_folder_path, default_tag_ids, process_subfolders, default_character_folder, project_id, workflow_id = get_user_input()
         
         # 데이터베이스 연결
         session, server = get_session()
+        # 지연 임베딩 큐 (모든 폴더가 공유, 끝나면 닫음)
+        embedding_queue = None
         
         try:
             # sqlalchemy func 가져오기
@@ -1250,6 +1720,9 @@ def main():
             if not is_valid:
                 print(f"\n오류: {error_message}")
                 return
+
+            # 태그 이름/ID 캐시를 미리 채움 (이후 태그 조회는 메모리에서 처리)
+            get_tag_cache().load(session)
             
             # 폴더 목록 결정
             if process_subfolders:
@@ -1266,6 +1739,14 @@ def main():
                 # 단일 폴더 처리
                 folders = [base_folder_path]
             
+            # 임베딩 처리 방식 선택
+            deferred_prompt = input("\n임베딩 생성을 업로드와 분리하여 나중에 처리하시겠습니까? (y/n, 기본값=n): ").strip().lower()
+            if deferred_prompt == 'y':
+                embedding_queue = EmbeddingQueue()
+
+            # 배치 INSERT/워커 수 설정
+            batch_size, encode_workers, io_workers = get_pipeline_options()
+            
             # 처리 시작 확인
             confirm = input("\n처리를 시작하시겠습니까? (y/n): ").strip().lower()
             if confirm != 'y':
@@ -1299,7 +1780,11 @@ def main():
                     is_character_folder=is_character_folder,
                     created_tags_dict=created_tags,
                     project_id=project_id,
-                    workflow_id=workflow_id  # 워크플로우 ID 전달
+                    workflow_id=workflow_id,  # 워크플로우 ID 전달
+                    embedding_queue=embedding_queue,
+                    batch_size=batch_size,
+                    encode_workers=encode_workers,
+                    io_workers=io_workers
                 )
             
             print("\n모든 폴더 처리가 완료되었습니다.")
@@ -1315,6 +1800,8 @@ def main():
                 print("\n이번 작업에서 새로 생성된 태그가 없습니다.")
             
         finally:
+            if embedding_queue is not None:
+                embedding_queue.close()
             end_session(session, server)
             
     except Exception as e:
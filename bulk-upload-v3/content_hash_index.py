@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import Resource, ResourceContentHash, RESOURCE_CONTENT_HASH_SCOPE
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASH_DB_FILE_NAME = 'content_hash_index.sqlite3'
+HASH_READ_CHUNK_SIZE = 1024 * 1024
+# DB/로컬 인덱스를 IN 조건으로 한 번에 조회할 해시 수
+HASH_QUERY_CHUNK_SIZE = 500
+
+
+def hash_file(image_path: str, chunk_size: int = HASH_READ_CHUNK_SIZE) -> str:
+    """
+    파일 바이트의 BLAKE2b 해시를 계산합니다. (이미지 디코딩 없이 파일을 그대로 읽음)
+
+    Args:
+        image_path: 파일 경로
+        chunk_size: 한 번에 읽을 바이트 수
+
+    Returns:
+        str: 64자리 16진수 해시
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+    """이미 읽은 파일 바이트의 해시를 계산합니다. (hash_file()과 같은 값)"""
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+class ContentHashIndex:
+    """
+    이미 업로드한 파일의 콘텐츠 해시 -> 리소스 ID 인덱스.
+    로컬 SQLite 파일에 저장하고, use_db=True면 DB의 resource_content_hash 테이블도 함께 확인/기록합니다.
+    (다른 PC에서 올린 파일도 중복으로 판단하려면 use_db 사용)
+    같은 파일이라도 다른 사용자/프로젝트로 올리는 경우는 중복으로 보지 않도록 (user_id, project_id) 범위로 찾고 기록합니다.
+    세션이 주어지면 로컬 인덱스에서 찾은 리소스도 DB에 실제로 남아 있는지 함께 확인합니다.
+
+    Args:
+        db_path: 로컬 SQLite 파일 경로 (기본값: 스크립트 폴더의 content_hash_index.sqlite3)
+        use_db: True면 로컬에 없을 때 DB 테이블을 조회하고, 새 리소스도 DB에 기록
+        user_id: 업로드 사용자 ID
+        project_id: 업로드 프로젝트 ID
+    """
+
+    def __init__(self, db_path: str = None, use_db: bool = False, user_id: int = None, project_id: int = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONTENT_HASH_DB_FILE_NAME)
+        self.db_path = db_path
+        self.use_db = use_db
+        self.user_id = user_id
+        self.project_id = project_id
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(content_hash)")]
+        if columns and 'user_id' not in columns:
+            # 범위 정보가 없는 이전 형식의 인덱스는 어느 사용자/프로젝트의 리소스인지 알 수 없으므로 새로 만듦
+            logger.info("이전 형식의 콘텐츠 해시 인덱스를 초기화합니다.")
+            self._conn.execute("DROP TABLE content_hash")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS content_hash (
+                content_hash TEXT NOT NULL,
+                user_id INTEGER,
+                project_id INTEGER,
+                resource_id INTEGER NOT NULL,
+                resource_uuid TEXT,
+                image_path TEXT,
+                created_at TEXT
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS content_hash_scope
+            ON content_hash (content_hash, IFNULL(user_id, 0), IFNULL(project_id, 0))
+            """
+        )
+        self._conn.commit()
+
+    def lookup(self, content_hash: str, session: Session = None) -> Optional[int]:
+        """
+        해시에 해당하는 리소스 ID를 반환합니다. 없으면 None. (find_existing()과 같은 규칙)
+        """
+        return self.find_existing({content_hash: content_hash}, session).get(content_hash)
+
+    def find_existing(self, hashes: Dict[str, str], session: Session = None) -> Dict[str, int]:
+        """
+        {파일 이름: 해시} 중 같은 사용자/프로젝트로 이미 업로드된 파일을 찾습니다.
+        로컬 인덱스를 먼저 보고, 세션이 있으면 로컬에서 찾은 리소스가 DB에 남아 있는지 확인합니다.
+        use_db=True면 로컬에 없는 해시를 DB에서 찾아 로컬에 저장합니다.
+        DB 조회는 HASH_QUERY_CHUNK_SIZE개씩 묶어서 한 번에 수행합니다.
+
+        Returns:
+            dict: 이미 업로드된 파일 이름 -> 기존 리소스 ID
+        """
+        wanted = list({content_hash for content_hash in hashes.values() if content_hash is not None})
+        found = self._lookup_local(wanted)
+
+        if session is not None and found:
+            alive = self._existing_resource_ids(session, set(found.values()))
+            stale = [content_hash for content_hash, resource_id in found.items() if resource_id not in alive]
+            if stale:
+                logger.info(f"DB에 없는 리소스를 가리키는 로컬 해시 {len(stale)}개를 삭제합니다.")
+                self._remove_local(stale)
+                for content_hash in stale:
+                    del found[content_hash]
+
+        if self.use_db and session is not None:
+            missing = [content_hash for content_hash in wanted if content_hash not in found]
+            from_db = self._lookup_db(session, missing)
+            if from_db:
+                self._add_local([(content_hash, resource_id, None, None) for content_hash, resource_id in from_db.items()])
+                found.update(from_db)
+
+        return {
+            name: found[content_hash]
+            for name, content_hash in hashes.items()
+            if content_hash is not None and content_hash in found
+        }
+
+    def _lookup_local(self, hashes: List[str]) -> Dict[str, int]:
+        found = {}
+        with self._lock:
+            for chunk in _chunks(hashes, HASH_QUERY_CHUNK_SIZE):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"""
+                    SELECT content_hash, resource_id FROM content_hash
+                    WHERE user_id IS ? AND project_id IS ? AND content_hash IN ({placeholders})
+                    """,
+                    (self.user_id, self.project_id, *chunk)
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def _scope_filter(self):
+        """Resource를 이 인덱스의 사용자/프로젝트로 제한하는 조건"""
+        return and_(
+            Resource.user_id.is_(None) if self.user_id is None else Resource.user_id == self.user_id,
+            Resource.project_id.is_(None) if self.project_id is None else Resource.project_id == self.project_id,
+        )
+
+    def _db_scope_filter(self):
+        """resource_content_hash 행을 이 인덱스의 사용자/프로젝트로 제한하는 조건"""
+        return and_(
+            ResourceContentHash.user_id.is_(None) if self.user_id is None
+            else ResourceContentHash.user_id == self.user_id,
+            ResourceContentHash.project_id.is_(None) if self.project_id is None
+            else ResourceContentHash.project_id == self.project_id,
+        )
+
+    def _existing_resource_ids(self, session: Session, resource_ids: Set[int]) -> Set[int]:
+        alive = set()
+        for chunk in _chunks(list(resource_ids), HASH_QUERY_CHUNK_SIZE):
+            rows = session.query(Resource.id).filter(Resource.id.in_(chunk), self._scope_filter()).all()
+            alive.update(resource_id for resource_id, in rows)
+        return alive
+
+    def _lookup_db(self, session: Session, hashes: List[str]) -> Dict[str, int]:
+        found = {}
+        for chunk in _chunks(hashes, HASH_QUERY_CHUNK_SIZE):
+            rows = (
+                session.query(ResourceContentHash.content_hash, ResourceContentHash.resource_id)
+                .join(Resource, Resource.id == ResourceContentHash.resource_id)
+                .filter(ResourceContentHash.content_hash.in_(chunk), self._db_scope_filter(), self._scope_filter())
+                .all()
+            )
+            found.update(rows)
+        return found
+
+    def add_to_session(self, session: Session, content_hash: str, resource_id: int) -> None:
+        """
+        use_db=True면 DB 기록을 세션에 추가합니다. (커밋은 호출자가 리소스와 함께 수행)
+        """
+        self.add_many_to_session(session, [(content_hash, resource_id)])
+
+    def add_many_to_session(self, session: Session, rows: List[Tuple[str, int]]) -> None:
+        """
+        use_db=True면 (해시, 리소스 ID) 목록을 이 사용자/프로젝트 범위로 DB에 기록합니다.
+        같은 범위에 이미 기록이 있으면 새 리소스로 바꾸고, 다른 사용자/프로젝트의 기록은 건드리지 않습니다.
+        (커밋은 호출자가 리소스와 함께 수행)
+        """
+        if not self.use_db or not rows:
+            return
+        statement = pg_insert(ResourceContentHash.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(RESOURCE_CONTENT_HASH_SCOPE),
+            set_={'resource_id': statement.excluded.resource_id, 'created_at': statement.excluded.created_at}
+        )
+        session.execute(statement, [
+            {
+                "content_hash": content_hash,
+                "user_id": self.user_id,
+                "project_id": self.project_id,
+                "resource_id": resource_id,
+            }
+            for content_hash, resource_id in rows
+        ])
+
+    def record(self, content_hash: str, resource_id: int, resource_uuid: str = None,
+               image_path: str = None) -> None:
+        """리소스 생성이 커밋된 뒤 로컬 인덱스에 기록합니다."""
+        self._add_local([(content_hash, resource_id, resource_uuid, image_path)])
+
+    def _add_local(self, rows: List[Tuple[str, int, Optional[str], Optional[str]]]) -> None:
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO content_hash
+                    (content_hash, user_id, project_id, resource_id, resource_uuid, image_path, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (content_hash, self.user_id, self.project_id, resource_id, resource_uuid, image_path, now)
+                    for content_hash, resource_id, resource_uuid, image_path in rows
+                ]
+            )
+            self._conn.commit()
+
+    def _remove_local(self, hashes: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM content_hash WHERE content_hash = ? AND user_id IS ? AND project_id IS ?",
+                [(content_hash, self.user_id, self.project_id) for content_hash in hashes]
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import math
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+# GCP and Vertex AI imports
+try:
+    import vertexai
+    from vertexai.vision_models import Image as VertexImage, MultiModalEmbeddingModel
+    from google.oauth2 import service_account
+except ImportError:
+    MultiModalEmbeddingModel = None # Handle missing library
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from storage_backend import get_storage_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROJECT_ID = "453518888734"
+DEFAULT_REGION = "asia-northeast3"
+EMBEDDING_BUCKET_NAME = "wcidfu-bucket"
+EMBEDDING_MODEL_NAME = "multimodalembedding@001"
+# multimodalembedding@001 이미지 임베딩 기본 차원 (로컬 백엔드도 같은 차원으로 맞춤)
+DEFAULT_EMBEDDING_DIMENSION = 1408
+
+# (project_id, region) -> 모델. 프로세스당 한 번만 초기화
+_models: Dict[tuple, object] = {}
+_models_lock = threading.Lock()
+
+
+def load_embedding_model(project_id: str = DEFAULT_PROJECT_ID, region: str = DEFAULT_REGION):
+    """
+    Vertex AI를 초기화하고 멀티모달 임베딩 모델을 불러옵니다.
+    같은 (project_id, region)에 대해서는 프로세스당 한 번만 초기화하고 이후에는 같은 모델을 반환합니다.
+
+    Returns:
+        모델 객체 (라이브러리가 없거나 초기화에 실패하면 None)
+    """
+    if not MultiModalEmbeddingModel:
+        logger.error("Vertex AI 라이브러리가 없어 모델을 초기화할 수 없습니다. `pip install google-cloud-aiplatform`를 실행해주세요.")
+        return None
+
+    key = (project_id, region)
+    with _models_lock:
+        if key in _models:
+            return _models[key]
+
+        try:
+            logger.info("Vertex AI 인증 및 초기화 시작...")
+
+            # --- 인증 정보 명시적 로드 ---
+            # 현재 스크립트의 디렉토리를 기준으로 인증 파일 경로 설정
+            current_script_path = os.path.abspath(__file__)
+            base_directory = os.path.dirname(current_script_path)
+            credentials_path = os.path.join(base_directory, 'wcidfu-77f802b00777.json')
+
+            if os.path.exists(credentials_path):
+                credentials = service_account.Credentials.from_service_account_file(credentials_path)
+                logger.info(f"서비스 계정 '{credentials.service_account_email}'을 사용하여 인증합니다.")
+            else:
+                credentials = None
+                logger.warning(f"인증 파일 '{credentials_path}'을 찾을 수 없습니다. 기본 인증(ADC)을 시도합니다.")
+            # ---------------------------
+
+            vertexai.init(
+                project=project_id,
+                location=region,
+                credentials=credentials # 명시적으로 인증 정보 전달
+            )
+            logger.info(f"Vertex AI 초기화 완료 (Project: {project_id}, Region: {region})")
+
+            logger.info("Vertex AI 모델 로딩 중...")
+            model = MultiModalEmbeddingModel.from_pretrained(EMBEDDING_MODEL_NAME)
+            logger.info("Vertex AI 모델이 성공적으로 초기화되었습니다.")
+        except Exception as e:
+            logger.error(f"Vertex AI 모델 초기화 중 오류 발생: {e}", exc_info=True)
+            return None
+
+        _models[key] = model
+        return model
+
+
+class EmbeddingBackend:
+    """
+    이미지 임베딩을 만드는 백엔드 인터페이스.
+    기본은 Vertex AI이며, 벤치마크/테스트에서는 로컬 구현으로 교체하여 네트워크 없이 실행할 수 있습니다.
+    """
+
+    # 차원 수
+    dimension = DEFAULT_EMBEDDING_DIMENSION
+    # True면 호출자가 로컬에 있는 원본 바이트를 읽어서 넘겨주는 편이 유리함
+    prefers_bytes = False
+    # True면 실제 모델 벡터가 아님 (운영 테이블에 저장하면 안 되며 EmbeddingService에 sink를 지정해야 함)
+    synthetic = False
+
+    @property
+    def available(self) -> bool:
+        """임베딩을 만들 준비가 되었는지 여부"""
+        return True
+
+    def embed(self, image: str, data: Optional[bytes] = None) -> List[float]:
+        """
+        이미지 하나의 임베딩 벡터를 만듭니다.
+
+        Args:
+            image: 리소스 이미지 경로 (버킷의 _media/ 아래 객체 이름)
+            data: 이미 메모리에 있는 원본 바이트 (있으면 다시 내려받지 않고 사용)
+
+        Raises:
+            RuntimeError: 임베딩을 만들 수 없는 경우
+        """
+        raise NotImplementedError
+
+
+class VertexEmbeddingBackend(EmbeddingBackend):
+    """
+    Vertex AI 멀티모달 임베딩 백엔드.
+    바이트가 없으면 gs:// URI를 넘겨 Vertex AI가 버킷에서 직접 읽게 합니다.
+    (이미 업로드된 이미지는 URI로 보내는 편이 요청이 작으므로 prefers_bytes는 False)
+
+    Args:
+        project_id: GCP 프로젝트 ID
+        region: Vertex AI 리전
+        bucket_name: 리소스 이미지가 있는 버킷
+    """
+
+    def __init__(self, project_id: str = DEFAULT_PROJECT_ID, region: str = DEFAULT_REGION,
+                 bucket_name: str = EMBEDDING_BUCKET_NAME):
+        self.bucket_name = bucket_name
+        self.model = load_embedding_model(project_id, region)
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    def gcs_uri(self, image: str) -> str:
+        """리소스 이미지 경로의 gs:// URI를 반환합니다."""
+        return f"gs://{self.bucket_name}/_media/{image}"
+
+    def embed(self, image, data=None):
+        if not self.model:
+            raise RuntimeError("Vertex AI 모델이 준비되지 않아 임베딩을 생성할 수 없습니다.")
+        if data is not None:
+            source = f"{len(data)} bytes"
+            vertex_image = VertexImage(image_bytes=data)
+        else:
+            source = self.gcs_uri(image)
+            vertex_image = VertexImage(gcs_uri=source)
+        vector = self.model.get_embeddings(image=vertex_image).image_embedding
+        if not vector:
+            raise RuntimeError(f"빈 임베딩이 반환되었습니다: {source}")
+        return vector
+
+
+class _LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    로컬 CPU 백엔드의 공통 부분 (벤치마크/테스트 전용, synthetic).
+    바이트가 없으면 storage_backend에 설정된 백엔드에서 _media/ 객체를 읽고, 그래도 없으면 RuntimeError를 발생시킵니다.
+
+    Args:
+        dimension: 벡터 차원 수
+        bucket_name: storage_backend에서 읽을 버킷
+        latency: 요청당 모의 지연(초) - 원격 모델 호출 시간을 흉내 낼 때 사용
+    """
+
+    prefers_bytes = True
+    synthetic = True
+
+    def __init__(self, dimension: int = DEFAULT_EMBEDDING_DIMENSION, bucket_name: str = EMBEDDING_BUCKET_NAME,
+                 latency: float = 0.0):
+        self.dimension = dimension
+        self.bucket_name = bucket_name
+        self.latency = latency
+
+    def _load_bytes(self, image: str, data: Optional[bytes]) -> Optional[bytes]:
+        if data is not None:
+            return data
+        storage = get_storage_backend()
+        if storage is None:
+            return None
+        try:
+            return storage.download(self.bucket_name, f"_media/{image}")
+        except FileNotFoundError:
+            return None
+
+    def embed(self, image, data=None):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        data = self._load_bytes(image, data)
+        if data is None:
+            raise RuntimeError(f"이미지 바이트를 찾을 수 없습니다: {image}")
+        return self._embed_bytes(image, data)
+
+    def _embed_bytes(self, image: str, data: bytes) -> List[float]:
+        raise NotImplementedError
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class HashEmbeddingBackend(_LocalEmbeddingBackend):
+    """
+    내용 해시로 만든 결정적 단위 벡터를 반환하는 백엔드 (테스트/벤치마크용).
+    같은 바이트는 항상 같은 벡터가 됩니다.
+    """
+
+    def _embed_bytes(self, image, data):
+        # 값마다 2바이트씩 뽑아 [-1, 1) 구간으로 변환
+        digest = hashlib.shake_256(data).digest(self.dimension * 2)
+        vector = [
+            int.from_bytes(digest[i:i + 2], 'little') / 32768.0 - 1.0
+            for i in range(0, len(digest), 2)
+        ]
+        return _normalize(vector)
+
+
+class ThumbnailEmbeddingBackend(_LocalEmbeddingBackend):
+    """
+    작은 썸네일의 픽셀 값을 고정된 랜덤 투영으로 펼친 특징 벡터를 반환하는 백엔드 (NumPy 필요).
+    비슷한 이미지는 비슷한 벡터가 되므로 유사도 검색을 오프라인에서 확인할 때 사용할 수 있습니다.
+
+    Args:
+        thumbnail_size: 특징을 뽑을 썸네일 한 변의 크기
+        seed: 투영 행렬 시드 (같은 시드끼리만 벡터를 비교할 수 있음)
+    """
+
+    def __init__(self, dimension: int = DEFAULT_EMBEDDING_DIMENSION, bucket_name: str = EMBEDDING_BUCKET_NAME,
+                 latency: float = 0.0, thumbnail_size: int = 16, seed: int = 0):
+        super().__init__(dimension, bucket_name, latency)
+        if np is None:
+            raise RuntimeError("ThumbnailEmbeddingBackend에는 numpy가 필요합니다. `pip install numpy`를 실행해주세요.")
+        self.thumbnail_size = thumbnail_size
+        features = thumbnail_size * thumbnail_size * 3
+        rng = np.random.default_rng(seed)
+        self._projection = rng.standard_normal((features, dimension)).astype(np.float32) / math.sqrt(dimension)
+
+    def _embed_bytes(self, image, data):
+        # Pillow는 PNG 디코딩에만 사용 (지연 임포트)
+        from PIL import Image as PILImage
+        with PILImage.open(io.BytesIO(data)) as original:
+            thumbnail = original.convert('RGB').resize((self.thumbnail_size, self.thumbnail_size))
+            pixels = np.asarray(thumbnail, dtype=np.float32).reshape(-1) / 255.0
+        # 이미지별 평균을 빼면 단색 이미지끼리 모두 0 벡터가 되므로 고정값으로 중심을 맞춰 색 정보를 유지
+        pixels -= 0.5
+        vector = pixels @ self._projection
+        norm = float(np.linalg.norm(vector)) or 1.0
+        return (vector / norm).tolist()
+
+
+# 이름 -> 로컬 백엔드 클래스 (명령행에서 선택할 때 사용)
+LOCAL_EMBEDDING_BACKENDS = {
+    'hash': HashEmbeddingBackend,
+    'thumbnail': ThumbnailEmbeddingBackend,
+}
+
+
+# 프로세스 전역 백엔드 (None이면 Vertex AI 사용)
+_embedding_backend: Optional[EmbeddingBackend] = None
+
+
+def set_embedding_backend(backend: Optional[EmbeddingBackend]) -> None:
+    """
+    임베딩에 사용할 백엔드를 교체합니다. None을 넘기면 기본 Vertex AI로 돌아갑니다.
+    """
+    global _embedding_backend
+    _embedding_backend = backend
+
+
+def get_embedding_backend() -> Optional[EmbeddingBackend]:
+    """
+    설정된 백엔드를 반환합니다. 설정되지 않았으면 None을 반환합니다.
+    """
+    return _embedding_backend
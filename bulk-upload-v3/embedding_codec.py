@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+import json
+import struct
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 저장 형식
+# - 'text': 기존 방식과 같이 embedding 컬럼에 str(list) (기본값 - embedding 컬럼을 읽는 기존 코드와 호환)
+# - 'both': 두 컬럼 모두 기록 (전환 기간용)
+# - 'float32': embedding_vector 컬럼에 float32 리틀엔디안 바이트만 기록 (1408차원 = 5632바이트)
+#   embedding 컬럼이 NULL이 되므로 모든 읽는 쪽이 embedding_vector를 읽을 수 있을 때만 명시적으로 선택
+EMBEDDING_FORMAT_TEXT = 'text'
+EMBEDDING_FORMAT_BOTH = 'both'
+EMBEDDING_FORMAT_FLOAT32 = 'float32'
+EMBEDDING_FORMATS = (EMBEDDING_FORMAT_TEXT, EMBEDDING_FORMAT_BOTH, EMBEDDING_FORMAT_FLOAT32)
+DEFAULT_EMBEDDING_FORMAT = EMBEDDING_FORMAT_TEXT
+
+FLOAT32_SIZE = 4
+
+
+def encode_embedding(vector: Sequence[float]) -> bytes:
+    """벡터를 float32 리틀엔디안 바이트로 변환합니다."""
+    if np is not None:
+        return np.asarray(vector, dtype='<f4').tobytes()
+    return struct.pack(f'<{len(vector)}f', *vector)
+
+
+def decode_embedding(data: bytes) -> List[float]:
+    """encode_embedding()으로 만든 바이트를 float 리스트로 되돌립니다."""
+    if len(data) % FLOAT32_SIZE:
+        raise ValueError(f"float32 벡터 바이트 길이가 올바르지 않습니다: {len(data)}")
+    return list(struct.unpack(f'<{len(data) // FLOAT32_SIZE}f', data))
+
+
+def decode_embedding_array(data: bytes):
+    """바이트를 복사 없이 float32 NumPy 배열로 읽습니다. (NumPy 필요)"""
+    if np is None:
+        raise RuntimeError("decode_embedding_array()에는 numpy가 필요합니다. `pip install numpy`를 실행해주세요.")
+    return np.frombuffer(data, dtype='<f4')
+
+
+def parse_text_embedding(text: str) -> List[float]:
+    """이전 형식(str(list))의 임베딩 텍스트를 float 리스트로 변환합니다."""
+    try:
+        values = json.loads(text)
+    except ValueError:
+        # nan/inf 등 JSON으로 읽을 수 없는 값이 있으면 파이썬 리터럴로 읽음
+        values = ast.literal_eval(text)
+    return [float(value) for value in values]
+
+
+def embedding_columns(vector: Sequence[float], storage_format: str = DEFAULT_EMBEDDING_FORMAT) -> Dict[str, object]:
+    """
+    저장 형식에 맞는 {embedding, embedding_vector} 컬럼 값을 만듭니다.
+    사용하지 않는 컬럼은 None으로 채워 다시 임베딩할 때 이전 벡터가 남지 않게 합니다.
+    """
+    if storage_format == EMBEDDING_FORMAT_TEXT:
+        return {"embedding": str(list(vector)), "embedding_vector": None}
+    if storage_format == EMBEDDING_FORMAT_BOTH:
+        return {"embedding": str(list(vector)), "embedding_vector": encode_embedding(vector)}
+    if storage_format == EMBEDDING_FORMAT_FLOAT32:
+        return {"embedding": None, "embedding_vector": encode_embedding(vector)}
+    raise ValueError(f"지원하지 않는 임베딩 저장 형식입니다: {storage_format}")
+
+
+def stored_embedding(embedding_text: Optional[str], embedding_vector: Optional[bytes]) -> Optional[List[float]]:
+    """
+    저장된 행에서 벡터를 읽습니다. float32 컬럼이 있으면 우선 사용하고, 없으면 텍스트를 파싱합니다.
+    """
+    if embedding_vector is not None:
+        return decode_embedding(bytes(embedding_vector))
+    if embedding_text:
+        return parse_text_embedding(embedding_text)
+    return None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, func, select, update
+from tqdm import tqdm
+
+from models import VertexAiEmbedDbEmbeddings
+from session_utills import get_connection_broker
+from embedding_codec import encode_embedding, parse_text_embedding
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKFILL_BATCH_SIZE = 500
+
+
+def embedding_storage_counts() -> Dict[str, int]:
+    """
+    저장 형식별 행 수를 반환합니다.
+
+    Returns:
+        dict: {'text_only': 텍스트만 있는 행, 'vector': float32 컬럼이 있는 행, 'both': 두 형식 모두 있는 행}
+    """
+    table = VertexAiEmbedDbEmbeddings.__table__
+    has_text = table.c.embedding.isnot(None)
+    has_vector = table.c.embedding_vector.isnot(None)
+    with get_connection_broker().session_scope() as session:
+        return {
+            'text_only': session.scalar(select(func.count()).where(has_text, ~has_vector)),
+            'vector': session.scalar(select(func.count()).where(has_vector)),
+            'both': session.scalar(select(func.count()).where(has_text, has_vector)),
+        }
+
+
+def backfill_embedding_vectors(batch_size: int = DEFAULT_BACKFILL_BATCH_SIZE, clear_text: bool = False,
+                               limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    텍스트(str(list))로만 저장된 임베딩을 float32 bytea(embedding_vector)로 변환합니다.
+    file_based_uuid 순서로 batch_size개씩 읽어 배치마다 커밋하므로, 중간에 멈춰도 다시 실행하면
+    아직 변환되지 않은 행부터 이어서 처리합니다.
+
+    Args:
+        batch_size: 한 트랜잭션에서 변환할 행 수
+        clear_text: True면 변환한 행의 텍스트 컬럼을 NULL로 비움 (저장 공간 회수)
+                    embedding 컬럼을 읽는 곳이 모두 embedding_vector로 바뀐 뒤에만 사용
+        limit: 최대 변환 행 수 (None이면 전체)
+
+    Returns:
+        dict: {'converted': 변환한 행 수, 'error': 파싱하지 못해 건너뛴 행 수}
+    """
+    table = VertexAiEmbedDbEmbeddings.__table__
+    pending = (table.c.embedding.isnot(None), table.c.embedding_vector.is_(None))
+    broker = get_connection_broker()
+
+    with broker.session_scope() as session:
+        total = session.scalar(select(func.count()).where(*pending))
+    if limit is not None:
+        total = min(total, limit)
+
+    values = {"embedding_vector": bindparam("b_vector")}
+    if clear_text:
+        values["embedding"] = None
+    statement = update(table).where(table.c.file_based_uuid == bindparam("b_uuid")).values(**values)
+
+    result = {'converted': 0, 'error': 0}
+    last_uuid = None
+    with tqdm(total=total, desc="임베딩 변환 중") as progress:
+        while result['converted'] + result['error'] < total:
+            size = min(batch_size, total - result['converted'] - result['error'])
+            with broker.session_scope() as session:
+                query = select(table.c.file_based_uuid, table.c.embedding).where(*pending)
+                if last_uuid is not None:
+                    query = query.where(table.c.file_based_uuid > last_uuid)
+                rows = session.execute(query.order_by(table.c.file_based_uuid).limit(size)).all()
+                if not rows:
+                    break
+                last_uuid = rows[-1].file_based_uuid
+
+                params = []
+                for uuid, text in rows:
+                    try:
+                        params.append({"b_uuid": uuid, "b_vector": encode_embedding(parse_text_embedding(text))})
+                    except (ValueError, SyntaxError, TypeError) as e:
+                        logger.error(f"임베딩 텍스트를 읽을 수 없어 건너뜁니다 (UUID: {uuid}): {e}")
+                        result['error'] += 1
+                if params:
+                    session.execute(statement, params)
+            result['converted'] += len(params)
+            progress.update(len(rows))
+
+    logger.info(f"임베딩 변환 완료: {result['converted']}개 변환, {result['error']}개 실패")
+    return result
+
+
+def migrate_embeddings_interactive():
+    """대화형 임베딩 저장 형식 변환 함수"""
+    print("\n===== 임베딩 저장 형식 변환 (텍스트 -> float32) =====")
+
+    counts = embedding_storage_counts()
+    print(f"텍스트만 있음: {counts['text_only']}개, float32 저장됨: {counts['vector']}개 (그 중 텍스트도 남아 있음: {counts['both']}개)")
+    if not counts['text_only']:
+        print("변환할 행이 없습니다.")
+        return
+
+    print("※ embedding(텍스트) 컬럼을 읽는 곳이 남아 있으면 텍스트 컬럼을 비우지 마세요.")
+    clear_prompt = input("변환한 행의 텍스트 컬럼을 비우시겠습니까? (y/n, 기본값=n): ").strip().lower()
+    try:
+        batch_size = int(input(f"배치 크기를 입력하세요 (기본값: {DEFAULT_BACKFILL_BATCH_SIZE}): ").strip() or DEFAULT_BACKFILL_BATCH_SIZE)
+        if batch_size <= 0:
+            batch_size = DEFAULT_BACKFILL_BATCH_SIZE
+    except ValueError:
+        batch_size = DEFAULT_BACKFILL_BATCH_SIZE
+
+    result = backfill_embedding_vectors(batch_size=batch_size, clear_text=(clear_prompt == 'y'))
+    print(f"\n처리 완료: 변환 {result['converted']}개, 실패 {result['error']}개")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    migrate_embeddings_interactive()
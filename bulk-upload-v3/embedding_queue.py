@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from tqdm import tqdm
+
+from resource_embedding_helper import EmbeddingService, EmbeddingJob, DEFAULT_EMBEDDING_QPS, DEFAULT_EMBEDDING_WORKERS
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_QUEUE_DB_FILE_NAME = 'embedding_queue.sqlite3'
+# 같은 작업을 이 횟수만큼 실패하면 'failed'로 남기고 더 이상 시도하지 않음
+DEFAULT_MAX_ATTEMPTS = 3
+# 실패한 작업을 다시 꺼내기 전 대기 시간(초). 실패할 때마다 두 배로 늘어남 (30초, 60초, ...)
+DEFAULT_RETRY_DELAY = 30.0
+
+STATUS_PENDING = 'pending'
+STATUS_IN_PROGRESS = 'in_progress'
+STATUS_FAILED = 'failed'
+
+
+class EmbeddingQueue:
+    """
+    업로드가 끝난 리소스의 임베딩 작업을 로컬 SQLite 파일에 쌓아 두는 내구성 있는 큐.
+    업로드는 큐에 넣기만 하고, drain_embedding_queue()가 별도로 꺼내서 처리합니다.
+    완료된 작업은 삭제되며, 처리 중 프로그램이 종료되면 다음 실행 시 recover()로 다시 대기 상태가 됩니다.
+    실패한 작업은 not_before(에포크 초)가 지날 때까지 claim()에서 꺼내지 않습니다.
+
+    Args:
+        db_path: SQLite 파일 경로 (기본값: 스크립트 폴더의 embedding_queue.sqlite3)
+    """
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), EMBEDDING_QUEUE_DB_FILE_NAME)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_job (
+                resource_id INTEGER PRIMARY KEY,
+                resource_uuid TEXT NOT NULL,
+                image TEXT NOT NULL,
+                image_path TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                not_before REAL,
+                created_at TEXT,
+                updated_at TEXT
+            )
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(embedding_job)")]
+        if 'not_before' not in columns:
+            # 재시도 대기 시간이 없던 이전 형식의 큐 파일
+            self._conn.execute("ALTER TABLE embedding_job ADD COLUMN not_before REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embedding_job_status ON embedding_job (status)")
+        self._conn.commit()
+
+    def enqueue(self, job: EmbeddingJob) -> None:
+        """작업 하나를 큐에 넣습니다."""
+        self.enqueue_many([job])
+
+    def enqueue_many(self, jobs: Iterable[EmbeddingJob]) -> int:
+        """
+        작업 여러 개를 한 트랜잭션으로 큐에 넣습니다. 같은 리소스가 이미 있으면 다시 대기 상태로 돌립니다.
+
+        Returns:
+            int: 넣은 작업 수
+        """
+        now = datetime.now().isoformat()
+        rows = [
+            (job.resource_id, str(job.resource_uuid), job.image, job.image_path, STATUS_PENDING, now, now)
+            for job in jobs if job.image
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO embedding_job
+                    (resource_id, resource_uuid, image, image_path, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (resource_id) DO UPDATE SET
+                    resource_uuid = excluded.resource_uuid,
+                    image = excluded.image,
+                    image_path = excluded.image_path,
+                    status = excluded.status,
+                    attempts = 0,
+                    last_error = NULL,
+                    not_before = NULL,
+                    updated_at = excluded.updated_at
+                """,
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def recover(self) -> int:
+        """
+        이전 실행에서 처리 중에 멈춘 작업을 다시 대기 상태로 돌립니다. (큐를 비우기 전에 1회 호출)
+
+        Returns:
+            int: 되돌린 작업 수
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE embedding_job SET status = ?, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, datetime.now().isoformat(), STATUS_IN_PROGRESS)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def claim(self, limit: int) -> List[EmbeddingJob]:
+        """재시도 대기 시간이 지난 대기 작업을 최대 limit개 꺼내 처리 중 상태로 바꿉니다."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT resource_id, resource_uuid, image, image_path FROM embedding_job
+                WHERE status = ? AND (not_before IS NULL OR not_before <= ?)
+                ORDER BY resource_id LIMIT ?
+                """,
+                (STATUS_PENDING, time.time(), limit)
+            ).fetchall()
+            if rows:
+                self._conn.executemany(
+                    "UPDATE embedding_job SET status = ?, updated_at = ? WHERE resource_id = ?",
+                    [(STATUS_IN_PROGRESS, datetime.now().isoformat(), row[0]) for row in rows]
+                )
+                self._conn.commit()
+        return [EmbeddingJob(*row) for row in rows]
+
+    def mark_done(self, resource_id: int) -> None:
+        """완료된 작업을 큐에서 삭제합니다."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embedding_job WHERE resource_id = ?", (resource_id,))
+            self._conn.commit()
+
+    def mark_failed(self, resource_id: int, error: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                    retry_delay: float = DEFAULT_RETRY_DELAY) -> bool:
+        """
+        실패를 기록합니다. 시도 횟수가 max_attempts보다 적으면 다시 대기 상태로 돌립니다.
+        다시 꺼낼 수 있는 시각은 retry_delay * 2^(이전 실패 횟수)초 뒤로 미룹니다.
+
+        Returns:
+            bool: 다시 시도할 예정이면 True
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE embedding_job
+                SET attempts = attempts + 1,
+                    last_error = ?,
+                    status = CASE WHEN attempts + 1 < ? THEN ? ELSE ? END,
+                    not_before = ? + ? * (1 << attempts),
+                    updated_at = ?
+                WHERE resource_id = ?
+                """,
+                (error, max_attempts, STATUS_PENDING, STATUS_FAILED, time.time(), retry_delay,
+                 datetime.now().isoformat(), resource_id)
+            )
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT status FROM embedding_job WHERE resource_id = ?", (resource_id,)
+            ).fetchone()
+        return bool(row) and row[0] == STATUS_PENDING
+
+    def retry_failed(self) -> int:
+        """'failed' 상태의 작업을 시도 횟수를 초기화하여 다시 대기 상태로 돌립니다."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE embedding_job SET status = ?, attempts = 0, not_before = NULL, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, datetime.now().isoformat(), STATUS_FAILED)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def next_retry_delay(self) -> Optional[float]:
+        """
+        가장 빨리 꺼낼 수 있는 대기 작업까지 남은 시간(초)을 반환합니다.
+
+        Returns:
+            float: 남은 시간 (바로 꺼낼 수 있으면 0), 대기 작업이 없으면 None
+        """
+        with self._lock:
+            count, not_before = self._conn.execute(
+                "SELECT COUNT(*), MIN(IFNULL(not_before, 0)) FROM embedding_job WHERE status = ?",
+                (STATUS_PENDING,)
+            ).fetchone()
+        if not count:
+            return None
+        return max(0.0, not_before - time.time())
+
+    def counts(self) -> Dict[str, int]:
+        """상태별 작업 수를 반환합니다."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM embedding_job GROUP BY status"
+            ).fetchall()
+        counts = {STATUS_PENDING: 0, STATUS_IN_PROGRESS: 0, STATUS_FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def drain_embedding_queue(embedding_queue: EmbeddingQueue, qps: float = DEFAULT_EMBEDDING_QPS,
+                          max_workers: int = DEFAULT_EMBEDDING_WORKERS, claim_size: int = 100,
+                          max_attempts: int = DEFAULT_MAX_ATTEMPTS, retry_delay: float = DEFAULT_RETRY_DELAY,
+                          service: Optional[EmbeddingService] = None) -> Dict[str, int]:
+    """
+    큐가 빌 때까지 작업을 꺼내 EmbeddingService로 처리합니다.
+    한 번에 claim_size개까지만 처리 중 상태로 두므로 중간에 종료되어도 다시 실행하면 이어서 처리합니다.
+
+    Args:
+        embedding_queue: 처리할 큐
+        qps: 초당 최대 Vertex AI 요청 수
+        max_workers: 동시 요청 스레드 수
+        claim_size: 한 번에 꺼내는 작업 수
+        max_attempts: 작업당 최대 시도 횟수
+        retry_delay: 실패한 작업을 다시 꺼내기 전 첫 대기 시간(초)
+        service: 사용할 EmbeddingService (없으면 새로 만들고 끝나면 종료)
+
+    Returns:
+        dict: {'success': 성공 수, 'error': 이번 실행의 실패 수, 'failed': 최종 실패로 남은 수}
+    """
+    recovered = embedding_queue.recover()
+    if recovered:
+        print(f"이전 실행에서 중단된 작업 {recovered}개를 다시 처리합니다.")
+
+    total = embedding_queue.counts()[STATUS_PENDING]
+    result = {'success': 0, 'error': 0}
+    if not total:
+        print("처리할 임베딩 작업이 없습니다.")
+        result['failed'] = embedding_queue.counts()[STATUS_FAILED]
+        return result
+
+    lock = threading.Condition()
+    outstanding = 0
+    progress = tqdm(total=total, desc="임베딩 처리 중")
+
+    def on_result(job: EmbeddingJob, error: Optional[Exception]):
+        nonlocal outstanding
+        retry = False
+        if error is None:
+            embedding_queue.mark_done(job.resource_id)
+        else:
+            retry = embedding_queue.mark_failed(job.resource_id, str(error), max_attempts, retry_delay)
+        with lock:
+            if retry:
+                # 다시 대기 상태로 돌아간 작업은 진행률 전체 개수에 다시 포함
+                progress.total += 1
+            outstanding -= 1
+            result['success' if error is None else 'error'] += 1
+            progress.update(1)
+            lock.notify_all()
+
+    own_service = service is None
+    if own_service:
+        service = EmbeddingService(qps=qps, max_workers=max_workers, on_result=on_result)
+    else:
+        service.on_result = on_result
+
+    try:
+        while True:
+            # 처리 중인 작업이 claim_size 이하가 될 때까지 기다린 뒤 다음 묶음을 꺼냄
+            with lock:
+                while outstanding >= claim_size:
+                    lock.wait()
+            jobs = embedding_queue.claim(claim_size)
+            if not jobs:
+                with lock:
+                    # on_result()는 큐에 기록한 뒤 outstanding을 줄이므로 잠금 안에서 남은 작업을 확인
+                    delay = embedding_queue.next_retry_delay()
+                    if outstanding == 0 and delay is None:
+                        break
+                    # 진행 중인 작업이 끝나거나 재시도 대기 시간이 지날 때까지 기다림
+                    lock.wait(timeout=delay)
+                continue
+            with lock:
+                outstanding += len(jobs)
+            service.submit_many(jobs)
+    finally:
+        if own_service:
+            service.close()
+        progress.close()
+
+    result['failed'] = embedding_queue.counts()[STATUS_FAILED]
+    return result
+
+
+def process_embedding_queue_interactive():
+    """대화형 지연 임베딩 큐 처리 함수"""
+    print("\n===== 지연 임베딩 큐 처리 =====")
+
+    embedding_queue = EmbeddingQueue()
+    try:
+        counts = embedding_queue.counts()
+        print(f"대기 {counts[STATUS_PENDING]}개, 중단됨 {counts[STATUS_IN_PROGRESS]}개, 실패 {counts[STATUS_FAILED]}개")
+
+        if counts[STATUS_FAILED]:
+            retry = input("실패한 작업도 다시 시도하시겠습니까? (y/n): ").strip().lower()
+            if retry == 'y':
+                embedding_queue.retry_failed()
+
+        try:
+            qps = float(input(f"초당 요청 수를 입력하세요 (기본값: {DEFAULT_EMBEDDING_QPS}): ").strip() or DEFAULT_EMBEDDING_QPS)
+            if qps <= 0:
+                qps = DEFAULT_EMBEDDING_QPS
+        except ValueError:
+            qps = DEFAULT_EMBEDDING_QPS
+
+        result = drain_embedding_queue(embedding_queue, qps=qps)
+        print(f"\n처리 완료: 성공 {result['success']}개, 실패 {result['error']}개 (최종 실패 {result['failed']}개)")
+    finally:
+        embedding_queue.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    process_embedding_queue_interactive()
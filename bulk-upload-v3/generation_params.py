@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import re
+from typing import Dict, Any
+
+# "키: 값" 쌍 하나를 매칭하는 패턴 (모듈 로드 시 한 번만 컴파일)
+# - 값이 따옴표로 감싸진 경우 내부의 쉼표/이스케이프 문자를 그대로 포함
+# - 그 외에는 쉼표 또는 줄바꿈 전까지를 값으로 사용
+RE_PARAM = re.compile(r'\s*(\w[\w \-/]*):\s*("(?:\\.|[^\\"])*"|[^,\n]*)(?:,|\n|$)')
+
+NEGATIVE_PROMPT_MARKER = "Negative prompt:"
+PARAMS_MARKER = "Steps:"
+
+
+def unquote(text: str) -> str:
+    """
+    따옴표로 감싸진 값을 풀어냅니다. 감싸져 있지 않으면 공백만 제거합니다.
+    """
+    text = text.strip()
+    if len(text) < 2 or text[0] != '"' or text[-1] != '"':
+        return text
+
+    try:
+        return json.loads(text)
+    except Exception:
+        return text[1:-1]
+
+
+def parse_params_line(params_text: str) -> Dict[str, str]:
+    """
+    파라미터 문자열을 한 번만 훑으면서 모든 "키: 값" 쌍을 딕셔너리로 반환합니다.
+
+    Args:
+        params_text (str): "Steps: 20, Sampler: Euler a, ..." 형태의 문자열
+
+    Returns:
+        dict: 키 -> 값 (따옴표는 제거됨)
+    """
+    return {
+        key.strip(): unquote(value)
+        for key, value in RE_PARAM.findall(params_text)
+    }
+
+
+def parse_generation_parameters(x: str) -> Dict[str, Any]:
+    """
+    스테이블 디퓨전 생성 파라미터를 파싱합니다.
+    네거티브 프롬프트와 "Steps:"를 기준으로 프롬프트/네거티브 프롬프트/파라미터를 분리하고,
+    파라미터 영역은 컴파일된 패턴으로 한 번만 순회하여 모든 키를 추출합니다.
+
+    Args:
+        x (str): 파싱할 생성 파라미터 문자열
+
+    Returns:
+        dict: 파싱된 파라미터를 담은 딕셔너리
+    """
+    res = {}
+
+    neg_start = x.find(NEGATIVE_PROMPT_MARKER)
+    search_from = neg_start if neg_start != -1 else 0
+    params_start = x.find(PARAMS_MARKER, search_from)
+
+    if neg_start != -1:
+        res["Prompt"] = x[:neg_start].strip()
+        neg_end = params_start if params_start != -1 else len(x)
+        res["Negative prompt"] = x[neg_start + len(NEGATIVE_PROMPT_MARKER):neg_end].strip()
+    elif params_start != -1:
+        res["Prompt"] = x[:params_start].strip()
+    else:
+        # 파라미터가 없는 경우 전체를 프롬프트로 처리
+        res["Prompt"] = x.strip()
+
+    if params_start == -1:
+        return res
+
+    controlnet_idx = 0
+    for key, value in parse_params_line(x[params_start:]).items():
+        # ControlNet 항목은 내부의 키-값 쌍을 다시 딕셔너리로 분리
+        if key.startswith("ControlNet "):
+            res[f"ControlNet {controlnet_idx}"] = parse_params_line(value)
+            controlnet_idx += 1
+        else:
+            res[key] = value
+
+    return res
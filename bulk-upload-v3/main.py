@@ -237,6 +237,10 @@ def show_menu():
     print("2. 태그 검색")
     print("3. 프롬프트 태그 분석")
     print("4. 7일간 임베딩 누락 리소스 임베딩하기")
+    print("5. DB 스키마 초기화 (모델 변경 후 1회)")
+    print("6. 지연 임베딩 큐 처리")
+    print("7. 임베딩 저장 형식 변환 (텍스트 -> float32)")
+    print("8. 유사 이미지 검색 / 중복 탐지")
     print("0. 종료")
     print("========================")
 
@@ -369,7 +373,7 @@ def main():
         # 메뉴 루프
         while True:
             show_menu()
-            choice = input("메뉴를 선택하세요 (0-4): ").strip()
+            choice = input("메뉴를 선택하세요 (0-8): ").strip()
             
             if choice == '0':
                 print("프로그램을 종료합니다.")
@@ -406,6 +410,43 @@ def main():
                 except Exception as e:
                     logging.error(f"임베딩 누락 리소스 처리 중 오류: {str(e)}")
                     print(f"❌ 임베딩 누락 리소스 처리 중 오류가 발생했습니다: {str(e)}")
+            elif choice == '5':
+                # 누락된 테이블 생성 및 스키마 지문 갱신
+                print("\nDB 스키마 초기화를 실행합니다...")
+                try:
+                    from session_utills import get_connection_broker
+                    get_connection_broker().bootstrap_schema()
+                    print("✅ DB 스키마 초기화가 완료되었습니다.")
+                except Exception as e:
+                    logging.error(f"DB 스키마 초기화 중 오류: {str(e)}")
+                    print(f"❌ DB 스키마 초기화 중 오류가 발생했습니다: {str(e)}")
+            elif choice == '6':
+                # 업로드 시 지연 처리로 쌓아 둔 임베딩 작업 처리
+                print("\n지연 임베딩 큐 처리를 실행합니다...")
+                try:
+                    from embedding_queue import process_embedding_queue_interactive
+                    process_embedding_queue_interactive()
+                except Exception as e:
+                    logging.error(f"지연 임베딩 큐 처리 중 오류: {str(e)}")
+                    print(f"❌ 지연 임베딩 큐 처리 중 오류가 발생했습니다: {str(e)}")
+            elif choice == '7':
+                # 텍스트로 저장된 기존 임베딩을 float32 bytea로 변환
+                print("\n임베딩 저장 형식 변환을 실행합니다...")
+                try:
+                    from embedding_migration import migrate_embeddings_interactive
+                    migrate_embeddings_interactive()
+                except Exception as e:
+                    logging.error(f"임베딩 저장 형식 변환 중 오류: {str(e)}")
+                    print(f"❌ 임베딩 저장 형식 변환 중 오류가 발생했습니다: {str(e)}")
+            elif choice == '8':
+                # 저장된 임베딩으로 만든 로컬 인덱스에서 비슷한 리소스 검색
+                print("\n유사 이미지 검색을 실행합니다...")
+                try:
+                    from similarity_index import similarity_search_interactive
+                    similarity_search_interactive()
+                except Exception as e:
+                    logging.error(f"유사 이미지 검색 중 오류: {str(e)}")
+                    print(f"❌ 유사 이미지 검색 중 오류가 발생했습니다: {str(e)}")
             else:
                 print("유효하지 않은 메뉴 선택입니다. 다시 선택해주세요.")
                 
@@ -195,14 +195,40 @@ class BaseItem:
 
 class BaseManager:
     def __init__(self):
+        # 별칭이 바뀔 때 호출할 함수 목록 (AliasCatalog가 색인/매처를 다시 만들 때 사용)
+        self._listeners = []
         self.items = {}
+
+    @property
+    def items(self):
+        return self._items
+
+    @items.setter
+    def items(self, items):
+        # 하위 클래스가 self.items = {...}로 할당할 때 역색인도 함께 만듦
+        self._items = items
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        """별칭 -> 표준 이름 역색인을 다시 만듭니다. (items를 직접 수정한 뒤 호출)"""
+        self._alias_index = {}
+        for item in self._items.values():
+            for alias in item.aliases:
+                # 같은 별칭이 여러 아이템에 있으면 먼저 정의된 아이템을 사용
+                self._alias_index.setdefault(alias, item.name)
+        self._notify()
+
+    def add_listener(self, listener):
+        """별칭이 바뀔 때마다 인자 없이 호출할 함수를 등록합니다."""
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in list(self._listeners):
+            listener()
     
     def get_standard_name(self, alias):
         """별칭으로 표준 이름을 찾습니다."""
-        for item in self.items.values():
-            if alias in item.aliases:
-                return item.name
-        return None
+        return self._alias_index.get(alias)
     
     def get_item(self, name):
         """이름으로 아이템 객체를 반환합니다."""
@@ -218,6 +244,8 @@ class BaseManager:
         item = self.items.get(name)
         if item:
             item.aliases.append(new_alias)
+            self._alias_index.setdefault(new_alias, item.name)
+            self._notify()
             return True
         return False
 
@@ -1,18 +1,22 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import time
+import uuid
 import logging
 from datetime import datetime, timedelta
 from typing import List, Optional, Tuple, Any
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy import and_, text
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
 # 로컬 모듈 임포트
 from models import Resource, VertexAiEmbedDbEmbeddings, setup_database_engine
-from resource_embedding_helper import ResourceEmbeddingHelper
-from session_utills import get_session, stop_ssh_tunnel  # SSH 터널 관련 함수 import
+from resource_embedding_helper import EmbeddingService, EmbeddingJob, DEFAULT_EMBEDDING_QPS, DEFAULT_EMBEDDING_WORKERS
+from embedding_backend import EmbeddingBackend, LOCAL_EMBEDDING_BACKENDS, EMBEDDING_BUCKET_NAME
+from storage_backend import InMemoryStorageBackend, get_storage_backend, set_storage_backend
+from session_utills import get_session, end_session
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +25,7 @@ class MissingEmbeddingsProcessor:
     
     def __init__(self, user_id: int):
         self.user_id = user_id
-        # get_session()을 사용하여 세션과 SSH 터널 생성
+        # get_session()을 사용하여 공유 터널/연결 풀에서 세션 생성
         self.session_obj, self.ssh_tunnel = get_session()
         self.session = self.session_obj()  # scoped_session에서 실제 세션 가져오기
         
@@ -31,8 +35,7 @@ class MissingEmbeddingsProcessor:
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             self.session.close()
-        if self.ssh_tunnel:
-            stop_ssh_tunnel(self.ssh_tunnel)
+        end_session(self.session_obj, self.ssh_tunnel)
 
     def find_missing_embedding_resources(self, days: int = 7) -> List[Resource]:
         """
@@ -104,99 +107,61 @@ class MissingEmbeddingsProcessor:
 
     def process_embeddings_batch(self, resources: List[Resource], 
                                 batch_size: int = 10,
-                                max_workers: int = 12) -> dict:
+                                max_workers: int = 12,
+                                qps: float = DEFAULT_EMBEDDING_QPS,
+                                backend: Optional[EmbeddingBackend] = None) -> dict:
         """
-        리소스들의 임베딩을 병렬로 배치 처리합니다.
+        리소스들의 임베딩을 EmbeddingService로 병렬 처리합니다.
+        모델은 한 번만 불러오고, 요청은 qps 이하로 동시에 보내며, 결과는 모아서 한 번에 저장합니다.
         
         Args:
             resources (List[Resource]): 처리할 리소스들
             batch_size (int): 진행상황 표시 단위 (기본값: 10)
-            max_workers (int): 최대 워커 스레드 수 (기본값: 12)
+            max_workers (int): 최대 동시 요청 스레드 수 (기본값: 12)
+            qps (float): 초당 최대 Vertex AI 요청 수
+            backend (EmbeddingBackend): 사용할 임베딩 백엔드 (기본값: 설정된 백엔드 또는 Vertex AI)
             
         Returns:
             dict: 처리 결과 통계
         """
         total_count = len(resources)
+        completed_count = 0
         success_count = 0
         error_count = 0
-        errors = []
-        completed_count = 0
         lock = threading.Lock()
         
         print(f"\n🚀 {total_count}개 리소스의 임베딩 처리를 시작합니다...")
-        print(f"🔧 최대 워커 수: {max_workers}")
+        print(f"🔧 최대 워커 수: {max_workers}, 초당 요청 수: {qps}")
         print(f"📦 진행상황 표시 단위: {batch_size}개마다")
         
-        def process_single_resource(resource_id):
-            """단일 리소스 처리 함수 - 각 스레드가 독립적인 세션 사용"""
-            # 각 스레드마다 새로운 세션과 SSH 터널 생성
-            thread_session_obj, thread_ssh_tunnel = get_session()
-            thread_session = thread_session_obj()
-            
-            try:
-                print(f"  🔄 처리 시작: ID {resource_id}")
-                
-                # 새로운 세션으로 ResourceEmbeddingHelper 실행
-                helper = ResourceEmbeddingHelper(
-                    resource_id=resource_id, 
-                    session=thread_session
-                )
-                helper.run()
-                
-                # 커밋
-                thread_session.commit()
-                
-                print(f"  ✅ 완료: ID {resource_id}")
-                return ('success', resource_id, None)
+        def on_result(job: EmbeddingJob, error: Optional[Exception]):
+            nonlocal completed_count, success_count, error_count
+            with lock:
+                completed_count += 1
+                if error is None:
+                    success_count += 1
+                    print(f"  ✅ 완료: ID {job.resource_id}")
+                else:
+                    error_count += 1
+                    print(f"  ❌ 실패: ID {job.resource_id} - {str(error)}")
                 
-            except Exception as e:
-                # 롤백
-                thread_session.rollback()
-                error_msg = f"Resource ID {resource_id}: {str(e)}"
-                logger.error(f"리소스 ID {resource_id} 처리 중 오류: {str(e)}")
-                print(f"  ❌ 실패: ID {resource_id} - {str(e)}")
-                return ('error', resource_id, error_msg)
-                
-            finally:
-                # 세션과 SSH 터널 정리
-                thread_session.close()
-                if thread_ssh_tunnel:
-                    stop_ssh_tunnel(thread_ssh_tunnel)
-        
-        # 리소스 ID 리스트 준비 (Resource 객체 대신 ID만 전달)
-        resource_ids = [r.id for r in resources]
+                # 진행상황 출력
+                if completed_count % batch_size == 0 or completed_count == total_count:
+                    print(f"\n📊 진행상황: {completed_count}/{total_count} 완료 ({(completed_count/total_count)*100:.1f}%)")
+                    print(f"   ✅ 성공: {success_count}, ❌ 실패: {error_count}")
+
+        # 리소스 객체 대신 (ID, UUID, 이미지 경로)만 전달
+        jobs = [EmbeddingJob(r.id, str(r.uuid), r.image) for r in resources]
         
-        # ThreadPoolExecutor를 사용한 병렬 처리
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 모든 작업 제출
-            future_to_resource_id = {
-                executor.submit(process_single_resource, resource_id): resource_id 
-                for resource_id in resource_ids
-            }
-            
-            # 완료된 작업들 처리
-            for future in as_completed(future_to_resource_id):
-                with lock:
-                    completed_count += 1
-                    result = future.result()
-                    
-                    if result[0] == 'success':
-                        success_count += 1
-                    else:
-                        error_count += 1
-                        errors.append(result[2])
-                    
-                    # 진행상황 출력
-                    if completed_count % batch_size == 0 or completed_count == total_count:
-                        print(f"\n📊 진행상황: {completed_count}/{total_count} 완료 ({(completed_count/total_count)*100:.1f}%)")
-                        print(f"   ✅ 성공: {success_count}, ❌ 실패: {error_count}")
+        with EmbeddingService(qps=qps, max_workers=max_workers, on_result=on_result, backend=backend) as service:
+            service.submit_many(jobs)
         
         # 결과 통계
         result = {
             'total': total_count,
-            'success': success_count,
-            'error': error_count,
-            'errors': errors
+            'success': service.stats['success'],
+            'error': service.stats['error'],
+            'errors': list(service.errors)
         }
         
         return result
@@ -369,12 +334,75 @@ def process_missing_embeddings_with_options(user_id: int):
         print(f"❌ 오류가 발생했습니다: {str(e)}")
 
 
+def benchmark_local_embeddings(folder_path: str, backend_name: str = 'hash', qps: float = 1000.0,
+                               max_workers: int = DEFAULT_EMBEDDING_WORKERS, latency: float = 0.0,
+                               limit: Optional[int] = None) -> dict:
+    """
+    DB와 SSH 터널 없이 EmbeddingService 처리량을 측정합니다.
+    폴더의 이미지를 메모리 스토리지 백엔드의 _media/ 아래에 올려 두고 로컬 백엔드로 임베딩을 만들며,
+    결과 행은 DB 대신 메모리 목록에 모읍니다. (운영 테이블에는 아무것도 쓰지 않음)
+
+    Args:
+        folder_path: 이미지 폴더 경로
+        backend_name: 로컬 백엔드 이름 (LOCAL_EMBEDDING_BACKENDS)
+        qps: 초당 최대 요청 수
+        max_workers: 동시 요청 스레드 수
+        latency: 요청당 모의 지연(초) - Vertex AI 호출 시간을 흉내 낼 때 사용
+        limit: 최대 이미지 수 (None이면 전체)
+
+    Returns:
+        dict: 처리 결과 통계 (elapsed: 소요 시간(초), throughput: 초당 처리 수)
+    """
+    image_files = sorted(f for f in os.listdir(folder_path) if f.lower().endswith(('.png', '.jpg', '.jpeg')))
+    if limit is not None:
+        image_files = image_files[:limit]
+
+    storage = InMemoryStorageBackend()
+    jobs = []
+    for resource_id, file_name in enumerate(image_files, 1):
+        with open(os.path.join(folder_path, file_name), 'rb') as f:
+            image = f"benchmark/{file_name}"
+            storage.upload(EMBEDDING_BUCKET_NAME, f"_media/{image}", f.read())
+        jobs.append(EmbeddingJob(resource_id, str(uuid.uuid4()), image))
+
+    rows = []
+    backend = LOCAL_EMBEDDING_BACKENDS[backend_name](latency=latency)
+    previous_storage = get_storage_backend()
+    set_storage_backend(storage)
+    try:
+        started = time.perf_counter()
+        with EmbeddingService(qps=qps, max_workers=max_workers, backend=backend, sink=rows.extend) as service:
+            service.submit_many(jobs)
+        elapsed = time.perf_counter() - started
+    finally:
+        set_storage_backend(previous_storage)
+
+    return {
+        'total': len(jobs),
+        'success': service.stats['success'],
+        'error': service.stats['error'],
+        'errors': list(service.errors),
+        'rows': len(rows),
+        'elapsed': elapsed,
+        'throughput': len(jobs) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
 if __name__ == "__main__":
     # 테스트용
     import sys
     
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2 and sys.argv[1] == '--benchmark':
+        # 오프라인 벤치마크: DB/SSH 터널 없이 로컬 백엔드와 메모리 스토리지로 처리량 측정
+        backend_name = sys.argv[3] if len(sys.argv) > 3 else 'hash'
+        result = benchmark_local_embeddings(sys.argv[2], backend_name)
+        print(f"{backend_name}: {result['success']}/{result['total']}개 성공, "
+              f"{result['elapsed']:.2f}초 ({result['throughput']:.1f}개/초)")
+        for error in result['errors'][:10]:
+            print(f"  {error}")
+    elif len(sys.argv) > 1:
         user_id = int(sys.argv[1])
         process_missing_embeddings_interactive(user_id)
     else:
-        print("사용법: python missing_embeddings_processor.py <user_id>")
\ No newline at end of file
+        print("사용법: python missing_embeddings_processor.py <user_id>")
+        print(f"       python missing_embeddings_processor.py --benchmark <이미지 폴더> [{'|'.join(LOCAL_EMBEDDING_BACKENDS)}]")
\ No newline at end of file
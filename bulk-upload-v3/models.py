@@ -1,11 +1,15 @@
 # Standard Library
 from datetime import datetime
+import os
+import json
+import hashlib
+import logging
 import uuid
 from typing import List
 from urllib.parse import quote_plus
 
 # SQLAlchemy
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Table, UniqueConstraint, func, text
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, LargeBinary, Table, UniqueConstraint, Index, func, literal_column, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSON
@@ -385,7 +389,9 @@ class VertexAiEmbedDbEmbeddings(Base):
    # Resource.uuid와 연결되는 기본 키
    file_based_uuid = Column(String(36), primary_key=True)
    
+   # 기본 형식: str(list) 텍스트. embedding_vector는 float32 리틀엔디안 bytea (저장 형식은 embedding_codec 참고)
    embedding = Column(Text, nullable=True) 
+   embedding_vector = Column(LargeBinary, nullable=True)
    original_path = Column(String(500), nullable=True)
    full_url = Column(String(1000), nullable=True)
    numeric_id_str = Column(String(50), nullable=True)
@@ -393,11 +399,98 @@ class VertexAiEmbedDbEmbeddings(Base):
    def __repr__(self):
       return f"<VertexAiEmbedDbEmbeddings {self.file_based_uuid}>"
 
-def setup_database_engine(password, port):
+class ResourceContentHash(Base):
+   __tablename__ = 'resource_content_hash'
+
+   # 같은 파일도 사용자/프로젝트마다 따로 기록하므로 (해시, 사용자, 프로젝트)마다 한 행 (아래 유일 인덱스 참고)
+   id = Column(Integer, primary_key=True)
+   # 원본 파일 바이트의 BLAKE2b 해시 (중복 업로드 방지용)
+   content_hash = Column(String(64), nullable=False)
+   user_id = Column(Integer, ForeignKey('user.id'), nullable=True)
+   project_id = Column(Integer, ForeignKey('project.id'), nullable=True)
+   resource_id = Column(Integer, ForeignKey('resource.id'), nullable=False, index=True)
+   created_at = Column(DateTime, default=lambda: datetime.now(seoul_tz))
+
+   def __repr__(self):
+      return f"<ResourceContentHash {self.content_hash} ({self.user_id}, {self.project_id}) -> {self.resource_id}>"
+
+# NULL끼리는 서로 다른 값으로 취급되므로 사용자/프로젝트가 없는 경우도 0으로 묶어서 유일성 보장
+RESOURCE_CONTENT_HASH_SCOPE = (
+   ResourceContentHash.content_hash,
+   func.coalesce(ResourceContentHash.user_id, literal_column('0')),
+   func.coalesce(ResourceContentHash.project_id, literal_column('0')),
+)
+Index('uq_resource_content_hash_scope', *RESOURCE_CONTENT_HASH_SCOPE, unique=True)
+
+def setup_database_engine(password, port, **engine_options):
    db_user = "wcidfu"
    db_host = "127.0.0.1"
    db_name = "wcidfu"
    encoded_password = quote_plus(password)
-   engine = create_engine(f'postgresql+psycopg2://{db_user}:{encoded_password}@{db_host}:{port}/{db_name}')
+   # engine_options: pool_size, max_overflow, pool_pre_ping, pool_recycle 등 create_engine 옵션
+   engine = create_engine(f'postgresql+psycopg2://{db_user}:{encoded_password}@{db_host}:{port}/{db_name}', **engine_options)
+   return engine
+
+# ------------------------------
+#  Schema Bootstrap
+# ------------------------------
+SCHEMA_FINGERPRINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_fingerprint.json')
+
+# 테이블이 만들어진 뒤에 모델에 추가된 컬럼 (테이블, 컬럼, PostgreSQL 타입)
+ADDED_COLUMNS = [
+   ('vertex_ai_embed_db_embeddings', 'embedding_vector', 'BYTEA'),
+]
+
+def metadata_fingerprint():
+   """
+   Base.metadata(테이블/컬럼/인덱스/외래 키 정의)의 해시를 계산합니다.
+   모델 정의가 바뀌면 값이 바뀝니다.
+   """
+   digest = hashlib.sha256()
+   for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+      digest.update(f"T:{table.name}".encode())
+      for column in table.columns:
+         digest.update(f"C:{column.name}:{column.type}:{column.nullable}:{column.primary_key}".encode())
+      for index in sorted(table.indexes, key=lambda i: i.name or ""):
+         digest.update(f"I:{index.name}:{','.join(c.name for c in index.columns)}:{index.unique}".encode())
+      for fk in sorted(table.foreign_keys, key=lambda f: f.target_fullname):
+         digest.update(f"F:{fk.parent.name}->{fk.target_fullname}".encode())
+   return digest.hexdigest()
+
+def _load_schema_fingerprints():
+   try:
+      with open(SCHEMA_FINGERPRINT_FILE, 'r', encoding='utf-8') as f:
+         return json.load(f)
+   except (OSError, ValueError):
+      return {}
+
+def bootstrap_schema(engine):
+   """
+   누락된 테이블을 생성(create_all)하고 현재 모델의 지문을 로컬에 기록합니다.
+   모델 변경 후 한 번만 실행하면 되며, 일반 세션 시작 시에는 DDL을 보내지 않습니다.
+   """
    Base.metadata.create_all(engine)
-   return engine
\ No newline at end of file
+   # create_all은 기존 테이블에 컬럼을 추가하지 않으므로 나중에 추가된 컬럼은 직접 추가
+   with engine.begin() as connection:
+      for table_name, column_name, column_type in ADDED_COLUMNS:
+         connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_type}'))
+
+   fingerprints = _load_schema_fingerprints()
+   fingerprints[engine.url.database] = {
+      "fingerprint": metadata_fingerprint(),
+      "bootstrapped_at": datetime.now(seoul_tz).isoformat(),
+   }
+   with open(SCHEMA_FINGERPRINT_FILE, 'w', encoding='utf-8') as f:
+      json.dump(fingerprints, f, indent=2)
+   logging.info(f"Schema bootstrapped for database '{engine.url.database}'")
+
+def ensure_schema(engine):
+   """
+   로컬에 기록된 지문이 현재 모델과 같으면 아무 것도 하지 않습니다. (DB 왕복 없음)
+   다르거나 기록이 없으면 bootstrap_schema()를 한 번 실행합니다.
+   """
+   recorded = _load_schema_fingerprints().get(engine.url.database, {})
+   if recorded.get("fingerprint") == metadata_fingerprint():
+      return
+   logging.info("Model definitions changed since last schema bootstrap. Running create_all once...")
+   bootstrap_schema(engine)
\ No newline at end of file
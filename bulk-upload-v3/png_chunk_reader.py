@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import mmap
+import struct
+import zlib
+import logging
+from typing import Dict, Optional, BinaryIO
+
+import piexif
+import piexif.helper
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SOI = b'\xff\xd8'
+
+# 픽셀 데이터가 시작되는 청크 (이후로는 메타데이터를 읽지 않음)
+PNG_STOP_CHUNKS = {b'IDAT', b'IEND'}
+
+# JPEG 마커
+JPEG_SOS = 0xDA
+JPEG_EOI = 0xD9
+JPEG_APP1 = 0xE1
+JPEG_COM = 0xFE
+
+
+def _decode_text_chunk(chunk_type: bytes, data: bytes) -> Optional[tuple]:
+    """
+    tEXt / zTXt / iTXt 청크 데이터를 (키, 값) 쌍으로 디코딩합니다.
+    """
+    keyword, sep, rest = data.partition(b'\x00')
+    if not sep:
+        return None
+    key = keyword.decode('latin-1')
+
+    if chunk_type == b'tEXt':
+        return key, rest.decode('latin-1')
+
+    if chunk_type == b'zTXt':
+        # 압축 방식(1바이트) + zlib 데이터
+        return key, zlib.decompress(rest[1:]).decode('latin-1')
+
+    # iTXt: 압축 플래그(1) + 압축 방식(1) + 언어 태그\0 + 번역 키워드\0 + 텍스트
+    compressed = rest[:1] == b'\x01'
+    _language, _, rest = rest[2:].partition(b'\x00')
+    _translated, _, text = rest.partition(b'\x00')
+    if compressed:
+        text = zlib.decompress(text)
+    return key, text.decode('utf-8', errors='ignore')
+
+
+def _exif_user_comment(exif_data: bytes) -> Optional[str]:
+    """
+    EXIF 바이트에서 UserComment를 꺼냅니다. (PngUtill.read_info_from_image와 동일한 방식)
+    """
+    try:
+        exif = piexif.load(exif_data)
+    except Exception:
+        exif = None
+    exif_comment = (exif or {}).get("Exif", {}).get(piexif.ExifIFD.UserComment, b'')
+    try:
+        exif_comment = piexif.helper.UserComment.load(exif_comment)
+    except ValueError:
+        exif_comment = exif_comment.decode('utf8', errors="ignore")
+    return exif_comment or None
+
+
+def read_png_chunks(stream: BinaryIO) -> Dict[str, str]:
+    """
+    PNG 스트림에서 첫 IDAT 청크 전까지의 텍스트/EXIF 청크만 읽습니다.
+    그 외 청크는 읽지 않고 seek으로 건너뜁니다.
+
+    Args:
+        stream: 시그니처 바로 뒤에 위치한 바이너리 스트림 (파일 객체 또는 mmap)
+
+    Returns:
+        dict: 텍스트 청크 키 -> 값 (eXIf 청크는 'exif' 키에 원본 바이트로 저장)
+    """
+    items = {}
+
+    while True:
+        header = stream.read(8)
+        if len(header) < 8:
+            break
+
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type in PNG_STOP_CHUNKS:
+            break
+
+        if chunk_type in (b'tEXt', b'zTXt', b'iTXt'):
+            data = stream.read(length)
+            try:
+                decoded = _decode_text_chunk(chunk_type, data)
+            except (zlib.error, UnicodeDecodeError) as e:
+                logger.warning(f"{chunk_type!r} 청크 디코딩 실패: {e}")
+                decoded = None
+            if decoded:
+                key, value = decoded
+                items.setdefault(key, value)
+            stream.seek(4, os.SEEK_CUR)  # CRC
+        elif chunk_type == b'eXIf':
+            items['exif'] = b'Exif\x00\x00' + stream.read(length)
+            stream.seek(4, os.SEEK_CUR)
+        else:
+            stream.seek(length + 4, os.SEEK_CUR)
+
+    return items
+
+
+def read_jpeg_segments(stream: BinaryIO) -> Dict[str, object]:
+    """
+    JPEG 스트림에서 스캔 데이터(SOS) 전까지의 APP1(EXIF)/COM 세그먼트만 읽습니다.
+
+    Args:
+        stream: SOI 마커 바로 뒤에 위치한 바이너리 스트림
+
+    Returns:
+        dict: 'exif' -> EXIF 바이트, 'comment' -> COM 세그먼트 바이트
+    """
+    items = {}
+
+    while True:
+        marker = stream.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            break
+
+        marker_type = marker[1]
+        if marker_type in (JPEG_SOS, JPEG_EOI):
+            break
+        # 길이 필드가 없는 마커 (RSTn, TEM 등)
+        if 0xD0 <= marker_type <= 0xD7 or marker_type == 0x01:
+            continue
+
+        size_bytes = stream.read(2)
+        if len(size_bytes) < 2:
+            break
+        size = struct.unpack('>H', size_bytes)[0] - 2
+
+        if marker_type == JPEG_APP1 and 'exif' not in items:
+            data = stream.read(size)
+            if data.startswith(b'Exif\x00\x00'):
+                items['exif'] = data
+        elif marker_type == JPEG_COM and 'comment' not in items:
+            items['comment'] = stream.read(size)
+        else:
+            stream.seek(size, os.SEEK_CUR)
+
+    return items
+
+
+def read_metadata(stream: BinaryIO) -> Dict[str, object]:
+    """
+    이미지 형식(PNG/JPEG)을 판별하여 헤더 영역의 메타데이터만 읽습니다.
+    """
+    signature = stream.read(8)
+    if signature == PNG_SIGNATURE:
+        return read_png_chunks(stream)
+    if signature[:2] == JPEG_SOI:
+        stream.seek(2)
+        return read_jpeg_segments(stream)
+    return {}
+
+
+def read_metadata_from_file(image_path: str, use_mmap: bool = False) -> Dict[str, object]:
+    """
+    디스크의 이미지 파일에서 픽셀 디코딩 없이 메타데이터를 읽습니다.
+
+    Args:
+        image_path: 이미지 파일 경로
+        use_mmap: True면 파일을 mmap으로 매핑하여 읽음
+
+    Returns:
+        dict: 메타데이터 항목
+    """
+    with open(image_path, 'rb') as f:
+        if not use_mmap:
+            return read_metadata(f)
+
+        if os.fstat(f.fileno()).st_size == 0:
+            return {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return read_metadata(mm)
+
+
+def geninfo_from_metadata(items: Dict[str, object]) -> Optional[str]:
+    """
+    메타데이터 항목에서 생성 정보(geninfo)를 추출합니다.
+    우선순위는 PngUtill.read_info_from_image와 같습니다: parameters -> EXIF UserComment -> comment
+    """
+    geninfo = items.get('parameters')
+
+    if 'exif' in items:
+        exif_comment = _exif_user_comment(items['exif'])
+        if exif_comment:
+            geninfo = exif_comment
+    elif 'comment' in items:
+        comment = items['comment']
+        geninfo = comment.decode('utf8', errors="ignore") if isinstance(comment, bytes) else comment
+
+    return geninfo
+
+
+def read_geninfo(image_path: str, use_mmap: bool = False) -> Optional[str]:
+    """
+    이미지 파일에서 생성 정보(geninfo)만 빠르게 읽습니다.
+
+    Args:
+        image_path: 이미지 파일 경로
+        use_mmap: True면 mmap으로 읽음
+
+    Returns:
+        str: 생성 정보 문자열 (없으면 None)
+    """
+    try:
+        return geninfo_from_metadata(read_metadata_from_file(image_path, use_mmap=use_mmap))
+    except Exception as e:
+        logger.error(f"메타데이터 읽기 실패 ({image_path}): {e}")
+        return None
@@ -2,7 +2,7 @@
 import os
 import sys
 import logging
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 import re
 import threading
 import time
@@ -11,8 +11,8 @@ import sys
 
 # Third Party Libraries
 from tqdm import tqdm
-from sshtunnel import SSHTunnelForwarder
-from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
 
 # Local Imports
 from models import (
@@ -21,18 +21,38 @@ from models import (
     User,
     ColorCodeTags
 )
-from manager import CharacterManager, OutfitManager, EventManager, InstrumentManager
-from concurrent.futures import ThreadPoolExecutor
+from session_utills import get_session, end_session, get_connection_broker
+from tag_cache import get_tag_cache
+from alias_matcher import (
+    get_alias_catalog,
+    get_alias_matcher,
+    AliasMatch,
+    CATEGORY_CHARACTER,
+    CATEGORY_OUTFIT,
+    CATEGORY_EVENT,
+    CATEGORY_INSTRUMENT
+)
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
 from sqlalchemy.orm import Session
 from models import ColorCodeTags
 
+# 재태깅 시 한 번에 읽는 (id, prompt) 행 수 / 작업 스레드 하나가 처리하는 리소스 수
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 50
+
 class TagExtensions:
     def __init__(self, session: Session, character_manager):
         self.session = session  # session을 thread-local session으로 업데이트 필요
         self.character_manager = character_manager
         self.lora_regex = r'<lora:([^:]+):([0-9.]+)>' # 로라 정규식
+        self.tag_cache = get_tag_cache()
+
+    @property
+    def alias_matcher(self):
+        """프로세스 전역 별칭 매처 (카탈로그의 별칭이 바뀌면 다시 컴파일된 매처를 반환)"""
+        return get_alias_matcher()
 
     def convert_tags(self, resource, from_tag_id: int, to_tag_id: int) -> None:
         """특정 태그를 다른 태그로 전환합니다."""
@@ -112,8 +132,9 @@ class TagExtensions:
 
         if is_multiple:
             try:
-                multiple_tag = self.session.query(ColorCodeTags).filter_by(tag='Multiple').first()
-                if multiple_tag and multiple_tag.id not in added_tag_ids:
+                multiple_tag_id = self.tag_cache.get_id('Multiple', tag_type=None)
+                if multiple_tag_id is not None and multiple_tag_id not in added_tag_ids:
+                    multiple_tag = self.session.get(ColorCodeTags, multiple_tag_id)
                     condition = []
                     if boy_count >= 2 or has_single_boy:
                         condition.append(f"{boy_count if boy_count >= 2 else 1} boy(s)")
@@ -132,22 +153,18 @@ class TagExtensions:
         """캐릭터 관련 태그 유무에 따라 4GROUND9 태그를 관리합니다.
         캐릭터 태그가 있으면 4GROUND9를 추가하고, 없으면 삭제합니다."""
         try:
-            prompt_text = prompt_text.lower()
             has_character = False
 
-            # 각 캐릭터의 별칭을 확인
-            for character_name, character_item in self.character_manager.items.items():
-                # 해당 캐릭터의 모든 별칭에 대해 검사
-                for alias in character_item.aliases:
-                    if alias.lower() in prompt_text:
-                        has_character = True
-                        print(f"캐릭터 발견: {character_name} (alias: {alias})")
-                        break
-                if has_character:
-                    break
+            # 캐릭터 별칭 확인 (별칭 매처로 한 번에 검사)
+            character_matches = self.alias_matcher.scan(prompt_text, categories=[CATEGORY_CHARACTER])
+            if character_matches:
+                has_character = True
+                match = character_matches[0]
+                print(f"캐릭터 발견: {match.standard_name} (alias: {match.alias})")
 
             # 4GROUND9 태그 찾기
-            ground9_tag = self.session.query(ColorCodeTags).filter_by(tag='4GROUND9').first()
+            ground9_tag_id = self.tag_cache.get_id('4GROUND9', tag_type=None)
+            ground9_tag = self.session.get(ColorCodeTags, ground9_tag_id) if ground9_tag_id is not None else None
             
             if has_character:
                 # 캐릭터가 있을 경우 태그 추가
@@ -177,7 +194,7 @@ class TagExtensions:
                 
             print(f"\n로라 태그 추출 결과: {lora_matches}")
             
-            current_tags = {tag.tag.lower() for tag in resource.tags}
+            model_names = []
             processed_models = set()  # 중복 처리 방지를 위한 세트
             
             for model_name, weight in lora_matches:
@@ -187,36 +204,27 @@ class TagExtensions:
                     continue
                     
                 processed_models.add(model_name.lower())
+                model_names.append(model_name)
+
+            # 대소문자 구분 없이 검색하고, 없는 로라 태그는 원래 형태로 한 번에 생성
+            created = {}
+            tag_ids = self.tag_cache.get_or_create_ids(model_names, tag_type=None, created=created)
+            
+            new_tag_ids = []
+            for model_name in model_names:
+                tag_id = tag_ids[model_name]
+                if tag_id in created:
+                    print(f"새로운 로라 태그 생성됨: {model_name} (ID: {tag_id})")
+                else:
+                    print(f"기존 로라 태그 찾음: {self.tag_cache.get_name(tag_id)} (ID: {tag_id})")
                 
-                try:
-                    # 대소문자 구분 없이 검색
-                    from sqlalchemy import func
-                    tag = self.session.query(ColorCodeTags).filter(
-                        func.lower(ColorCodeTags.tag) == model_name.lower()
-                    ).first()
-                    
-                    if tag is None:
-                        tag = ColorCodeTags(
-                            tag=model_name,  # 원래 형태 유지
-                            color_code='#FFFFFF'
-                        )
-                        self.session.add(tag)
-                        self.session.flush()
-                        print(f"새로운 로라 태그 생성됨: {model_name} (ID: {tag.id})")
-                    else:
-                        print(f"기존 로라 태그 찾음: {tag.tag} (ID: {tag.id})")
-                    
-                    if tag.id not in added_tag_ids:
-                        print(f"로라 태그 추가: {tag.tag} (ID: {tag.id})")
-                        resource.tags.append(tag)
-                        added_tag_ids.add(tag.id)
-                    else:
-                        print(f"로라 태그 중복 건너뛰기: {tag.tag}")
-                            
-                except Exception as e:
-                    print(f"태그 생성/조회 중 오류 발생: {str(e)}")
-                    self.session.rollback()
-                    continue
+                if tag_id not in added_tag_ids:
+                    print(f"로라 태그 추가: {self.tag_cache.get_name(tag_id)} (ID: {tag_id})")
+                    new_tag_ids.append(tag_id)
+                    added_tag_ids.add(tag_id)
+                else:
+                    print(f"로라 태그 중복 건너뛰기: {self.tag_cache.get_name(tag_id)}")
+            resource.tags.extend(self.tag_cache.load_tags(self.session, new_tag_ids))
 
             self.session.commit()
                 
@@ -226,10 +234,12 @@ class TagExtensions:
 
 class Converter:
     def __init__(self, extension_options=None):
-        self.character_manager = CharacterManager()
-        self.outfit_manager = OutfitManager()
-        self.event_manager = EventManager()
-        self.instrument_manager = InstrumentManager()
+        # 매니저는 프로세스 전역 별칭 카탈로그의 인스턴스를 공유 (읽기 전용, 별칭 추가는 add_alias로만)
+        catalog = get_alias_catalog()
+        self.character_manager = catalog.managers[CATEGORY_CHARACTER]
+        self.outfit_manager = catalog.managers[CATEGORY_OUTFIT]
+        self.event_manager = catalog.managers[CATEGORY_EVENT]
+        self.instrument_manager = catalog.managers[CATEGORY_INSTRUMENT]
         self.server = None
         self.extension_options = extension_options or {
             'use_multiple_tag': False,
@@ -242,6 +252,11 @@ class Converter:
         self.max_retries = 3
         self.retry_delay = 5  # seconds
 
+    @property
+    def alias_matcher(self):
+        """프로세스 전역 별칭 매처 (카탈로그의 별칭이 바뀌면 다시 컴파일된 매처를 반환)"""
+        return get_alias_matcher()
+
     def _process_single_resource(self, session: Session, resource: Resource, prompt_text: str) -> int:
         print(f"\n리소스 ID {resource.id} 처리 시작")
         
@@ -251,19 +266,25 @@ class Converter:
         try:
             tag_extensions = TagExtensions(session, self.character_manager)
             
+            # 프롬프트를 한 번만 훑어서 모든 매니저의 별칭 매칭 결과를 카테고리별로 나눔
+            matches_by_category = {}
+            for match in self.alias_matcher.scan(prompt_text):
+                matches_by_category.setdefault(match.category, []).append(match)
+            
             managers = [
-                (self.character_manager, "캐릭터"),
-                (self.outfit_manager, "의상"),
-                (self.event_manager, "이벤트/배경")
-                (self.instrument_manager, "악기")
+                (CATEGORY_CHARACTER, "캐릭터"),
+                (CATEGORY_OUTFIT, "의상"),
+                (CATEGORY_EVENT, "이벤트/배경"),
+                (CATEGORY_INSTRUMENT, "악기")
             ]
             
-            for manager, category in managers:
+            for category, category_name in managers:
                 count = self.process_with_manager(
-                    session, resource, prompt_text, 
-                    added_tag_ids, manager
+                    session, resource,
+                    matches_by_category.get(category, []),
+                    added_tag_ids, category_name
                 )
-                print(f"{category} 태그 처리 결과: {count}개")
+                print(f"{category_name} 태그 처리 결과: {count}개")
                 converted_count += count
             
             # 설정된 익스텐션 옵션에 따라 처리
@@ -292,109 +313,62 @@ class Converter:
             session.rollback()
             raise
         
-    def start_ssh_tunnel(self):
-        try:
-            self.server = SSHTunnelForwarder(
-                ('34.64.105.81', 22),
-                ssh_username='nerdystar',
-                ssh_pkey='./wcidfu-ssh',
-                remote_bind_address=('10.1.31.44', 5432),
-                set_keepalive=60,
-                keepalive_interval=30,  # 30초마다 키프얼라이브 패킷 전송
-                compression=True
-            )
-            self.server.start()
-            logging.info("SSH tunnel established")
-            return self.server
-        except Exception as e:
-            logging.error(f"Error establishing SSH tunnel: {str(e)}")
-            raise
-
-    def stop_ssh_tunnel(self):
-        if self.server:
-            self.server.stop()
-            logging.info("SSH tunnel closed")
-
     def get_session(self):
-        server = self.start_ssh_tunnel()
-        engine = setup_database_engine(
-            "wcidfu", 
-            server.local_bind_port,
-            pool_size=20,  # 연결 풀 크기 설정
-            max_overflow=10,  # 추가 연결 허용 개수
-            pool_timeout=30,  # 풀에서 연결을 기다리는 최대 시간
-            pool_recycle=1800  # 30분마다 연결 재활용
-        )
-        session_factory = sessionmaker(bind=engine)
-        session = scoped_session(session_factory)
+        # 프로세스 전역 터널/연결 풀을 사용 (터널을 따로 열지 않음)
+        # 엔진을 다시 만들지 않도록 풀이 작을 때만 max_overflow를 늘림 (기존 설정: 20 + 10)
+        get_connection_broker().ensure_capacity(30)
+        session, server = get_session()
+        self.server = server
         return session, server
 
-        
     def _get_or_create_tag(self, session: Session, tag_name: str) -> ColorCodeTags:
-        """주어진 태그 이름으로 태그를 조회하거나 없으면 새로 생성합니다."""
-        try:
-            tag = session.query(ColorCodeTags).filter_by(tag=tag_name).first()
-            if tag is None:
-                tag = ColorCodeTags(
-                    tag=tag_name,
-                    color_code='#FFFFFF'
-                )
-                session.add(tag)
-                session.commit()
-                logging.info(f"새로운 태그 생성됨: {tag_name}")
-            return tag
-            
-        except Exception as e:
-            session.rollback()
-            logging.error(f"태그 생성/조회 중 오류 발생: {str(e)}")
-            raise
+        """주어진 태그 이름으로 태그를 조회하거나 없으면 새로 생성합니다. (태그 캐시 사용, 타입과 상관없이 이름으로 찾음)"""
+        tag_id = get_tag_cache().get_or_create_id(tag_name, tag_type=None)
+        return session.get(ColorCodeTags, tag_id)
 
     def process_with_manager(
         self, session: Session, resource: Resource, 
-        prompt_text: str, added_tag_ids: set, manager, manager_type=None
+        matches: List[AliasMatch], added_tag_ids: set, manager_type=None
     ) -> int:
+        """한 카테고리의 별칭 매칭 결과(AliasMatch 목록)를 리소스 태그로 추가합니다."""
         converted_count = 0
-        prompt_text = prompt_text.lower()
         
         current_tags = {tag.tag for tag in resource.tags}
         instrument_tag_added = False  # 악기 태그가 이미 추가되었는지 추적
         
-        for standard_name, item in manager.items.items():
-            for alias in item.aliases:
-                if alias.lower() in prompt_text:
-                    # 이미 존재하는 태그인지 확인
-                    if standard_name in current_tags:
-                        print(f"태그 건너뛰기 (이미 존재): {standard_name}")
-                        break
-                        
-                    print(f"매칭된 태그: {alias} -> {standard_name}")
-                    try:
-                        tag = self._get_or_create_tag(session, standard_name)
-                        resource.tags.append(tag)
-                        added_tag_ids.add(tag.id)
-                        converted_count += 1
-                        print(f"태그 추가됨: {standard_name}")
-                        
-                        # 악기 매니저일 경우 인스트러먼트 태그 추가
-                        if manager_type == "악기" and not instrument_tag_added:
-                            instrument_tag_id = 5982
-                            
-                            # 이미 인스트러먼트 태그가 있는지 확인
-                            if instrument_tag_id not in added_tag_ids:
-                                instrument_tag = session.query(ColorCodeTags).filter(ColorCodeTags.id == instrument_tag_id).first()
-                                if instrument_tag:
-                                    resource.tags.append(instrument_tag)
-                                    added_tag_ids.add(instrument_tag_id)
-                                    print(f"인스트러먼트 자동 태그 추가됨 (ID: {instrument_tag_id})")
-                                    instrument_tag_added = True
-                                    converted_count += 1
-                        
-                        session.commit()
-                    except Exception as e:
-                        print(f"태그 처리 중 오류 발생: {str(e)}")
-                        session.rollback()
-                    break
-        
+        for alias, standard_name, _ in matches:
+            # 이미 존재하는 태그인지 확인
+            if standard_name in current_tags:
+                print(f"태그 건너뛰기 (이미 존재): {standard_name}")
+                continue
+                
+            print(f"매칭된 태그: {alias} -> {standard_name}")
+            try:
+                tag = self._get_or_create_tag(session, standard_name)
+                resource.tags.append(tag)
+                added_tag_ids.add(tag.id)
+                converted_count += 1
+                print(f"태그 추가됨: {standard_name}")
+                
+                # 악기 매니저일 경우 인스트러먼트 태그 추가
+                if manager_type == "악기" and not instrument_tag_added:
+                    instrument_tag_id = 5982
+                    
+                    # 이미 인스트러먼트 태그가 있는지 확인
+                    if instrument_tag_id not in added_tag_ids and get_tag_cache().exists(instrument_tag_id):
+                        instrument_tag = session.get(ColorCodeTags, instrument_tag_id)
+                        if instrument_tag:
+                            resource.tags.append(instrument_tag)
+                            added_tag_ids.add(instrument_tag_id)
+                            print(f"인스트러먼트 자동 태그 추가됨 (ID: {instrument_tag_id})")
+                            instrument_tag_added = True
+                            converted_count += 1
+                
+                session.commit()
+            except Exception as e:
+                print(f"태그 처리 중 오류 발생: {str(e)}")
+                session.rollback()
+
         return converted_count
 
     def loading_animation(self, stop_event):
@@ -406,66 +380,116 @@ class Converter:
             time.sleep(0.5)
 
 
-    def process_resources(self, session: Session, start_id: int = None, end_id: int = None):
-        """지정된 범위의 리소스들의 프롬프트를 처리합니다."""
+    def _resource_filter(self, query, start_id: int = None, end_id: int = None):
+        """ID 범위와 프롬프트가 있는 리소스만 남기는 조건을 추가합니다."""
+        query = query.filter(Resource.prompt.isnot(None), Resource.prompt != '')
+        if start_id is not None:
+            query = query.filter(Resource.id >= start_id)
+        if end_id is not None:
+            query = query.filter(Resource.id <= end_id)
+        return query
+
+    def iter_prompt_pages(self, session: Session, start_id: int = None, end_id: int = None,
+                          page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[List[Tuple[int, str]]]:
+        """
+        (id, prompt)만 id > 마지막 id ORDER BY id LIMIT page_size 방식(keyset)으로 한 페이지씩 읽습니다.
+        리소스 전체 컬럼이나 전체 범위를 한 번에 메모리에 올리지 않습니다.
+        """
+        last_id = None
+        while True:
+            query = self._resource_filter(session.query(Resource.id, Resource.prompt), start_id, end_id)
+            if last_id is not None:
+                query = query.filter(Resource.id > last_id)
+            rows = query.order_by(Resource.id).limit(page_size).all()
+            # 페이지마다 읽기 트랜잭션을 끝내서 긴 트랜잭션을 만들지 않음
+            session.rollback()
+            if not rows:
+                return
+            yield [(resource_id, prompt) for resource_id, prompt in rows]
+            last_id = rows[-1][0]
+
+    def _process_batch(self, rows: List[Tuple[int, str]]) -> int:
+        """작업 스레드에서 (id, prompt) 묶음을 새 세션 하나로 처리합니다."""
+        thread_session = get_connection_broker().new_session()
+        converted = 0
+        try:
+            for resource_id, prompt in rows:
+                try:
+                    # 태그 연결에 필요한 id만 읽음 (generation_data 등은 읽지 않음)
+                    resource = thread_session.get(Resource, resource_id, options=[load_only(Resource.id)])
+                    if resource is None:
+                        continue
+                    converted += self._process_single_resource(
+                        session=thread_session,
+                        resource=resource,
+                        prompt_text=prompt
+                    ) or 0
+                except Exception as e:
+                    logging.error(f"리소스 {resource_id} 처리 중 오류 발생: {str(e)}")
+                    thread_session.rollback()
+            return converted
+        finally:
+            thread_session.close()
+
+    def process_resources(self, session: Session, start_id: int = None, end_id: int = None,
+                          page_size: int = DEFAULT_PAGE_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+                          max_workers: int = 12):
+        """
+        지정된 범위의 리소스들의 프롬프트를 처리합니다.
+        ID 순서로 페이지를 읽으면서 batch_size개씩 작업 스레드에 넘기므로 메모리 사용량이 범위 크기와 무관합니다.
+
+        Args:
+            session: 페이지 조회에 사용할 세션
+            start_id: 시작 리소스 ID (None이면 처음부터)
+            end_id: 종료 리소스 ID (None이면 끝까지)
+            page_size: 한 번에 읽을 (id, prompt) 행 수
+            batch_size: 작업 스레드 하나가 한 번에 처리할 리소스 수
+            max_workers: 작업 스레드 수
+        """
         try:
-            # 리소스 쿼리 구성
-            query = session.query(Resource)
-            if start_id is not None:
-                query = query.filter(Resource.id >= start_id)
-            if end_id is not None:
-                query = query.filter(Resource.id <= end_id)
-                    
-            total_resources = query.count()
-            print(f"\n총 {total_resources}개의 리소스를 처리합니다.")
-            
             stop_animation = threading.Event()
             animation_thread = threading.Thread(target=self.loading_animation, args=(stop_animation,))
             animation_thread.start()
 
             try:
-                resources = query.all()
+                total_resources = self._resource_filter(
+                    session.query(func.count(Resource.id)), start_id, end_id
+                ).scalar()
+                session.rollback()
             finally:
                 stop_animation.set()
                 animation_thread.join()
                 print('\n데이터 로딩 완료')
+            print(f"\n총 {total_resources}개의 리소스를 처리합니다.")
 
-            # 세션 팩토리 생성
-            Session = sessionmaker(bind=session.get_bind())
-
-            def process_resource(resource):
-                """각 리소스를 처리하는 함수"""
-                if not resource.prompt:
-                    return 0
-                    
-                # 각 쓰레드마다 새로운 세션 생성
-                thread_session = Session()
-                try:
-                    # 리소스 재조회 (새로운 세션에서)
-                    resource = thread_session.merge(resource)
-                    converted = self._process_single_resource(
-                        session=thread_session,
-                        resource=resource,
-                        prompt_text=resource.prompt
-                    )
-                    thread_session.commit()
-                    return converted or 0
-                except Exception as e:
-                    logging.error(f"리소스 {resource.id} 처리 중 오류 발생: {str(e)}")
-                    thread_session.rollback()
-                    return 0
-                finally:
-                    thread_session.close()
+            # 작업 스레드마다 연결 1개 + 페이지 조회 1개 + 태그 캐시의 태그 생성용 1개
+            get_connection_broker().ensure_capacity(max_workers + 2)
 
             total_converted = 0
-            with ThreadPoolExecutor(max_workers=12) as executor:
-                # tqdm으로 진행상황 표시
-                futures = list(tqdm(
-                    executor.map(process_resource, resources),
-                    total=len(resources),
-                    desc="리소스 처리 중"
-                ))
-                total_converted = sum(filter(None, futures))
+            max_pending = max_workers * 2  # 대기 중인 묶음 수 제한 (메모리 사용량 고정)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                    tqdm(total=total_resources, desc="리소스 처리 중") as progress:
+                pending = {}
+
+                def collect(done):
+                    nonlocal total_converted
+                    for future in done:
+                        batch_len = pending.pop(future)
+                        try:
+                            total_converted += future.result()
+                        except Exception as e:
+                            logging.error(f"리소스 묶음 처리 중 오류 발생: {str(e)}")
+                        progress.update(batch_len)
+
+                for page in self.iter_prompt_pages(session, start_id, end_id, page_size):
+                    for offset in range(0, len(page), batch_size):
+                        if len(pending) >= max_pending:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            collect(done)
+                        batch = page[offset:offset + batch_size]
+                        pending[executor.submit(self._process_batch, batch)] = len(batch)
+
+                collect(list(pending))
 
             print(f"\n처리 완료: 총 {total_converted}개의 태그가 추가되었습니다.")
 
@@ -565,6 +589,9 @@ def main():
         
         # 세션 생성
         session, server = converter.get_session()
+
+        # 태그 이름/ID 캐시를 미리 채움 (작업 스레드가 공유)
+        get_tag_cache().load(session)
         
         # 태그 익스텐션 옵션 설정
         extension_options = get_extension_options(session)
@@ -590,9 +617,7 @@ def main():
         logging.error(f"처리 중 오류가 발생했습니다: {str(e)}")
     finally:
         if session:
-            session.remove()
-        if server:
-            server.stop()
+            end_session(session, server)
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -8,7 +8,15 @@ from typing import List, Tuple, Dict, Any
 from sqlalchemy import func
 
 # 로컬 모듈 임포트
-from manager import CharacterManager, OutfitManager, EventManager, InstrumentManager, PlaveManager
+from alias_matcher import (
+    get_alias_catalog,
+    get_alias_matcher,
+    CATEGORY_CHARACTER,
+    CATEGORY_OUTFIT,
+    CATEGORY_EVENT,
+    CATEGORY_INSTRUMENT,
+    CATEGORY_PLAVE
+)
 from models import ColorCodeTags
 from session_utills import get_session, end_session
 
@@ -17,15 +25,22 @@ class PromptTagExtractor:
     프롬프트에서 태그를 추출하고 분석하는 클래스
     """
     def __init__(self, session=None):
-        self.character_manager = CharacterManager()
-        self.outfit_manager = OutfitManager()
-        self.event_manager = EventManager()
-        self.instrument_manager = InstrumentManager()
-        self.plave_manager = PlaveManager()
+        # 매니저는 프로세스 전역 별칭 카탈로그의 인스턴스를 공유 (읽기 전용, 별칭 추가는 add_alias로만)
+        catalog = get_alias_catalog()
+        self.character_manager = catalog.managers[CATEGORY_CHARACTER]
+        self.outfit_manager = catalog.managers[CATEGORY_OUTFIT]
+        self.event_manager = catalog.managers[CATEGORY_EVENT]
+        self.instrument_manager = catalog.managers[CATEGORY_INSTRUMENT]
+        self.plave_manager = catalog.managers[CATEGORY_PLAVE]
         self.session = session
         self.lora_regex = r'<lora:([^:]+):([0-9.]+)>'  # 로라 태그 정규식
         self.lora_without_weight_regex = r'<lora:([^:>]+)>' # 로러 태그 정규식 가중치 X
 
+    @property
+    def alias_matcher(self):
+        """프로세스 전역 별칭 매처 (카탈로그의 별칭이 바뀌면 다시 컴파일된 매처를 반환)"""
+        return get_alias_matcher()
+
     def extract_tags_from_prompt(self, prompt_text: str) -> Dict[str, List[Tuple[str, str]]]:
         """
         프롬프트 텍스트에서 태그를 추출
@@ -73,43 +88,19 @@ class PromptTagExtractor:
             'has_plave_character': False
         }
         
-        # 캐릭터 태그 추출
-        for standard_name, item in self.character_manager.items.items():
-            for alias in item.aliases:
-                if alias.lower() in lower_prompt:
-                    result['characters'].append((alias, standard_name))
-                    result['has_4ground9_character'] = True
-                    break
-        
-        # 의상 태그 추출
-        for standard_name, item in self.outfit_manager.items.items():
-            for alias in item.aliases:
-                if alias.lower() in lower_prompt:
-                    result['outfits'].append((alias, standard_name))
-                    break
-        
-        # 이벤트/배경 태그 추출
-        for standard_name, item in self.event_manager.items.items():
-            for alias in item.aliases:
-                if alias.lower() in lower_prompt:
-                    result['events'].append((alias, standard_name))
-                    break
-        
-        # 악기 태그 추출
-        for standard_name, item in self.instrument_manager.items.items():
-            for alias in item.aliases:
-                if alias.lower() in lower_prompt:
-                    result['instruments'].append((alias, standard_name))
-                    break
+        # 모든 매니저의 별칭을 한 번에 검사 (프롬프트를 한 번만 훑음)
+        category_keys = {
+            CATEGORY_CHARACTER: 'characters',
+            CATEGORY_OUTFIT: 'outfits',
+            CATEGORY_EVENT: 'events',
+            CATEGORY_INSTRUMENT: 'instruments',
+            CATEGORY_PLAVE: 'plaves',
+        }
+        for alias, standard_name, category in self.alias_matcher.scan(prompt_text):
+            result[category_keys[category]].append((alias, standard_name))
 
-        # 플레이브 태그 추출
-        for standard_name, item in self.plave_manager.items.items():
-            for alias in item.aliases:
-                # clean_alias = alias.rstrip(',')  # 콤마 제거
-                if alias.lower() in lower_prompt:
-                    result['plaves'].append((alias, standard_name))
-                    result['has_plave_character'] = True  # 플레이브 캐릭터 포함 여부 설정
-                    break
+        result['has_4ground9_character'] = bool(result['characters'])
+        result['has_plave_character'] = bool(result['plaves'])  # 플레이브 캐릭터 포함 여부 설정
         
         # 로라 태그 추출
         lora_matches = re.findall(self.lora_regex, prompt_text)
@@ -276,7 +267,7 @@ def analyze_prompt(prompt_text: str, use_db: bool = False) -> Dict[str, Any]:
             'error': str(e)
         }
     finally:
-        if session and server:
+        if session:
             end_session(session, server)
 
 def display_extracted_tags(extracted_tags: Dict[str, Any]) -> None:
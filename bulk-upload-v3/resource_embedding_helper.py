@@ -2,108 +2,313 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import os
-from typing import List
-
-# GCP and Vertex AI imports
-try:
-    import vertexai
-    from vertexai.vision_models import Image, MultiModalEmbeddingModel
-    from google.oauth2 import service_account
-except ImportError:
-    MultiModalEmbeddingModel = None # Handle missing library
+import time
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
 
 # Local SQLAlchemy models
 from models import Resource, VertexAiEmbedDbEmbeddings
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from session_utills import get_connection_broker
+from embedding_codec import embedding_columns, DEFAULT_EMBEDDING_FORMAT
+from embedding_backend import (
+    EmbeddingBackend, VertexEmbeddingBackend, get_embedding_backend,
+    DEFAULT_PROJECT_ID, DEFAULT_REGION, EMBEDDING_BUCKET_NAME,
+)
 
 logger = logging.getLogger(__name__)
 
-class ResourceEmbeddingHelper:
+# EmbeddingService 기본값: 초당 요청 수 / 동시 요청 스레드 수 / 한 번에 쓰는 행 수 / 최대 쓰기 대기 시간(초)
+DEFAULT_EMBEDDING_QPS = 10.0
+DEFAULT_EMBEDDING_WORKERS = 8
+DEFAULT_EMBEDDING_WRITE_BATCH = 50
+DEFAULT_EMBEDDING_FLUSH_INTERVAL = 5.0
+
+
+def resolve_embedding_backend(backend: Optional[EmbeddingBackend] = None, project_id: str = DEFAULT_PROJECT_ID,
+                              region: str = DEFAULT_REGION,
+                              bucket_name: str = EMBEDDING_BUCKET_NAME) -> EmbeddingBackend:
     """
-    리소스 임베딩 생성 및 저장을 담당하는 헬퍼 클래스.
-    (SQLAlchemy와 함께 작동하도록 수정됨)
+    사용할 임베딩 백엔드를 정합니다.
+    인자로 받은 백엔드 > embedding_backend.set_embedding_backend()로 설정된 백엔드 > Vertex AI 순서입니다.
     """
-    def __init__(self, resource_id: int, session: Session, project_id: str = "453518888734", region: str = "asia-northeast3"):
+    return backend or get_embedding_backend() or VertexEmbeddingBackend(project_id, region, bucket_name)
+
+
+def read_local_image(image_path: Optional[str]) -> Optional[bytes]:
+    """로컬 원본 파일이 남아 있으면 바이트를 반환합니다. 없으면 None."""
+    if not image_path:
+        return None
+    try:
+        with open(image_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def media_url(image: str, bucket_name: str = EMBEDDING_BUCKET_NAME) -> str:
+    """리소스 이미지 경로의 GCS 공개 URL을 반환합니다."""
+    return f"https://storage.googleapis.com/{bucket_name}/_media/{image}"
+
+
+def embedding_record(resource_uuid: str, resource_id: int, image: str, embedding_vector: List[float],
+                     bucket_name: str = EMBEDDING_BUCKET_NAME,
+                     storage_format: str = DEFAULT_EMBEDDING_FORMAT) -> Dict[str, object]:
+    """
+    vertex_ai_embed_db_embeddings 테이블에 저장할 행을 만듭니다.
+    벡터는 storage_format에 따라 embedding(텍스트), embedding_vector(float32 bytea) 또는 둘 다에 저장합니다.
+    """
+    return {
+        "file_based_uuid": str(resource_uuid),
+        **embedding_columns(embedding_vector, storage_format),
+        "original_path": image,
+        "full_url": media_url(image, bucket_name),
+        "numeric_id_str": str(resource_id),
+    }
+
+
+class TokenBucket:
+    """
+    토큰 버킷 방식의 요청 속도 제한기 (스레드 안전).
+
+    Args:
+        rate: 초당 채워지는 토큰 수 (= 평균 QPS)
+        capacity: 최대 토큰 수 (순간적으로 허용하는 요청 수)
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate는 0보다 커야 합니다.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """토큰을 얻을 때까지 기다립니다."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+# 임베딩 작업 단위: 리소스 ID, 리소스 UUID, 이미지 경로(_media/ 아래 블롭 이름), 로컬 원본 파일 경로(선택)
+EmbeddingJob = namedtuple('EmbeddingJob', ['resource_id', 'resource_uuid', 'image', 'image_path'], defaults=[None])
+
+
+class EmbeddingService:
+    """
+    리소스 임베딩을 모아서 처리하는 서비스.
+    모델은 프로세스당 한 번만 불러오고, 작업 큐의 요청을 최대 qps로 동시에 보낸 뒤
+    결과를 write_batch_size개씩 모아 한 번의 INSERT ... ON CONFLICT DO UPDATE로 저장합니다.
+    sink를 지정하면 DB 대신 sink(행 목록)를 호출합니다. (벤치마크/테스트용)
+    로컬 바이트를 쓰는 백엔드면 작업의 로컬 원본 파일(image_path)을 읽어서 넘깁니다.
+
+    Args:
+        qps: 초당 최대 임베딩 요청 수 (토큰 버킷)
+        max_workers: 동시 요청 스레드 수
+        write_batch_size: 한 번에 저장할 임베딩 수
+        flush_interval: 배치가 다 차지 않아도 저장하는 최대 대기 시간(초)
+        on_result: 작업 하나가 끝날 때마다 호출되는 콜백 (job, error) - 성공이면 error는 None
+        backend: 사용할 임베딩 백엔드 (기본값: resolve_embedding_backend())
+        storage_format: 벡터 저장 형식 (embedding_codec.EMBEDDING_FORMATS)
+        sink: 모은 행(embedding_record() 목록)을 받는 함수 (None이면 vertex_ai_embed_db_embeddings에 저장)
+
+    Raises:
+        ValueError: synthetic 백엔드(로컬 CPU 백엔드)인데 sink가 없는 경우 - 가짜 벡터를 운영 테이블에 쓰지 않도록 막음
+    """
+
+    def __init__(self, qps: float = DEFAULT_EMBEDDING_QPS, max_workers: int = DEFAULT_EMBEDDING_WORKERS,
+                 write_batch_size: int = DEFAULT_EMBEDDING_WRITE_BATCH,
+                 flush_interval: float = DEFAULT_EMBEDDING_FLUSH_INTERVAL,
+                 project_id: str = DEFAULT_PROJECT_ID, region: str = DEFAULT_REGION,
+                 bucket_name: str = EMBEDDING_BUCKET_NAME,
+                 on_result: Optional[Callable[[EmbeddingJob, Optional[Exception]], None]] = None,
+                 backend: Optional[EmbeddingBackend] = None,
+                 storage_format: str = DEFAULT_EMBEDDING_FORMAT,
+                 sink: Optional[Callable[[List[Dict[str, object]]], None]] = None):
+        self.backend = resolve_embedding_backend(backend, project_id, region, bucket_name)
+        if self.backend.synthetic and sink is None:
+            raise ValueError(
+                f"{type(self.backend).__name__}의 벡터는 운영 테이블에 저장할 수 없습니다. sink를 지정해주세요."
+            )
+        self.sink = sink
+        self.bucket_name = bucket_name
+        self.storage_format = storage_format
+        self.write_batch_size = write_batch_size
+        self.flush_interval = flush_interval
+        self.on_result = on_result
+        self.rate_limiter = TokenBucket(qps)
+
+        self.stats = {'submitted': 0, 'success': 0, 'error': 0}
+        self.errors: List[str] = []
+        self._stats_lock = threading.Lock()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='embedding')
+        self._results: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='embedding-writer', daemon=True)
+        self._writer.start()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, job: EmbeddingJob) -> None:
+        """임베딩 작업을 큐에 넣습니다. (바로 반환)"""
+        if self._closed:
+            raise RuntimeError("이미 종료된 EmbeddingService입니다.")
+        with self._stats_lock:
+            self.stats['submitted'] += 1
+        self._executor.submit(self._embed_job, job)
+
+    def submit_many(self, jobs: Iterable[EmbeddingJob]) -> None:
+        """여러 임베딩 작업을 큐에 넣습니다."""
+        for job in jobs:
+            self.submit(job)
+
+    def embed(self, image: str, data: Optional[bytes] = None) -> List[float]:
         """
-        헬퍼 클래스 생성자.
-        리소스 ID, SQLAlchemy 세션, GCP 설정을 받고 Vertex AI 모델을 초기화합니다.
+        이미지 하나의 임베딩 벡터를 요청합니다. (속도 제한 적용)
+
+        Raises:
+            RuntimeError: 백엔드가 준비되지 않았거나 임베딩이 비어 있는 경우
         """
-        self.resource_id = resource_id
-        self.session = session
-        self.project_id = project_id
-        self.region = region
-        self.resource = None
-        self.model = None
-        self.bucket_name = "wcidfu-bucket"
+        if not self.backend.available:
+            raise RuntimeError("임베딩 백엔드가 준비되지 않아 임베딩을 생성할 수 없습니다.")
+        self.rate_limiter.acquire()
+        return self.backend.embed(image, data)
 
-        if not MultiModalEmbeddingModel:
-            logger.error("Vertex AI 라이브러리가 없어 모델을 초기화할 수 없습니다. `pip install google-cloud-aiplatform`를 실행해주세요.")
+    def _embed_job(self, job: EmbeddingJob) -> None:
+        try:
+            data = read_local_image(job.image_path) if self.backend.prefers_bytes else None
+            vector = self.embed(job.image, data)
+        except Exception as e:
+            logger.error(f"리소스 ID {job.resource_id} 임베딩 생성 실패: {e}")
+            self._finish(job, e)
             return
+        self._results.put((job, vector))
 
-        try:
-            logger.info("Vertex AI 인증 및 초기화 시작...")
+    def _write_loop(self) -> None:
+        """결과를 모아 write_batch_size개 또는 flush_interval마다 저장합니다. None을 받으면 남은 결과를 쓰고 종료합니다."""
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._results.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # 대기 시간 초과
 
-            # --- 인증 정보 명시적 로드 ---
-            # 현재 스크립트의 디렉토리를 기준으로 인증 파일 경로 설정
-            current_script_path = os.path.abspath(__file__)
-            base_directory = os.path.dirname(current_script_path)
-            credentials_path = os.path.join(base_directory, 'wcidfu-77f802b00777.json')
+            if item:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (item is None or item is False or len(batch) >= self.write_batch_size):
+                self._write_batch(batch)
+                batch = []
+                deadline = None
+            if item is None:
+                return
 
-            if os.path.exists(credentials_path):
-                credentials = service_account.Credentials.from_service_account_file(credentials_path)
-                logger.info(f"서비스 계정 '{credentials.service_account_email}'을 사용하여 인증합니다.")
-            else:
-                credentials = None
-                logger.warning(f"인증 파일 '{credentials_path}'을 찾을 수 없습니다. 기본 인증(ADC)을 시도합니다.")
-            # ---------------------------
-
-            vertexai.init(
-                project=self.project_id,
-                location=self.region,
-                credentials=credentials # 명시적으로 인증 정보 전달
+    def _write_batch(self, batch) -> None:
+        # 같은 UUID가 한 배치에 두 번 있으면 ON CONFLICT가 실패하므로 마지막 결과만 사용
+        rows = {
+            str(job.resource_uuid): embedding_record(
+                job.resource_uuid, job.resource_id, job.image, vector, self.bucket_name, self.storage_format
             )
-            logger.info(f"Vertex AI 초기화 완료 (Project: {self.project_id}, Region: {self.region})")
-            
-            logger.info("Vertex AI 모델 로딩 중...")
-            self.model = MultiModalEmbeddingModel.from_pretrained("multimodalembedding@001")
-            logger.info("Vertex AI 모델이 성공적으로 초기화되었습니다.")
-            
+            for job, vector in batch
+        }
+        try:
+            if self.sink is not None:
+                self.sink(list(rows.values()))
+            else:
+                self._write_rows(list(rows.values()))
         except Exception as e:
-            logger.error(f"Vertex AI 모델 초기화 중 오류 발생: {e}", exc_info=True)
+            logger.error(f"임베딩 {len(rows)}개 저장 중 오류 발생: {e}", exc_info=True)
+            for job, _ in batch:
+                self._finish(job, e)
+            return
+        for job, _ in batch:
+            self._finish(job, None)
 
-    @staticmethod
-    def _convert_http_to_gcs_uri(http_url: str) -> str:
-        """
-        Signed URL에서 쿼리 파라미터(? 뒷부분)를 제거하고 gs:// URI로 변환합니다.
-        """
-        base_url = http_url.split('?')[0]
-        
-        if base_url.startswith("https://storage.googleapis.com/"):
-            return base_url.replace("https://storage.googleapis.com/", "gs://")
-        
-        logger.warning(f"GCS URL 형식이 아니므로 변환 없이 원본 URL을 사용합니다: {base_url}")
-        return base_url
-
-    def _get_vertex_embedding(self, image_url: str) -> List[float]:
-        """
-        [비공개 메서드] 이미지 URL로부터 Vertex AI 임베딩을 추출합니다.
+    def _write_rows(self, rows: List[Dict[str, object]]) -> None:
+        with get_connection_broker().session_scope() as session:
+            statement = pg_insert(VertexAiEmbedDbEmbeddings.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=['file_based_uuid'],
+                set_={
+                    column: statement.excluded[column]
+                    for column in ('embedding', 'embedding_vector', 'original_path', 'full_url', 'numeric_id_str')
+                }
+            )
+            session.execute(statement, rows)
+        logger.info(f"[DB 저장 완료] 임베딩 {len(rows)}개를 저장(생성/업데이트)했습니다.")
+
+    def _finish(self, job: EmbeddingJob, error: Optional[Exception]) -> None:
+        with self._stats_lock:
+            if error is None:
+                self.stats['success'] += 1
+            else:
+                self.stats['error'] += 1
+                self.errors.append(f"Resource ID {job.resource_id}: {error}")
+        if self.on_result:
+            try:
+                self.on_result(job, error)
+            except Exception as e:
+                logger.error(f"임베딩 결과 콜백 오류: {e}")
+
+    def close(self) -> Dict[str, int]:
+        """남은 요청과 저장이 모두 끝날 때까지 기다린 뒤 서비스를 종료하고 통계를 반환합니다."""
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+            self._results.put(None)
+            self._writer.join()
+        return dict(self.stats)
+
+
+class ResourceEmbeddingHelper:
+    """
+    리소스 임베딩 생성 및 저장을 담당하는 헬퍼 클래스.
+    (SQLAlchemy와 함께 작동하도록 수정됨)
+    """
+    def __init__(self, resource_id: int, session: Session, project_id: str = DEFAULT_PROJECT_ID, region: str = DEFAULT_REGION,
+                 backend: Optional[EmbeddingBackend] = None, image_bytes: Optional[bytes] = None,
+                 storage_format: str = DEFAULT_EMBEDDING_FORMAT):
         """
-        if not self.model:
-            logger.error("Vertex AI 모델이 준비되지 않아 임베딩을 생성할 수 없습니다.")
-            return None
+        헬퍼 클래스 생성자.
+        리소스 ID, SQLAlchemy 세션, GCP 설정을 받고 임베딩 백엔드를 준비합니다. (Vertex AI 모델은 프로세스당 1회만 초기화)
+        image_bytes가 있고 백엔드가 로컬 바이트를 쓰면 버킷에서 다시 읽지 않고 메모리의 원본 바이트를 사용합니다.
 
-        logger.info(f"Vertex AI로 '{image_url}'의 임베딩 생성을 시작합니다.")
-        try:
-            gcs_uri = self._convert_http_to_gcs_uri(image_url)
-            image = Image(gcs_uri=gcs_uri)
-            embeddings = self.model.get_embeddings(image=image)
-            embedding_values = embeddings.image_embedding
-            logger.info(f"임베딩 벡터를 성공적으로 생성했습니다. (차원: {len(embedding_values)})")
-            return embedding_values
-        except Exception as e:
-            logger.error(f"Vertex AI 임베딩 생성 중 예외 발생 (URL: {image_url}): {e}", exc_info=True)
-            return None
+        Raises:
+            ValueError: synthetic 백엔드(로컬 CPU 백엔드) - 헬퍼는 항상 운영 테이블에 저장하므로 사용할 수 없음
+        """
+        self.resource_id = resource_id
+        self.session = session
+        self.project_id = project_id
+        self.region = region
+        self.resource = None
+        self.bucket_name = EMBEDDING_BUCKET_NAME
+        self.backend = resolve_embedding_backend(backend, project_id, region, self.bucket_name)
+        if self.backend.synthetic:
+            raise ValueError(f"{type(self.backend).__name__}의 벡터는 운영 테이블에 저장할 수 없습니다.")
+        self.image_bytes = image_bytes
+        self.storage_format = storage_format
 
     def _fetch_resource(self) -> bool:
         """리소스 객체를 데이터베이스에서 가져옵니다. (SQLAlchemy 사용)"""
@@ -126,40 +331,57 @@ class ResourceEmbeddingHelper:
         return True
 
     def _generate_embedding(self) -> List[float]:
-        """임베딩 생성 로직을 호출합니다."""
-        full_blob_path = f"_media/{self.resource.image}"
-        image_url = f"https://storage.googleapis.com/{self.bucket_name}/{full_blob_path}"
-        return self._get_vertex_embedding(image_url)
+        """
+        [비공개 메서드] 백엔드로 리소스 이미지의 임베딩을 추출합니다.
+        """
+        image = self.resource.image
+        logger.info(f"'{image}'의 임베딩 생성을 시작합니다.")
+        try:
+            data = self.image_bytes if self.backend.prefers_bytes else None
+            embedding_values = self.backend.embed(image, data)
+            logger.info(f"임베딩 벡터를 성공적으로 생성했습니다. (차원: {len(embedding_values)})")
+            return embedding_values
+        except Exception as e:
+            logger.error(f"임베딩 생성 중 예외 발생 (이미지: {image}): {e}", exc_info=True)
+            return None
 
-    def _save_embedding(self, embedding_vector: List[float]):
-        """생성된 임베딩을 SQLAlchemy를 사용하여 저장합니다."""
+    def _save_embedding(self, embedding_vector: List[float], commit: bool = True):
+        """
+        생성된 임베딩을 SQLAlchemy를 사용하여 저장합니다.
+        commit=False면 세이브포인트 안에서 기록만 하고 커밋은 호출자의 트랜잭션에 맡깁니다.
+        """
         try:
-            full_blob_path = f"_media/{self.resource.image}"
-            image_url = f"https://storage.googleapis.com/{self.bucket_name}/{full_blob_path}"
-            
             # session.merge()는 insert와 update 로직(upsert)을 모두 처리합니다.
             # 기본 키(file_based_uuid)를 확인하여 작업을 결정합니다.
-            embedding_to_save = VertexAiEmbedDbEmbeddings(
-                file_based_uuid=str(self.resource.uuid),
-                embedding=str(embedding_vector),
-                original_path=self.resource.image,
-                full_url=image_url,
-                numeric_id_str=str(self.resource.id)
-            )
-            self.session.merge(embedding_to_save)
-            self.session.commit()
+            embedding_to_save = VertexAiEmbedDbEmbeddings(**embedding_record(
+                self.resource.uuid, self.resource.id, self.resource.image, embedding_vector, self.bucket_name,
+                self.storage_format
+            ))
+            if commit:
+                self.session.merge(embedding_to_save)
+                self.session.commit()
+            else:
+                # 실패해도 바깥 트랜잭션(리소스 생성)은 유지되도록 세이브포인트 사용
+                with self.session.begin_nested():
+                    self.session.merge(embedding_to_save)
             # 참고: 이 방식으로는 insert/update 여부를 쉽게 알 수 없지만,
             # 결과적으로 데이터는 안전하게 저장됩니다.
             logger.info(f"[DB 저장 완료] UUID {self.resource.uuid}의 임베딩을 저장(생성/업데이트)했습니다.")
         except Exception as e:
             logger.error(f"임베딩 저장 중 DB 오류 발생 (UUID: {self.resource.uuid}): {e}", exc_info=True)
-            self.session.rollback()
+            if commit:
+                self.session.rollback()
 
-    def run(self):
-        """헬퍼의 메인 실행 메서드. 모든 과정을 순차적으로 실행합니다."""
+    def run(self, commit: bool = True):
+        """
+        헬퍼의 메인 실행 메서드. 모든 과정을 순차적으로 실행합니다.
+
+        Args:
+            commit: False면 임베딩 저장 후 커밋하지 않음 (리소스 생성 트랜잭션에 포함할 때)
+        """
         logger.info(f"리소스 ID {self.resource_id}에 대한 임베딩 처리 시작...")
-        if not self.model:
-            logger.error("모델이 없어 처리를 중단합니다.")
+        if not self.backend.available:
+            logger.error("임베딩 백엔드가 준비되지 않아 처리를 중단합니다.")
             return
 
         if not self._fetch_resource(): return
@@ -171,7 +393,7 @@ class ResourceEmbeddingHelper:
                 logger.error(f"리소스 ID {self.resource_id}의 임베딩 생성에 실패했습니다.")
                 return
             
-            self._save_embedding(embedding)
+            self._save_embedding(embedding, commit=commit)
             logger.info(f"리소스 ID {self.resource_id}에 대한 임베딩 처리 성공적으로 완료.")
         except Exception as e:
             logger.error(f"리소스 ID {self.resource_id} 처리 중 예외 발생: {e}", exc_info=True)
\ No newline at end of file
@@ -77,7 +77,7 @@ def search_normal_tags(user_id: int, search_term: Optional[str] = "", page: int
         print(f"태그 검색 중 오류 발생: {str(e)}")
         return [], 0
     finally:
-        if session and server:
+        if session:
             end_session(session, server)
 
 def display_tags(tags: List[Any], page: int = 1, page_size: int = 50, total_count: int = 0):
@@ -2,28 +2,94 @@
 # -*- coding: utf-8 -*-
 
 import os
+import json
+import hashlib
 import logging
 import time
 import io
-from typing import Tuple, Any
+import atexit
+import threading
+from contextlib import contextmanager
+from ssl import SSLError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Any, Dict, List, Optional
 
 # Third Party Libraries
 from sshtunnel import SSHTunnelForwarder
 from sqlalchemy.orm import Session, scoped_session, sessionmaker
-from sqlalchemy import text
+from sqlalchemy import text, event
 from google.cloud import storage
 from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession
+from google.api_core import exceptions as gcs_exceptions
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
 
 # Local Imports
-from models import setup_database_engine
+from models import setup_database_engine, ensure_schema, bootstrap_schema
+from storage_backend import get_storage_backend
 
-def start_ssh_tunnel(max_retries=3, retry_delay=5):
+# DB 연결 풀 설정 (프로세스 전역 엔진 1개를 공유)
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 20
+DB_POOL_PRE_PING = True
+DB_POOL_TIMEOUT = 30  # 풀에서 연결을 기다리는 최대 시간(초)
+DB_POOL_RECYCLE = 1800  # 30분
+TUNNEL_HEALTH_CHECK_INTERVAL = 30  # 터널 상태 확인 최소 간격(초)
+
+# GCS 클라이언트 설정
+CREDENTIALS_FILE_NAME = 'wcidfu-77f802b00777.json'
+DEFAULT_STORAGE_POOL_SIZE = 48  # 업로드 스레드 12개 x 리소스당 블롭 4개
+
+# 재개 가능한(resumable) 업로드 설정
+RESUMABLE_UPLOAD_THRESHOLD = 8 * 1024 * 1024  # 이 크기 이상이면 청크 단위 재개 가능 업로드 사용 (0이면 사용 안 함)
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024  # 256KiB의 배수여야 함
+RESUMABLE_SESSIONS_FILE_NAME = 'resumable_upload_sessions.json'
+RESUMABLE_SESSION_MAX_AGE = 6 * 24 * 60 * 60  # GCS 세션 URI는 1주일 뒤 만료되므로 그 전에 로컬 기록도 정리(초)
+
+# 프로세스 전역 GCS 클라이언트/버킷 캐시
+_storage_lock = threading.Lock()
+_storage_client = None
+_storage_pool_size = DEFAULT_STORAGE_POOL_SIZE
+_bucket_cache: Dict[str, Any] = {}
+_upload_executor = None
+
+# 재시도할 일시적 오류 (5xx, 429, SSL/연결 끊김)
+TRANSIENT_UPLOAD_ERRORS = (
+    gcs_exceptions.InternalServerError,
+    gcs_exceptions.BadGateway,
+    gcs_exceptions.ServiceUnavailable,
+    gcs_exceptions.GatewayTimeout,
+    gcs_exceptions.TooManyRequests,
+    SSLError,
+    RequestsConnectionError,
+    RequestsTimeout,
+    ConnectionError,
+)
+
+# 재개 가능한 업로드 세션 응답 코드
+RESUME_INCOMPLETE = 308
+UPLOAD_COMPLETE = (200, 201)
+SESSION_EXPIRED = (404, 410)
+
+class BlobUploadError(Exception):
+    """
+    일부 블롭 업로드가 최종 실패했을 때 발생합니다.
+    성공한 블롭(uploaded)과 실패한 블롭(failed)을 함께 전달하여 실패한 것만 다시 시도할 수 있게 합니다.
+    """
+    def __init__(self, uploaded: Dict[str, str], failed: Dict[str, Exception]):
+        self.uploaded = uploaded
+        self.failed = failed
+        super().__init__(f"{len(failed)}개 블롭 업로드 실패: {', '.join(failed)}")
+
+def start_ssh_tunnel(max_retries=3, retry_delay=5, local_bind_port: int = 0):
     """
     SSH 터널을 설정합니다.
     
     Args:
         max_retries: 최대 재시도 횟수
         retry_delay: 재시도 간 대기 시간(초)
+        local_bind_port: 로컬 포트 (0이면 빈 포트 자동 선택, 재연결 시 같은 포트를 다시 사용)
         
     Returns:
         SSHTunnelForwarder: 생성된 SSH 터널
@@ -35,6 +101,7 @@ def start_ssh_tunnel(max_retries=3, retry_delay=5):
                 ssh_username='nerdystar',
                 ssh_pkey='./wcidfu-ssh',
                 remote_bind_address=('10.1.31.44', 5432),
+                local_bind_address=('127.0.0.1', local_bind_port),
                 set_keepalive=60
             )
             server.start()
@@ -48,38 +115,177 @@ def start_ssh_tunnel(max_retries=3, retry_delay=5):
                 logging.error(f"Failed to establish SSH tunnel after {max_retries} attempts: {str(e)}")
                 raise
 
+class ConnectionBroker:
+    """
+    프로세스 전역에서 SSH 터널 1개와 연결 풀 엔진 1개를 공유하고 세션을 발급합니다.
+    
+    - 터널은 최초 사용 시 한 번만 열고, 로컬 포트를 고정하여 재연결 후에도 같은 엔진을 그대로 사용합니다.
+    - 풀이 새 DB 연결을 만들 때마다(pre_ping 실패 포함) 터널 상태를 확인하고, 끊겼으면 다시 엽니다.
+    """
+    def __init__(self, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW,
+                 pool_pre_ping: bool = DB_POOL_PRE_PING, pool_timeout: int = DB_POOL_TIMEOUT,
+                 pool_recycle: int = DB_POOL_RECYCLE):
+        self.pool_options = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_pre_ping": pool_pre_ping,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+        }
+        self.server = None
+        self.engine = None
+        self.session_factory = None
+        self._lock = threading.RLock()
+        self._local_port = 0
+        self._last_health_check = 0.0
+
+    def configure(self, **pool_options):
+        """
+        연결 풀 설정을 변경합니다. (pool_size, max_overflow, pool_pre_ping, pool_timeout, pool_recycle)
+        이미 만든 엔진은 폐기하고 다음 사용 시 새 설정으로 다시 만듭니다.
+        """
+        with self._lock:
+            unknown = set(pool_options) - set(self.pool_options)
+            if unknown:
+                raise ValueError(f"알 수 없는 풀 설정: {', '.join(sorted(unknown))}")
+            if all(self.pool_options[key] == value for key, value in pool_options.items()):
+                return
+            self.pool_options.update(pool_options)
+            if self.engine is not None:
+                self.engine.dispose()
+                self.engine = None
+                self.session_factory = None
+
+    def ensure_capacity(self, connections: int):
+        """
+        동시에 connections개의 연결을 쓸 수 있도록 필요하면 max_overflow를 늘립니다.
+        """
+        with self._lock:
+            available = self.pool_options["pool_size"] + self.pool_options["max_overflow"]
+            if available < connections:
+                self.configure(max_overflow=connections - self.pool_options["pool_size"])
+
+    def ensure_tunnel(self, force: bool = False) -> SSHTunnelForwarder:
+        """
+        터널이 살아 있는지 확인하고 끊겼으면 같은 로컬 포트로 다시 엽니다.
+        확인은 TUNNEL_HEALTH_CHECK_INTERVAL마다 한 번만 수행합니다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (not force and self.server is not None
+                    and now - self._last_health_check < TUNNEL_HEALTH_CHECK_INTERVAL):
+                return self.server
+
+            self._last_health_check = now
+            if self.server is not None:
+                try:
+                    self.server.check_tunnels()
+                    if self.server.is_active and all(self.server.tunnel_is_up.values()):
+                        return self.server
+                except Exception as e:
+                    logging.warning(f"SSH tunnel health check failed: {str(e)}")
+                logging.info("SSH tunnel is down. Reconnecting...")
+                stop_ssh_tunnel(self.server)
+
+            self.server = start_ssh_tunnel(local_bind_port=self._local_port)
+            self._local_port = self.server.local_bind_port
+            return self.server
+
+    def get_engine(self):
+        """공유 엔진을 반환합니다. (최초 호출 시 터널과 엔진 생성)"""
+        if self.engine is not None:
+            return self.engine
+
+        with self._lock:
+            if self.engine is None:
+                server = self.ensure_tunnel(force=True)
+                engine = setup_database_engine("wcidfu", server.local_bind_port, **self.pool_options)
+                # 모델 지문이 바뀐 경우에만 create_all 실행 (평소에는 DDL 왕복 없음)
+                ensure_schema(engine)
+
+                @event.listens_for(engine, "do_connect")
+                def _check_tunnel_before_connect(dialect, conn_rec, cargs, cparams):
+                    # 새 DB 연결을 만들기 전에 터널 상태 확인 (끊겼으면 같은 포트로 재연결)
+                    self.ensure_tunnel()
+
+                self.engine = engine
+                self.session_factory = sessionmaker(bind=engine)
+            return self.engine
+
+    def bootstrap_schema(self):
+        """누락된 테이블을 생성하고 스키마 지문을 갱신합니다. (명시적 1회 실행용)"""
+        bootstrap_schema(self.get_engine())
+
+    def new_session(self) -> Session:
+        """공유 풀에서 연결을 빌려 쓰는 새 세션을 반환합니다. 사용 후 close()해야 합니다."""
+        self.get_engine()
+        return self.session_factory()
+
+    def scoped_session(self) -> scoped_session:
+        """스레드마다 별도 세션을 주는 scoped_session을 반환합니다."""
+        self.get_engine()
+        return scoped_session(self.session_factory)
+
+    @contextmanager
+    def session_scope(self):
+        """작업이 끝나면 커밋(실패 시 롤백)하고 세션을 닫는 컨텍스트 매니저입니다."""
+        session = self.new_session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def shutdown(self):
+        """엔진과 터널을 종료합니다. (프로세스 종료 시 자동 호출)"""
+        with self._lock:
+            if self.engine is not None:
+                self.engine.dispose()
+                self.engine = None
+                self.session_factory = None
+            if self.server is not None:
+                stop_ssh_tunnel(self.server)
+                self.server = None
+
+_broker = ConnectionBroker()
+atexit.register(_broker.shutdown)
+
+def get_connection_broker() -> ConnectionBroker:
+    """프로세스 전역 ConnectionBroker를 반환합니다."""
+    return _broker
+
 def get_session() -> Tuple[Any, SSHTunnelForwarder]:
     """
-    SSH 터널과 데이터베이스 세션을 생성합니다.
+    공유 터널/엔진에서 데이터베이스 세션을 생성합니다.
+    터널과 엔진은 프로세스당 한 번만 만들고, 호출마다 새 scoped_session만 발급합니다.
     
     Returns:
-        Tuple[Any, SSHTunnelForwarder]: (세션 객체, SSH 터널)
+        Tuple[Any, SSHTunnelForwarder]: (세션 객체, 공유 SSH 터널)
     """
     retries = 3
     for attempt in range(retries):
         try:
-            server = start_ssh_tunnel()
-            engine = setup_database_engine("wcidfu", server.local_bind_port)
-            session_factory = sessionmaker(bind=engine)
-            session = scoped_session(session_factory)
+            session = _broker.scoped_session()
             
             # 연결 테스트
             session().execute(text("SELECT 1"))
             
-            return session, server
+            return session, _broker.server
         except Exception as e:
             if attempt < retries - 1:
                 logging.warning(f"Database connection attempt {attempt + 1} failed. Retrying...")
                 time.sleep(5)
-                if server:
-                    stop_ssh_tunnel(server)
+                _broker.ensure_tunnel(force=True)
             else:
                 logging.error(f"Failed to establish database connection after {retries} attempts")
                 raise
 
 def end_session(session, server):
     """
-    세션과 SSH 터널을 종료합니다.
+    세션을 종료합니다. 공유 터널은 프로세스 종료 시까지 유지하고, 그 외 터널만 닫습니다.
     
     Args:
         session: 데이터베이스 세션
@@ -98,8 +304,8 @@ def end_session(session, server):
             except:
                 pass
         
-        # SSH 터널 종료
-        if server:
+        # 공유 터널이 아닌 경우에만 SSH 터널 종료
+        if server and server is not _broker.server:
             stop_ssh_tunnel(server)
                 
     except Exception as e:
@@ -134,33 +340,315 @@ def check_connection(server):
         return start_ssh_tunnel()
     return server
 
-def upload_to_bucket(blob_name, data, bucket_name):
+def configure_storage_client(pool_size: int):
+    """
+    GCS HTTP 연결 풀 크기를 설정합니다. 이미 생성된 클라이언트는 다음 호출 시 다시 만듭니다.
+    
+    Args:
+        pool_size: 동시에 유지할 HTTP 연결 수 (업로드 워커 수에 맞춰 설정)
+    """
+    global _storage_client, _storage_pool_size, _upload_executor
+    with _storage_lock:
+        if pool_size == _storage_pool_size and _storage_client is not None:
+            return
+        _storage_pool_size = pool_size
+        _storage_client = None
+        _bucket_cache.clear()
+        if _upload_executor is not None:
+            _upload_executor.shutdown(wait=False)
+            _upload_executor = None
+
+def get_storage_client() -> storage.Client:
+    """
+    프로세스 전역에서 공유하는 GCS 클라이언트를 반환합니다.
+    인증 정보는 최초 1회만 읽고, HTTP 연결 풀은 설정된 크기로 만듭니다.
+    
+    Returns:
+        storage.Client: 캐시된 GCS 클라이언트
+    """
+    global _storage_client
+    if _storage_client is not None:
+        return _storage_client
+
+    with _storage_lock:
+        if _storage_client is None:
+            base_directory = os.path.dirname(os.path.abspath(__file__))
+            credentials_path = os.path.join(base_directory, CREDENTIALS_FILE_NAME)
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+
+            credentials = service_account.Credentials.from_service_account_file(
+                credentials_path,
+                scopes=storage.Client.SCOPE
+            )
+
+            http = AuthorizedSession(credentials)
+            adapter = HTTPAdapter(pool_connections=_storage_pool_size, pool_maxsize=_storage_pool_size)
+            http.mount("https://", adapter)
+
+            _storage_client = storage.Client(
+                project=credentials.project_id,
+                credentials=credentials,
+                _http=http
+            )
+            logging.info(f"GCS client created (pool size: {_storage_pool_size})")
+        return _storage_client
+
+def get_bucket(bucket_name: str) -> storage.Bucket:
+    """
+    버킷 핸들을 반환합니다. get_bucket()의 메타데이터 GET 요청 없이 로컬에서 생성하여 캐시합니다.
+    
+    Args:
+        bucket_name: 버킷 이름
+        
+    Returns:
+        storage.Bucket: 캐시된 버킷 객체
+    """
+    bucket = _bucket_cache.get(bucket_name)
+    if bucket is None:
+        bucket = get_storage_client().bucket(bucket_name)
+        _bucket_cache[bucket_name] = bucket
+    return bucket
+
+class ResumableSessionStore:
+    """
+    진행 중인 재개 가능한 업로드 상태를 로컬 JSON 파일에 저장합니다. (실행이 중단되어도 다음 실행에서 이어받음)
+    업로드 세션 URI는 (버킷, 객체 이름, 데이터 해시)를 키로 저장하므로 같은 객체에 같은 데이터를 다시 올릴 때만 이전 세션을 이어받습니다.
+    (다른 객체 이름으로 올리는 업로드가 이전 세션의 객체로 바뀌어 썸네일과 UUID가 어긋나지 않도록 함)
+    완료된 항목은 호출자가 remove()로 지우고, max_age초가 지난 항목은 파일을 읽을 때 버립니다.
+    """
+    def __init__(self, path: str, max_age: float = RESUMABLE_SESSION_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._sessions = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._sessions is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._sessions = json.load(f)
+            except FileNotFoundError:
+                self._sessions = {}
+            except (OSError, ValueError) as e:
+                logging.warning(f"업로드 세션 파일을 읽지 못했습니다. 새로 시작합니다: {e}")
+                self._sessions = {}
+            self._expire()
+        return self._sessions
+
+    def _expire(self):
+        """max_age초보다 오래된 항목(만료된 세션, 중단된 뒤 다시 실행하지 않은 업로드)을 버립니다."""
+        cutoff = time.time() - self.max_age
+        expired = [key for key, entry in self._sessions.items() if entry.get('created_at', 0) < cutoff]
+        if expired:
+            logging.info(f"오래된 업로드 기록 {len(expired)}개를 정리합니다.")
+            for key in expired:
+                del self._sessions[key]
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._sessions, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, entry: dict):
+        with self._lock:
+            self._load()[key] = dict(entry, created_at=time.time())
+            self._save()
+
+    def remove(self, key: str):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+_resumable_sessions = ResumableSessionStore(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), RESUMABLE_SESSIONS_FILE_NAME)
+)
+
+def _resumable_offset(response) -> int:
+    """308 응답의 Range 헤더("bytes=0-N")에서 다음에 보낼 바이트 위치를 구합니다."""
+    range_header = response.headers.get('Range')
+    if not range_header:
+        return 0
+    return int(range_header.rsplit('-', 1)[1]) + 1
+
+def _query_resumable_session(http, session_url: str, total_size: int) -> Optional[int]:
+    """
+    세션에 이미 저장된 바이트 수를 조회합니다.
+    
+    Returns:
+        int: 다음에 보낼 바이트 위치 (완료된 경우 total_size), 세션이 만료되었으면 None
+    """
+    response = http.put(session_url, data=b'', headers={'Content-Range': f'bytes */{total_size}'})
+    if response.status_code == RESUME_INCOMPLETE:
+        return _resumable_offset(response)
+    if response.status_code in UPLOAD_COMPLETE:
+        return total_size
+    if response.status_code in SESSION_EXPIRED:
+        return None
+    raise gcs_exceptions.from_http_response(response)
+
+def _resumable_upload(blob_name: str, data: bytes, bucket_name: str,
+                      chunk_size: int = RESUMABLE_CHUNK_SIZE) -> str:
+    """
+    데이터를 청크 단위로 재개 가능한 업로드를 합니다.
+    세션 URI를 로컬에 저장해 두고, 연결이 끊겨 같은 객체 이름으로 다시 호출되면 서버에 저장된 위치부터 이어서 보냅니다.
+    (다음 실행에서도 같은 객체 이름을 쓰도록 bulk_uploader_v3는 원본 파일별로 리소스 UUID를 저장해 둠)
+    
+    Returns:
+        str: 업로드된 객체 이름 (항상 blob_name)
+    """
+    http = get_storage_client()._http
+    total_size = len(data)
+    content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+    session_key = f"{bucket_name}/{blob_name}:{content_hash}"
+    offset = 0
+
+    entry = _resumable_sessions.get(session_key)
+    if entry is not None and entry.get('size') != total_size:
+        entry = None
+    if entry is not None:
+        offset = _query_resumable_session(http, entry['url'], total_size)
+        if offset is None:
+            logging.info(f"만료된 업로드 세션을 버립니다: {entry['blob_name']}")
+            _resumable_sessions.remove(session_key)
+            entry = None
+        else:
+            logging.info(f"업로드 재개: {blob_name} ({offset}/{total_size} bytes)")
+
+    if entry is None:
+        blob = get_bucket(bucket_name).blob(blob_name)
+        session_url = blob.create_resumable_upload_session(size=total_size)
+        entry = {'url': session_url, 'blob_name': blob_name, 'bucket': bucket_name, 'size': total_size}
+        _resumable_sessions.put(session_key, entry)
+
+    while offset < total_size:
+        end = min(offset + chunk_size, total_size)
+        response = http.put(
+            entry['url'],
+            data=data[offset:end],
+            headers={'Content-Range': f'bytes {offset}-{end - 1}/{total_size}'}
+        )
+        if response.status_code in UPLOAD_COMPLETE:
+            break
+        if response.status_code != RESUME_INCOMPLETE:
+            # 5xx/429는 TRANSIENT_UPLOAD_ERRORS로 분류되어 upload_blobs에서 재시도 (세션은 유지)
+            raise gcs_exceptions.from_http_response(response)
+        offset = _resumable_offset(response)
+
+    _resumable_sessions.remove(session_key)
+    return blob_name
+
+def upload_to_bucket(blob_name, data, bucket_name, resumable_threshold: Optional[int] = None):
     """
     데이터를 Google Cloud Storage 버킷에 업로드합니다.
+    데이터가 resumable_threshold 이상이면 청크 단위 재개 가능한 업로드를 사용합니다.
+    storage_backend.set_storage_backend()로 다른 백엔드가 설정되어 있으면 그 백엔드에 저장합니다.
     
     Args:
         blob_name: 저장할 객체 이름
         data: 저장할 데이터
         bucket_name: 버킷 이름
+        resumable_threshold: 재개 가능한 업로드를 사용할 최소 크기(바이트), None이면 RESUMABLE_UPLOAD_THRESHOLD
         
     Returns:
         str: 정리된 객체 이름 (경로 프리픽스 제거됨)
     """
-    current_script_path = os.path.abspath(__file__)
-    base_directory = os.path.dirname(current_script_path)
-    
-    credentials_path = os.path.join(base_directory, 'wcidfu-77f802b00777.json')
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-
-    credentials = service_account.Credentials.from_service_account_file(credentials_path)
+    if resumable_threshold is None:
+        resumable_threshold = RESUMABLE_UPLOAD_THRESHOLD
+    if isinstance(data, str):
+        data = data.encode('utf-8')
 
-    storage_client = storage.Client(credentials=credentials)
-    bucket = storage_client.get_bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-    blob.upload_from_string(data)
+    backend = get_storage_backend()
+    if backend is not None:
+        blob_name = backend.upload(bucket_name, blob_name, data)
+    elif resumable_threshold and len(data) >= resumable_threshold:
+        blob_name = _resumable_upload(blob_name, data, bucket_name)
+    else:
+        blob = get_bucket(bucket_name).blob(blob_name)
+        blob.upload_from_string(data)
     clean_blob_name = blob_name.replace("_media/", "")    
     return clean_blob_name
 
+def _get_upload_executor() -> ThreadPoolExecutor:
+    """블롭 병렬 업로드에 사용하는 전역 스레드 풀을 반환합니다. (HTTP 연결 풀 크기와 동일)"""
+    global _upload_executor
+    with _storage_lock:
+        if _upload_executor is None:
+            _upload_executor = ThreadPoolExecutor(max_workers=_storage_pool_size, thread_name_prefix="gcs-upload")
+        return _upload_executor
+
+def upload_blobs(uploads: Dict[str, bytes], bucket_name: str, max_retries: int = 3,
+                 retry_delay: float = 1.0) -> Dict[str, str]:
+    """
+    여러 블롭을 동시에 업로드합니다.
+    일시적 오류가 난 블롭만 지수 백오프로 다시 업로드하고, 이미 성공한 블롭은 다시 보내지 않습니다.
+    
+    Args:
+        uploads: 블롭 이름 -> 업로드할 데이터
+        bucket_name: 버킷 이름
+        max_retries: 블롭별 최대 재시도 횟수
+        retry_delay: 첫 재시도 대기 시간(초), 재시도마다 2배씩 증가
+        
+    Returns:
+        Dict[str, str]: 블롭 이름 -> 정리된 객체 이름
+        
+    Raises:
+        BlobUploadError: 재시도 후에도 실패한 블롭이 있는 경우
+    """
+    executor = _get_upload_executor()
+    uploaded: Dict[str, str] = {}
+    failed: Dict[str, Exception] = {}
+    pending: List[str] = list(uploads)
+
+    for attempt in range(max_retries + 1):
+        futures = {
+            blob_name: executor.submit(upload_to_bucket, blob_name, uploads[blob_name], bucket_name)
+            for blob_name in pending
+        }
+
+        pending = []
+        for blob_name, future in futures.items():
+            try:
+                uploaded[blob_name] = future.result()
+                failed.pop(blob_name, None)
+            except TRANSIENT_UPLOAD_ERRORS as e:
+                failed[blob_name] = e
+                pending.append(blob_name)
+            except Exception as e:
+                failed[blob_name] = e
+
+        if not pending:
+            break
+
+        if attempt < max_retries:
+            delay = retry_delay * (2 ** attempt)
+            logging.warning(f"{len(pending)}개 블롭 업로드 일시적 오류. {delay}초 후 재시도합니다... ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+    if failed:
+        raise BlobUploadError(uploaded, failed)
+    return uploaded
+
+def delete_blobs(blob_names: List[str], bucket_name: str) -> None:
+    """
+    업로드된 블롭을 삭제합니다. (DB에 기록되지 않은 업로드 정리용, 실패해도 예외를 내지 않고 로그만 남김)
+    storage_backend.set_storage_backend()로 다른 백엔드가 설정되어 있으면 그 백엔드에서 삭제합니다.
+    """
+    backend = get_storage_backend()
+    for blob_name in blob_names:
+        try:
+            if backend is not None:
+                backend.delete(bucket_name, blob_name)
+            else:
+                get_bucket(bucket_name).blob(blob_name).delete()
+        except Exception as e:
+            logging.warning(f"블롭 삭제 실패 ({blob_name}): {e}")
+
 def upload_image_to_gcp_bucket(blob_name, data, bucket_name):
     """
     이미지 데이터를 Google Cloud Storage 버킷에 업로드합니다.
@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import math
+import logging
+from collections import namedtuple
+from datetime import datetime
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from sqlalchemy import func, or_, select
+from tqdm import tqdm
+
+from models import VertexAiEmbedDbEmbeddings, seoul_tz
+from session_utills import get_connection_broker
+from embedding_codec import parse_text_embedding
+from resource_embedding_helper import resolve_embedding_backend, read_local_image
+
+logger = logging.getLogger(__name__)
+
+# 인덱스 파일을 저장하는 폴더 (스크립트 폴더 아래)
+SIMILARITY_INDEX_DIR_NAME = 'similarity_index'
+VECTORS_FILE = 'vectors.npy'
+RESOURCE_IDS_FILE = 'resource_ids.npy'
+UUIDS_FILE = 'uuids.npy'
+CENTROIDS_FILE = 'centroids.npy'
+LIST_ORDER_FILE = 'list_order.npy'
+LIST_OFFSETS_FILE = 'list_offsets.npy'
+META_FILE = 'meta.json'
+
+DEFAULT_EXPORT_BATCH_SIZE = 2000
+DEFAULT_TOP_K = 10
+# 검색할 때 살펴볼 클러스터 수 (클수록 정확하지만 느림)
+DEFAULT_NPROBE = 8
+# 코사인 유사도가 이 값 이상이면 중복 후보로 봄
+DEFAULT_DUPLICATE_THRESHOLD = 0.95
+# k-means 학습에 쓰는 최대 표본 수 / 반복 횟수
+KMEANS_SAMPLE_SIZE = 50000
+KMEANS_ITERATIONS = 10
+# 벡터를 클러스터에 배정할 때 한 번에 계산하는 행 수 (행 수 x 클러스터 수 크기의 행렬을 만듦)
+ASSIGN_CHUNK_SIZE = 8192
+
+# 검색 결과: 리소스 ID, 리소스 UUID, 코사인 유사도
+SimilarResource = namedtuple('SimilarResource', ['resource_id', 'resource_uuid', 'score'])
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("유사도 인덱스에는 numpy가 필요합니다. `pip install numpy`를 실행해주세요.")
+
+
+def default_index_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), SIMILARITY_INDEX_DIR_NAME)
+
+
+def _row_vector(embedding_text: Optional[str], embedding_vector: Optional[bytes]):
+    # float32 컬럼은 복사 없이 읽고, 이전 형식(텍스트)만 파싱
+    if embedding_vector is not None:
+        return np.frombuffer(bytes(embedding_vector), dtype='<f4')
+    return np.asarray(parse_text_embedding(embedding_text), dtype=np.float32)
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _write_meta(index_dir: str, meta: dict) -> None:
+    tmp_path = os.path.join(index_dir, f"{META_FILE}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(index_dir, META_FILE))
+
+
+def _read_meta(index_dir: str) -> dict:
+    with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def export_embeddings(index_dir: str = None, batch_size: int = DEFAULT_EXPORT_BATCH_SIZE) -> int:
+    """
+    vertex_ai_embed_db_embeddings의 모든 임베딩을 file_based_uuid 순서로 나눠 읽어
+    디스크의 메모리 맵 행렬(vectors.npy, 행마다 단위 벡터)로 내보냅니다.
+    전체를 메모리에 올리지 않으므로 행이 많아도 사용할 수 있습니다.
+
+    Args:
+        index_dir: 인덱스 폴더 (기본값: 스크립트 폴더의 similarity_index)
+        batch_size: 한 번에 읽는 행 수
+
+    Returns:
+        int: 내보낸 벡터 수
+    """
+    _require_numpy()
+    index_dir = index_dir or default_index_dir()
+    os.makedirs(index_dir, exist_ok=True)
+
+    table = VertexAiEmbedDbEmbeddings.__table__
+    has_embedding = or_(table.c.embedding_vector.isnot(None), table.c.embedding.isnot(None))
+    columns = (table.c.file_based_uuid, table.c.numeric_id_str, table.c.embedding, table.c.embedding_vector)
+    broker = get_connection_broker()
+
+    with broker.session_scope() as session:
+        capacity = session.scalar(select(func.count()).where(has_embedding))
+        first = session.execute(select(*columns).where(has_embedding).limit(1)).first()
+    if not capacity or first is None:
+        logger.warning("내보낼 임베딩이 없습니다.")
+        return 0
+    dimension = len(_row_vector(first.embedding, first.embedding_vector))
+
+    vectors = np.lib.format.open_memmap(
+        os.path.join(index_dir, VECTORS_FILE), mode='w+', dtype=np.float32, shape=(capacity, dimension)
+    )
+    resource_ids = np.full(capacity, -1, dtype=np.int64)
+    uuids = np.zeros(capacity, dtype='S36')
+
+    count = 0
+    skipped = 0
+    last_uuid = None
+    with tqdm(total=capacity, desc="임베딩 내보내는 중") as progress:
+        while count < capacity:
+            with broker.session_scope() as session:
+                query = select(*columns).where(has_embedding)
+                if last_uuid is not None:
+                    query = query.where(table.c.file_based_uuid > last_uuid)
+                rows = session.execute(query.order_by(table.c.file_based_uuid).limit(batch_size)).all()
+            if not rows:
+                break
+            last_uuid = rows[-1].file_based_uuid
+
+            batch = []
+            for row in rows[:capacity - count]:
+                try:
+                    vector = _row_vector(row.embedding, row.embedding_vector)
+                except (ValueError, SyntaxError, TypeError) as e:
+                    logger.error(f"임베딩을 읽을 수 없어 건너뜁니다 (UUID: {row.file_based_uuid}): {e}")
+                    skipped += 1
+                    continue
+                if len(vector) != dimension:
+                    logger.error(f"차원이 달라 건너뜁니다 (UUID: {row.file_based_uuid}, 차원: {len(vector)})")
+                    skipped += 1
+                    continue
+                resource_ids[count + len(batch)] = int(row.numeric_id_str) if row.numeric_id_str else -1
+                uuids[count + len(batch)] = row.file_based_uuid.encode('ascii')
+                batch.append(vector)
+            if batch:
+                vectors[count:count + len(batch)] = _normalize_rows(np.vstack(batch))
+                count += len(batch)
+            progress.update(len(rows))
+
+    vectors.flush()
+    del vectors
+    np.save(os.path.join(index_dir, RESOURCE_IDS_FILE), resource_ids[:count])
+    np.save(os.path.join(index_dir, UUIDS_FILE), uuids[:count])
+    # 이전 클러스터 정보는 새 행렬과 맞지 않으므로 삭제
+    for name in (CENTROIDS_FILE, LIST_ORDER_FILE, LIST_OFFSETS_FILE):
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    _write_meta(index_dir, {
+        "count": count,
+        "dimension": dimension,
+        "exported_at": datetime.now(seoul_tz).isoformat(),
+        "nlist": None,
+    })
+    logger.info(f"임베딩 {count}개를 내보냈습니다. (건너뜀 {skipped}개)")
+    return count
+
+
+def _assign(vectors, centroids, count: int):
+    """각 벡터를 가장 가까운(내적이 가장 큰) 클러스터에 배정합니다."""
+    labels = np.empty(count, dtype=np.int32)
+    for start in range(0, count, ASSIGN_CHUNK_SIZE):
+        chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK_SIZE])
+        labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+def build_ivf_index(index_dir: str = None, nlist: int = None, iterations: int = KMEANS_ITERATIONS,
+                    sample_size: int = KMEANS_SAMPLE_SIZE, seed: int = 0) -> int:
+    """
+    내보낸 행렬로 IVF(역색인) 인덱스를 만듭니다.
+    표본으로 구면 k-means를 학습해 중심점을 구하고, 모든 벡터를 가장 가까운 중심점의 목록에 배정합니다.
+
+    Args:
+        index_dir: 인덱스 폴더
+        nlist: 클러스터 수 (기본값: sqrt(벡터 수))
+        iterations: k-means 반복 횟수
+        sample_size: k-means 학습 표본 수
+        seed: 난수 시드
+
+    Returns:
+        int: 클러스터 수
+    """
+    _require_numpy()
+    index_dir = index_dir or default_index_dir()
+    meta = _read_meta(index_dir)
+    count = meta["count"]
+    if not count:
+        raise ValueError("인덱스에 벡터가 없습니다. 먼저 export_embeddings()를 실행하세요.")
+    vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode='r')[:count]
+
+    nlist = min(count, nlist or max(1, int(math.sqrt(count))))
+    rng = np.random.default_rng(seed)
+    sample_ids = np.sort(rng.choice(count, size=min(count, max(sample_size, nlist)), replace=False))
+    sample = np.asarray(vectors[sample_ids])
+
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in tqdm(range(iterations), desc="k-means 학습 중"):
+        labels = _assign(sample, centroids, len(sample))
+        sizes = np.bincount(labels, minlength=nlist)
+        starts = np.cumsum(sizes) - sizes
+        empty = sizes == 0
+        # 클러스터 순서로 정렬한 뒤 구간별 합계
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(sample[np.argsort(labels, kind='stable')], starts[~empty], axis=0)
+        if empty.any():
+            # 빈 클러스터는 임의의 표본으로 다시 시작
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+
+    labels = _assign(vectors, centroids, count)
+    order = np.argsort(labels, kind='stable').astype(np.int64)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+
+    np.save(os.path.join(index_dir, CENTROIDS_FILE), centroids.astype(np.float32))
+    np.save(os.path.join(index_dir, LIST_ORDER_FILE), order)
+    np.save(os.path.join(index_dir, LIST_OFFSETS_FILE), offsets)
+    meta.update({"nlist": nlist, "built_at": datetime.now(seoul_tz).isoformat()})
+    _write_meta(index_dir, meta)
+    logger.info(f"IVF 인덱스 생성 완료: 벡터 {count}개, 클러스터 {nlist}개")
+    return nlist
+
+
+class SimilarityIndex:
+    """
+    export_embeddings()/build_ivf_index()로 만든 인덱스를 읽어 비슷한 리소스를 찾습니다.
+    벡터 행렬은 메모리 맵으로 열어 검색에 필요한 행만 읽습니다.
+    IVF 정보가 없으면 전체 행렬을 순서대로 훑습니다. (정확하지만 느림)
+
+    Args:
+        index_dir: 인덱스 폴더 (기본값: 스크립트 폴더의 similarity_index)
+    """
+
+    def __init__(self, index_dir: str = None):
+        _require_numpy()
+        self.index_dir = index_dir or default_index_dir()
+        self.meta = _read_meta(self.index_dir)
+        self.count = self.meta["count"]
+        self.dimension = self.meta["dimension"]
+        self.vectors = np.load(os.path.join(self.index_dir, VECTORS_FILE), mmap_mode='r')[:self.count]
+        self.resource_ids = np.load(os.path.join(self.index_dir, RESOURCE_IDS_FILE))
+        self.uuids = np.load(os.path.join(self.index_dir, UUIDS_FILE))
+
+        self.centroids = None
+        if self.meta.get("nlist"):
+            self.centroids = np.load(os.path.join(self.index_dir, CENTROIDS_FILE))
+            self.list_order = np.load(os.path.join(self.index_dir, LIST_ORDER_FILE), mmap_mode='r')
+            self.list_offsets = np.load(os.path.join(self.index_dir, LIST_OFFSETS_FILE))
+
+    def _candidates(self, query, nprobe: int):
+        if self.centroids is None:
+            return None
+        probes = np.argsort(-(self.centroids @ query))[:nprobe]
+        parts = [self.list_order[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probes]
+        # 행렬을 파일 순서대로 읽도록 정렬
+        return np.sort(np.concatenate(parts))
+
+    def search(self, query, k: int = DEFAULT_TOP_K, nprobe: int = DEFAULT_NPROBE,
+               exclude_resource_id: int = None) -> List[SimilarResource]:
+        """
+        쿼리 벡터와 코사인 유사도가 높은 리소스를 최대 k개 반환합니다. (유사도 내림차순)
+
+        Args:
+            query: 쿼리 벡터
+            k: 반환할 최대 개수
+            nprobe: 살펴볼 클러스터 수
+            exclude_resource_id: 결과에서 뺄 리소스 ID (자기 자신)
+        """
+        query = np.asarray(query, dtype=np.float32)
+        if query.shape != (self.dimension,):
+            raise ValueError(f"쿼리 벡터 차원이 인덱스와 다릅니다: {query.shape[0]} != {self.dimension}")
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        candidates = self._candidates(query, nprobe)
+        if candidates is None:
+            positions = np.arange(self.count)
+            scores = np.concatenate([
+                np.asarray(self.vectors[start:start + ASSIGN_CHUNK_SIZE]) @ query
+                for start in range(0, self.count, ASSIGN_CHUNK_SIZE)
+            ]) if self.count else np.empty(0, dtype=np.float32)
+        else:
+            positions = candidates
+            scores = np.asarray(self.vectors[candidates]) @ query
+
+        if exclude_resource_id is not None:
+            keep = self.resource_ids[positions] != exclude_resource_id
+            positions, scores = positions[keep], scores[keep]
+        if not len(scores):
+            return []
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            SimilarResource(int(self.resource_ids[positions[i]]), self.uuids[positions[i]].decode('ascii'),
+                            float(scores[i]))
+            for i in top
+        ]
+
+    def vector_for_resource(self, resource_id: int):
+        """인덱스에 있는 리소스의 벡터를 반환합니다. 없으면 DB에서 읽고, 그래도 없으면 None."""
+        positions = np.flatnonzero(self.resource_ids == resource_id)
+        if len(positions):
+            return np.asarray(self.vectors[positions[0]])
+
+        table = VertexAiEmbedDbEmbeddings.__table__
+        with get_connection_broker().session_scope() as session:
+            row = session.execute(
+                select(table.c.embedding, table.c.embedding_vector)
+                .where(table.c.numeric_id_str == str(resource_id))
+            ).first()
+        if row is None or (row.embedding is None and row.embedding_vector is None):
+            return None
+        return _row_vector(row.embedding, row.embedding_vector)
+
+    def similar_to_resource(self, resource_id: int, k: int = DEFAULT_TOP_K,
+                            nprobe: int = DEFAULT_NPROBE) -> List[SimilarResource]:
+        """리소스와 비슷한 다른 리소스를 찾습니다."""
+        vector = self.vector_for_resource(resource_id)
+        if vector is None:
+            raise ValueError(f"리소스 ID {resource_id}의 임베딩이 없습니다.")
+        return self.search(vector, k, nprobe, exclude_resource_id=resource_id)
+
+    def similar_to_image(self, image_path: str, k: int = DEFAULT_TOP_K, nprobe: int = DEFAULT_NPROBE,
+                         backend=None) -> List[SimilarResource]:
+        """
+        로컬 이미지와 비슷한 리소스를 찾습니다.
+        이미지는 저장된 임베딩을 만든 것과 같은 백엔드로 임베딩해야 결과가 의미 있습니다.
+        """
+        data = read_local_image(image_path)
+        if data is None:
+            raise FileNotFoundError(image_path)
+        vector = resolve_embedding_backend(backend).embed(os.path.basename(image_path), data)
+        return self.search(vector, k, nprobe)
+
+    def near_duplicates(self, results: List[SimilarResource],
+                        threshold: float = DEFAULT_DUPLICATE_THRESHOLD) -> List[SimilarResource]:
+        """검색 결과 중 유사도가 threshold 이상인 것만 반환합니다."""
+        return [result for result in results if result.score >= threshold]
+
+
+def find_duplicates_in_folder(index: SimilarityIndex, folder_path: str,
+                              threshold: float = DEFAULT_DUPLICATE_THRESHOLD, nprobe: int = DEFAULT_NPROBE,
+                              backend=None) -> dict:
+    """
+    업로드 전에 폴더의 이미지마다 이미 업로드된 비슷한 리소스가 있는지 확인합니다.
+
+    Returns:
+        dict: 파일 이름 -> 중복 후보 목록 (후보가 있는 파일만)
+    """
+    backend = resolve_embedding_backend(backend)
+    image_files = sorted(f for f in os.listdir(folder_path) if f.lower().endswith(('.png', '.jpg', '.jpeg')))
+    duplicates = {}
+    for name in tqdm(image_files, desc="중복 확인 중"):
+        try:
+            results = index.similar_to_image(os.path.join(folder_path, name), k=5, nprobe=nprobe, backend=backend)
+        except Exception as e:
+            logger.error(f"'{name}' 중복 확인 실패: {e}")
+            continue
+        matches = index.near_duplicates(results, threshold)
+        if matches:
+            duplicates[name] = matches
+    return duplicates
+
+
+def _display_results(results: List[SimilarResource]):
+    if not results:
+        print("비슷한 리소스가 없습니다.")
+        return
+    for i, result in enumerate(results, 1):
+        print(f"  {i}. 리소스 ID {result.resource_id} (UUID {result.resource_uuid}) - 유사도 {result.score:.4f}")
+
+
+def similarity_search_interactive():
+    """대화형 유사 이미지 검색 / 중복 탐지 함수"""
+    print("\n===== 유사 이미지 검색 / 중복 탐지 =====")
+    print("1. 인덱스 만들기 (DB에서 임베딩 내보내기 + IVF 생성)")
+    print("2. 리소스 ID로 비슷한 리소스 찾기")
+    print("3. 로컬 이미지로 비슷한 리소스 찾기")
+    print("4. 폴더의 이미지 중복 확인 (업로드 전)")
+    print("5. 돌아가기")
+
+    choice = input("\n원하는 기능을 선택하세요: ").strip()
+
+    if choice == '1':
+        count = export_embeddings()
+        if count:
+            nlist = build_ivf_index()
+            print(f"✅ 인덱스 생성 완료: 벡터 {count}개, 클러스터 {nlist}개")
+        return
+    if choice not in ('2', '3', '4'):
+        if choice != '5':
+            print("잘못된 선택입니다.")
+        return
+
+    if not os.path.exists(os.path.join(default_index_dir(), META_FILE)):
+        print("❌ 인덱스가 없습니다. 먼저 1번으로 인덱스를 만들어주세요.")
+        return
+    index = SimilarityIndex()
+    print(f"인덱스: 벡터 {index.count}개 (내보낸 시각 {index.meta.get('exported_at')})")
+
+    if choice == '2':
+        try:
+            resource_id = int(input("리소스 ID를 입력하세요: ").strip())
+        except ValueError:
+            print("잘못된 리소스 ID입니다.")
+            return
+        _display_results(index.similar_to_resource(resource_id))
+    elif choice == '3':
+        image_path = input("이미지 경로를 입력하세요: ").strip()
+        _display_results(index.similar_to_image(image_path))
+    else:
+        folder_path = input("확인할 폴더 경로를 입력하세요: ").strip()
+        duplicates = find_duplicates_in_folder(index, folder_path)
+        if not duplicates:
+            print("✅ 중복 후보가 없습니다.")
+        for name, matches in duplicates.items():
+            print(f"\n📋 {name}")
+            _display_results(matches)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    similarity_search_interactive()
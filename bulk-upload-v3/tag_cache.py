@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import zlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from models import ColorCodeTags, seoul_tz
+from session_utills import get_connection_broker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAG_COLOR = '#FFFFFF'
+DEFAULT_TAG_TYPE = 'normal'
+
+# 태그 생성 구간을 프로세스 간에 직렬화하기 위한 advisory lock 키
+# (color_code_tags에는 (tag, type) 유니크 제약이 없어서 ON CONFLICT를 쓸 수 없음)
+TAG_CREATE_LOCK_KEY = zlib.crc32(b'color_code_tags:create')
+
+
+class TagCache:
+    """
+    color_code_tags 전체를 한 번 읽어 두고 태그 이름 -> ID를 메모리에서 찾는 캐시.
+    이름은 대소문자를 구분하지 않고 (type, 소문자 이름)으로 찾으며, 같은 이름이 여러 개면 가장 작은 ID를 사용합니다.
+    없는 태그는 모아서 한 트랜잭션에서 한 번의 multi-row INSERT로 생성합니다.
+    여러 작업 스레드가 함께 사용해도 안전합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._create_lock = threading.Lock()
+        self._loaded = False
+        self._by_name: Dict[Tuple[str, str], int] = {}
+        self._by_name_any_type: Dict[str, int] = {}
+        self._by_user: Dict[Tuple[int, str], List[int]] = {}
+        self._names: Dict[int, str] = {}
+
+    def load(self, session: Session = None) -> None:
+        """
+        모든 태그를 읽어 캐시를 다시 채웁니다. session이 없으면 공유 연결 풀에서 세션을 빌려 씁니다.
+        """
+        if session is None:
+            with get_connection_broker().session_scope() as scoped:
+                rows = self._fetch_all(scoped)
+        else:
+            rows = self._fetch_all(session)
+
+        with self._lock:
+            self._by_name.clear()
+            self._by_name_any_type.clear()
+            self._by_user.clear()
+            self._names.clear()
+            for tag_id, tag, tag_type, user_id in rows:
+                self._remember(tag_id, tag, tag_type, user_id)
+            self._loaded = True
+        logger.info(f"태그 캐시 로드 완료: {len(rows)}개")
+
+    @staticmethod
+    def _fetch_all(session: Session) -> List[Tuple[int, str, str, Optional[int]]]:
+        return session.execute(
+            select(ColorCodeTags.id, ColorCodeTags.tag, ColorCodeTags.type, ColorCodeTags.user_id)
+            .order_by(ColorCodeTags.id)
+        ).all()
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if not self._loaded:
+                self.load()
+
+    def _remember(self, tag_id: int, tag: Optional[str], tag_type: Optional[str], user_id: Optional[int]) -> None:
+        # 호출자가 self._lock을 잡고 있어야 함. ID 오름차순으로 넣으면 가장 작은 ID가 남음
+        tag_type = tag_type or DEFAULT_TAG_TYPE
+        self._names[tag_id] = tag
+        if tag is not None:
+            key = tag.lower()
+            self._by_name.setdefault((tag_type, key), tag_id)
+            self._by_name_any_type.setdefault(key, tag_id)
+        if user_id is not None:
+            self._by_user.setdefault((user_id, tag_type), []).append(tag_id)
+
+    def _lookup(self, key: str, tag_type: Optional[str]) -> Optional[int]:
+        if tag_type is None:
+            return self._by_name_any_type.get(key)
+        return self._by_name.get((tag_type, key))
+
+    def get_id(self, tag_name: str, tag_type: Optional[str] = DEFAULT_TAG_TYPE) -> Optional[int]:
+        """
+        태그 ID를 반환합니다. 없으면 None. (tag_type=None이면 타입과 상관없이 찾음)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return self._lookup(tag_name.lower(), tag_type)
+
+    def get_name(self, tag_id: int) -> Optional[str]:
+        """태그 ID의 이름을 반환합니다."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._names.get(tag_id)
+
+    def exists(self, tag_id: int) -> bool:
+        """태그 ID가 존재하는지 확인합니다."""
+        self._ensure_loaded()
+        with self._lock:
+            return tag_id in self._names
+
+    def filter_existing(self, tag_ids: Iterable[int]) -> List[int]:
+        """존재하는 태그 ID만 순서를 유지하여 반환합니다."""
+        self._ensure_loaded()
+        with self._lock:
+            return [tag_id for tag_id in tag_ids if tag_id in self._names]
+
+    def ids_for_user(self, user_id: int, tag_type: str) -> List[int]:
+        """사용자가 소유한 특정 타입의 태그 ID 목록을 반환합니다."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._by_user.get((user_id, tag_type), []))
+
+    def get_or_create_id(self, tag_name: str, tag_type: Optional[str] = DEFAULT_TAG_TYPE,
+                         user_id: int = None, color_code: str = DEFAULT_TAG_COLOR) -> int:
+        """태그 하나의 ID를 찾거나 생성합니다."""
+        return self.get_or_create_ids([tag_name], tag_type, user_id, color_code)[tag_name]
+
+    def get_or_create_ids(self, tag_names: Iterable[str], tag_type: Optional[str] = DEFAULT_TAG_TYPE,
+                          user_id: int = None, color_code: str = DEFAULT_TAG_COLOR,
+                          created: Dict[int, str] = None) -> Dict[str, int]:
+        """
+        여러 태그 이름의 ID를 한 번에 찾고, 캐시에 없는 이름만 모아 한 번에 생성합니다.
+
+        Args:
+            tag_names: 태그 이름 목록 (새 태그는 처음 나온 대소문자 그대로 생성)
+            tag_type: 찾을 태그 타입 (None이면 타입과 상관없이 찾고, 새 태그는 'normal'로 생성)
+            user_id: 새 태그의 소유 사용자 ID
+            color_code: 새 태그의 색상 코드
+            created: 주어지면 새로 생성한 태그를 {ID: 이름}으로 기록
+
+        Returns:
+            dict: 태그 이름 -> 태그 ID
+        """
+        tag_names = [name for name in tag_names if name]
+        self._ensure_loaded()
+
+        result = {}
+        missing = {}
+        with self._lock:
+            for name in tag_names:
+                tag_id = self._lookup(name.lower(), tag_type)
+                if tag_id is None:
+                    missing.setdefault(name.lower(), name)
+                else:
+                    result[name] = tag_id
+
+        if missing:
+            resolved = self._create_missing(missing, tag_type, user_id, color_code, created)
+            for name in tag_names:
+                if name not in result:
+                    result[name] = resolved[name.lower()]
+        return result
+
+    def _create_missing(self, missing: Dict[str, str], tag_type: Optional[str], user_id: Optional[int],
+                        color_code: str, created: Optional[Dict[int, str]]) -> Dict[str, int]:
+        """
+        캐시에 없는 태그를 별도 트랜잭션에서 생성하고 바로 커밋합니다.
+        (리소스 트랜잭션이 롤백되어도 태그 ID는 유효하므로 다른 스레드와 캐시를 공유할 수 있음)
+        """
+        create_type = tag_type or DEFAULT_TAG_TYPE
+        with self._create_lock:
+            # 락을 기다리는 동안 다른 스레드가 만들었을 수 있으므로 다시 확인
+            resolved = {}
+            with self._lock:
+                for key in list(missing):
+                    tag_id = self._lookup(key, tag_type)
+                    if tag_id is not None:
+                        resolved[key] = tag_id
+                        del missing[key]
+            if not missing:
+                return resolved
+
+            with get_connection_broker().session_scope() as session:
+                # 다른 프로세스와의 중복 생성을 막기 위해 트랜잭션 단위 advisory lock
+                session.execute(select(func.pg_advisory_xact_lock(TAG_CREATE_LOCK_KEY)))
+
+                # 캐시를 읽은 뒤 다른 프로세스가 만든 태그는 그대로 사용
+                query = select(ColorCodeTags.id, ColorCodeTags.tag, ColorCodeTags.type, ColorCodeTags.user_id) \
+                    .where(func.lower(ColorCodeTags.tag).in_(list(missing))) \
+                    .order_by(ColorCodeTags.id)
+                if tag_type is not None:
+                    query = query.where(ColorCodeTags.type == tag_type)
+                found = session.execute(query).all()
+
+                found_keys = {tag.lower() for _, tag, _, _ in found}
+                new_names = [name for key, name in missing.items() if key not in found_keys]
+                inserted = []
+                if new_names:
+                    now = datetime.now(seoul_tz)
+                    table = ColorCodeTags.__table__
+                    inserted = session.execute(
+                        insert(table).returning(table.c.id, table.c.tag, sort_by_parameter_order=True),
+                        [
+                            {
+                                "tag": name,
+                                "color_code": color_code,
+                                "type": create_type,
+                                "user_id": user_id,
+                                "created_at": now,
+                                "updated_at": now,
+                            }
+                            for name in new_names
+                        ]
+                    ).all()
+
+            with self._lock:
+                for tag_id, tag, found_type, found_user_id in found:
+                    self._remember(tag_id, tag, found_type, found_user_id)
+                for tag_id, tag in inserted:
+                    self._remember(tag_id, tag, create_type, user_id)
+                    logger.info(f"새로운 태그 생성됨: {tag} (ID: {tag_id})")
+                    if created is not None:
+                        created[tag_id] = tag
+                for key in missing:
+                    resolved[key] = self._lookup(key, tag_type)
+            return resolved
+
+    def load_tags(self, session: Session, tag_ids: Iterable[int]) -> List[ColorCodeTags]:
+        """
+        태그 ID 목록을 세션의 ColorCodeTags 객체로 한 번의 IN 쿼리로 읽어 옵니다. (순서 유지)
+        """
+        tag_ids = list(dict.fromkeys(tag_ids))
+        if not tag_ids:
+            return []
+        tags = {
+            tag.id: tag
+            for tag in session.query(ColorCodeTags).filter(ColorCodeTags.id.in_(tag_ids)).all()
+        }
+        return [tags[tag_id] for tag_id in tag_ids if tag_id in tags]
+
+
+# 프로세스 전역 태그 캐시
+_tag_cache = TagCache()
+
+
+def get_tag_cache() -> TagCache:
+    """프로세스 전역 TagCache를 반환합니다."""
+    return _tag_cache
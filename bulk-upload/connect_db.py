@@ -6,9 +6,8 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sshtunnel import SSHTunnelForwarder
 from urllib.parse import quote_plus
 import threading
-import requests
 from model import Base, PublicFolder
-from google.cloud import storage
+from create_new_resource import get_backend
 import uuid
 import threading
 
@@ -73,11 +72,10 @@ def get_public_folder_by_user_id(session, team_id):
         return {}  # public_folder 또는 JSON 파일이 없는 경우 빈 사전 반환
 
     file_path = public_folder.json_file
-    google_url = f"https://storage.googleapis.com/wcidfu-bucket/_media/{file_path}"
 
     try:
-        response = requests.get(google_url)
-        response.raise_for_status()  # 요청 실패 시 예외를 발생시키기 위해
+        # 스토리지 백엔드에서 JSON 파일 내려받기 (기본은 GCS)
+        content = get_backend().download(BUCKET_NAME, f"_media/{file_path}")
 
         local_filename = os.path.basename(file_path)
         current_script_path = os.path.abspath(__file__)
@@ -88,13 +86,13 @@ def get_public_folder_by_user_id(session, team_id):
         os.makedirs(local_directory, exist_ok=True)
 
         with open(local_path, 'wb') as f:
-            f.write(response.content)
+            f.write(content)
         
         with open(local_path, 'r' , encoding='utf-8') as f:
             public_json_data = json.load(f)  # 파일 내용을 JSON으로 읽고 사전으로 변환
         
         return public_json_data, public_folder_id
-    except requests.RequestException as e:
+    except Exception as e:
         print(f"Failed to download or read the file: {e}")
         raise  # 요청 실패 시 빈 사전 반환
     
@@ -124,47 +122,39 @@ def merge_json_data(new_data, existing_data):
     return json.dumps(existing_data, ensure_ascii=False, indent=4)
 
 def delete_and_upload_new_public_folder_file(session, public_folder_id, load_updated_public_json):
+    # 스토리지 백엔드 (기본은 GCS, set_storage_backend()로 교체 가능)
+    backend = get_backend()
+    bucket_name = BUCKET_NAME
+    backup_blob_name = None
     try:
-        current_script_path = os.path.abspath(__file__)
-        base_directory = os.path.dirname(current_script_path)
-        
-        # Google Cloud 서비스 계정 자격 증명 파일 경로 설정
-        credentials_path = os.path.join(base_directory, 'wcidfu-77f802b00777.json')
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-
-        storage_client = storage.Client()
-
         public_folder = session.query(PublicFolder).filter(PublicFolder.id == public_folder_id).first()
         if not public_folder or not public_folder.json_file:
             raise KeyError("Public folder not found or no json file associated.")
 
-        bucket_name = "wcidfu-bucket"
         file_path = public_folder.json_file
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(f"_media/{file_path}")
+        blob_name = f"_media/{file_path}"
 
-        backup_blob = bucket.blob(f"_media/backup/{file_path}")
-        bucket.copy_blob(blob, bucket, new_name=backup_blob.name) 
+        backup_blob_name = f"_media/backup/{file_path}"
+        backend.copy(bucket_name, blob_name, backup_blob_name)
 
-        blob.delete()
+        backend.delete(bucket_name, blob_name)
 
         new_file_name = f"public_json_file/{uuid.uuid4()}.json"
-        new_blob = bucket.blob(f"_media/{new_file_name}")
         updated_json_string = json.dumps(load_updated_public_json, ensure_ascii=False)
-        new_blob.upload_from_string(updated_json_string, content_type='application/json')
+        backend.upload(bucket_name, f"_media/{new_file_name}", updated_json_string, content_type='application/json')
 
         public_folder.json_file = new_file_name
         session.commit()
 
         # If all operations are successful, delete the backup
-        backup_blob.delete()
+        backend.delete(bucket_name, backup_blob_name)
 
     except Exception as e:
         session.rollback()
         print(f"An error occurred: {e}")
         # Attempt to restore the original file from the backup if it exists
-        if backup_blob.exists():
-            bucket.copy_blob(backup_blob, bucket, new_name=blob.name)
+        if backup_blob_name and backend.exists(bucket_name, backup_blob_name):
+            backend.copy(bucket_name, backup_blob_name, blob_name)
             print(f"Restored {file_path} from backup.")
         raise
 
@@ -6,18 +6,26 @@ import struct
 from PIL import PngImagePlugin
 from google.cloud import storage
 from model import Resource, SdModel
+from storage_backend import GCSStorageBackend, get_storage_backend
 
-def upload_to_bucket(blob_name, data, bucket_name):
+def _create_storage_client():
     current_script_path = os.path.abspath(__file__)
     base_directory = os.path.dirname(current_script_path)
     
     credentials_path = os.path.join(base_directory, 'wcidfu-77f802b00777.json')
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
 
-    storage_client = storage.Client()
-    bucket = storage_client.get_bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-    blob.upload_from_string(data)
+    return storage.Client()
+
+# 별도 백엔드가 설정되지 않았을 때 사용하는 GCS 백엔드
+_default_storage_backend = GCSStorageBackend(_create_storage_client)
+
+def get_backend():
+    """설정된 스토리지 백엔드를 반환합니다. (없으면 GCS)"""
+    return get_storage_backend() or _default_storage_backend
+
+def upload_to_bucket(blob_name, data, bucket_name):
+    blob_name = get_backend().upload(bucket_name, blob_name, data)
     clean_blob_name = blob_name.replace("_media/", "")
 
     return clean_blob_name
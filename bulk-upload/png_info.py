@@ -1,8 +1,8 @@
-import re
 import piexif
 import piexif.helper
 import json
 from PIL import Image
+from generation_params import parse_generation_parameters
 
 class PNGInfoAPI:
     # def read_info_from_image(self, image: Image.Image):
@@ -98,41 +98,8 @@ Steps: {json_info["steps"]}, CFG scale: {json_info["scale"]}, Seed: {json_info["
 
 
     def parse_generation_parameters(self, x: str):
-        res = {}
-        lines = x.strip().split("\n")  # 입력된 문자열을 줄 단위로 분리
-
-        for i, line in enumerate(lines):  # 각 줄과 그 인덱스에 대해 반복
-            line = line.strip()  # 현재 줄의 앞뒤 공백 제거
-            if i == 0:  # 첫 번째 줄인 경우
-                res["Prompt"] = line
-            elif i == 1 and line.startswith("Negative prompt:"):  # 두 번째 줄이며 "Negative prompt:"로 시작하는 경우
-                res["Negative prompt"] = line[16:].strip()
-            elif i == 2:  # 세 번째 줄인 경우, 옵션들을 처리
-                # 여기에서 각 키-값에 대한 매칭 작업을 수행합니다.
-                keys = [
-                    "Steps", "Sampler", "CFG scale", "Seed", "Size", 
-                    "Model hash", "Model", "VAE hash", "VAE", 
-                    "Denoising strength", "Clip skip", "Hires upscale",
-                    "Hires upscaler", 
-                ]
-                for key in keys:
-                    # 정규 표현식을 사용하여 각 키에 해당하는 값을 찾습니다.
-                    match = re.search(fr'{key}: ([^,]+),', line)
-                    if match:
-                        # 찾은 값은 그룹 1에 있습니다.
-                        value = match.group(1).strip()
-                        res[key] = value
-                
-                controlnet_patterns = re.findall(r'ControlNet \d+: "(.*?)"', line, re.DOTALL)
-                for idx, cn_content in enumerate(controlnet_patterns):
-                    # ControlNet 내부의 키-값 쌍을 추출합니다.
-                    cn_dict = {}
-                    cn_pairs = re.findall(r'(\w+): ([^,]+)', cn_content)
-                    for key, value in cn_pairs:
-                        cn_dict[key.strip()] = value.strip()
-                    res[f"ControlNet {idx}"] = cn_dict
-
-        return res
+        # 프롬프트/네거티브 프롬프트/파라미터 분리는 공용 단일 패스 파서에 위임합니다.
+        return parse_generation_parameters(x)
 
     def geninfo_params(self, image):
         try: